@@ -0,0 +1 @@
+"""Benchmarks of the StoredSafe client against a local stand-in server."""
@@ -0,0 +1,174 @@
+"""
+Benchmark the StoredSafe client against a local stand-in server.
+
+    python -m benchmarks --calls 200 --concurrency 8 --latency 0.005 --output results.json
+    python -m benchmarks --compare results.json
+
+Every operation is run sequentially and from a thread pool sharing one
+client. Latency is measured per call, and peak Python memory is measured in
+a separate, shorter pass under tracemalloc so it does not skew the timings.
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from storedsafe import StoredSafe
+from .server import StandInServer, TOKEN, VAULT_ID, OBJECT_ID
+
+MEMORY_CALLS = 20
+
+
+def version():
+    """Get the installed version of the storedsafe package."""
+    try:
+        from importlib.metadata import version as package_version, PackageNotFoundError
+    except ImportError:
+        return 'unknown'
+    try:
+        return package_version('storedsafe')
+    except PackageNotFoundError:
+        return 'unknown'
+
+
+def operations(api, upload_path):
+    """Get the benchmarked operations by name."""
+    return {
+        'decrypt_object': lambda: api.decrypt_object(OBJECT_ID),
+        'vault_objects': lambda: api.vault_objects(VAULT_ID),
+        'find': lambda: api.find('host'),
+        'upload_file': lambda: api.upload_file(upload_path, parentid=0, groupid=VAULT_ID),
+        'get_file': lambda: api.get_file(OBJECT_ID),
+    }
+
+
+def timed(operation):
+    """Call operation and return its latency in seconds."""
+    started = time.perf_counter()
+    res = operation()
+    elapsed = time.perf_counter() - started
+    if res.status_code != 200:
+        raise RuntimeError(f'HTTP {res.status_code}')
+    return elapsed
+
+
+def percentile(latencies, percent):
+    """Get a percentile of sorted latencies."""
+    return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+
+def measure(operation, calls, concurrency):
+    """Run operation calls times, concurrency at a time, and summarize the latencies."""
+    for _ in range(min(calls, 5)):
+        timed(operation)
+    started = time.perf_counter()
+    if concurrency == 1:
+        latencies = [timed(operation) for _ in range(calls)]
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            latencies = list(executor.map(lambda _: timed(operation), range(calls)))
+    total = time.perf_counter() - started
+    tracemalloc.start()
+    try:
+        for _ in range(min(calls, MEMORY_CALLS)):
+            operation()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    latencies.sort()
+    return {
+        'calls': calls,
+        'concurrency': concurrency,
+        'calls_per_sec': calls / total,
+        'mean': sum(latencies) / calls,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'peak_memory': peak,
+    }
+
+
+def run(args):
+    """Run the selected benchmarks and return the results document."""
+    config = {
+        'calls': args.calls, 'concurrency': args.concurrency, 'latency': args.latency,
+        'objects': args.objects, 'file_size': args.file_size, 'secret_size': args.secret_size}
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir, StandInServer(
+            args.latency, objects=args.objects, file_size=args.file_size, secret_size=args.secret_size) as server:
+        upload_path = Path(tmpdir) / 'upload.bin'
+        upload_path.write_bytes(b'\0' * args.file_size)
+        with StoredSafe(
+                host=server.host, token=TOKEN, verify=server.cert, pool_size=max(args.concurrency, 1)) as api:
+            for name, operation in operations(api, upload_path).items():
+                if args.only and name not in args.only:
+                    continue
+                for mode, concurrency in (('sequential', 1), ('concurrent', args.concurrency)):
+                    result = {'operation': name, 'mode': mode, **measure(operation, args.calls, concurrency)}
+                    results.append(result)
+                    print(
+                        f'{name:<16} {mode:<11} {result["calls_per_sec"]:>9.1f} calls/s  '
+                        f'p50 {result["p50"] * 1000:>7.2f} ms  p99 {result["p99"] * 1000:>7.2f} ms  '
+                        f'peak {result["peak_memory"] / 1024:>9.1f} KiB', file=sys.stderr)
+    return {
+        'meta': {
+            'storedsafe': version(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.time(),
+            'config': config,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Print the change in throughput from baseline and return the regressed benchmarks."""
+    previous = {(result['operation'], result['mode']): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['operation'], result['mode']))
+        if before is None:
+            continue
+        change = result['calls_per_sec'] / before['calls_per_sec'] - 1
+        print(f'{result["operation"]:<16} {result["mode"]:<11} {change:>+8.1%}', file=sys.stderr)
+        if change < -threshold:
+            regressions.append(f'{result["operation"]} ({result["mode"]})')
+    return regressions
+
+
+def main(argv=None):
+    """Parse arguments, run the benchmarks and write the results."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--calls', type=int, default=200, help='calls per operation and mode')
+    parser.add_argument('--concurrency', type=int, default=8, help='threads in the concurrent mode')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the server waits per request')
+    parser.add_argument('--objects', type=int, default=100, help='objects in vault listings and find results')
+    parser.add_argument('--file-size', type=int, default=1024 * 1024, help='bytes in uploaded and fetched files')
+    parser.add_argument('--secret-size', type=int, default=32, help='characters in decrypted secrets')
+    parser.add_argument('--only', nargs='+', help='operations to run, all by default')
+    parser.add_argument('--output', help='write the results as JSON to this path instead of stdout')
+    parser.add_argument('--compare', help='results JSON of a previous run to compare throughput against')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1, help='throughput drop counted as a regression (default 0.1)')
+    args = parser.parse_args(argv)
+
+    current = run(args)
+    document = json.dumps(current, indent=2)
+    if args.output:
+        Path(args.output).write_text(document + '\n')
+    else:
+        print(document)
+    if args.compare:
+        regressions = compare(json.loads(Path(args.compare).read_text()), current, args.threshold)
+        if regressions:
+            print(f'Regressed: {", ".join(regressions)}', file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
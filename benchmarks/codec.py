@@ -0,0 +1,93 @@
+"""
+Benchmark the JSON codecs on vault listing and user listing sized payloads.
+
+    python -m benchmarks.codec --objects 20000 --repeat 5 --output codec.json
+
+Decoding and encoding time is reported in milliseconds per MB of JSON for
+every installed codec, using the best of the repeated runs.
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+from pathlib import Path
+from storedsafe.codec import available_codecs
+from .server import TEMPLATE, listing_entry
+from .__main__ import version
+
+MB = 1024 * 1024
+
+
+def payloads(objects, secret_size):
+    """Get the benchmarked JSON bodies by name."""
+    callinfo = {'status': 'SUCCESS', 'errorcodes': 0, 'token': 'benchmark-token'}
+    users = [
+        {'id': str(user_id), 'username': f'user{user_id}', 'fullname': f'User Nümber {user_id}',
+         'email': f'user{user_id}@example.com', 'admin': False, 'active': True}
+        for user_id in range(1, objects + 1)]
+    return {
+        'vault_objects': json.dumps({
+            'OBJECTS': [listing_entry(object_id, secret_size) for object_id in range(1, objects + 1)],
+            'TEMPLATES': [TEMPLATE], 'CALLINFO': callinfo}).encode(),
+        'list_users': json.dumps({'USERS': users, 'CALLINFO': callinfo}).encode(),
+    }
+
+
+def best(func, repeat):
+    """Get the shortest time in seconds of repeat calls to func."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(args):
+    """Time every installed codec on every payload and return the results document."""
+    results = []
+    for payload, body in payloads(args.objects, args.secret_size).items():
+        size = len(body) / MB
+        data = json.loads(body)
+        for name, codec in available_codecs().items():
+            decode = best(lambda codec=codec: codec.loads(body), args.repeat)
+            encode = best(lambda codec=codec: codec.dumps(data), args.repeat)
+            result = {
+                'payload': payload, 'codec': name, 'megabytes': size,
+                'decode_ms_per_mb': decode * 1000 / size, 'encode_ms_per_mb': encode * 1000 / size}
+            results.append(result)
+            print(
+                f'{payload:<14} {name:<7} {size:>7.2f} MB  decode {result["decode_ms_per_mb"]:>7.2f} ms/MB  '
+                f'encode {result["encode_ms_per_mb"]:>7.2f} ms/MB', file=sys.stderr)
+    return {
+        'meta': {
+            'storedsafe': version(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.time(),
+            'config': {'objects': args.objects, 'secret_size': args.secret_size, 'repeat': args.repeat},
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    """Parse arguments, run the benchmark and write the results."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.codec', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--objects', type=int, default=20000, help='entries in the listings')
+    parser.add_argument('--secret-size', type=int, default=32, help='characters in decrypted secrets')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per codec and payload, the best is kept')
+    parser.add_argument('--output', help='write the results as JSON to this path instead of stdout')
+    args = parser.parse_args(argv)
+
+    document = json.dumps(run(args), indent=2)
+    if args.output:
+        Path(args.output).write_text(document + '\n')
+    else:
+        print(document)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
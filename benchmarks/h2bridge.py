@@ -0,0 +1,172 @@
+"""
+HTTP/2 front for the HTTP/1.1 request handlers of the local stand-in servers.
+
+The benchmark and test stand-ins answer requests with BaseHTTPRequestHandler
+subclasses. H2TLSServer serves clients selecting h2 through ALPN over
+HTTP/2, passing every stream to the handler as an in-memory HTTP/1.1
+exchange, and the other clients over HTTP/1.1 as TLSServer does.
+"""
+import io
+import ssl
+import queue
+import select
+import socket
+import functools
+import threading
+from storedsafe.fake import TLSServer
+
+# Connection-specific headers of HTTP/1.1 responses, forbidden in HTTP/2.
+_HOP_BY_HOP = frozenset((b'connection', b'keep-alive', b'transfer-encoding', b'upgrade'))
+
+
+@functools.lru_cache(maxsize=None)
+def in_memory(handler_class):
+    """Get the subclass of an HTTP/1.1 handler class answering a (connection, request bytes) request in memory."""
+
+    class InMemory(handler_class):
+        """Handler reading the request from and writing the response to memory."""
+
+        def setup(self):
+            self.connection, data = self.request
+            self.rfile = io.BytesIO(data)
+            self.wfile = io.BytesIO()
+
+        def finish(self):
+            pass
+
+    return InMemory
+
+
+# pylint: disable=too-many-arguments
+def exchange(handler_class, server, connection, method, path, headers, body):
+    """Answer one request with an HTTP/1.1 handler and return the status, headers and body of its response."""
+    head = [f'{method} {path} HTTP/1.1'.encode()]
+    head += [name + b': ' + value for name, value in headers if name not in (b'content-length', b'host')]
+    head.append(f'Content-Length: {len(body)}'.encode())
+    request = (connection, b'\r\n'.join(head) + b'\r\n\r\n' + body)
+    raw = in_memory(handler_class)(request, ('127.0.0.1', 0), server).wfile.getvalue()
+    response, _, body = raw.partition(b'\r\n\r\n')
+    lines = response.split(b'\r\n')
+    fields = [line.split(b': ', 1) for line in lines[1:]]
+    return int(lines[0].split()[1]), [(name.lower(), value) for name, value in fields], body
+
+
+class H2Session:
+    """
+    Serve one HTTP/2 connection, answering every stream with an HTTP/1.1
+    handler in its own thread. All socket I/O happens in the serving thread,
+    which sends the answers as the flow control windows allow.
+    """
+
+    def __init__(self, sock, handler_class, server):
+        # pylint: disable=import-outside-toplevel
+        from h2.config import H2Configuration
+        from h2.connection import H2Connection
+        self.sock = sock
+        self.handler_class = handler_class
+        self.server = server
+        self.conn = H2Connection(H2Configuration(client_side=False, header_encoding=None))
+        self.requests = {}
+        self.outbound = {}
+        self.answers = queue.Queue()
+        self.wake_r, self.wake_w = socket.socketpair()
+
+    def __answer(self, stream_id, headers, body):
+        headers = dict(headers)
+        answer = exchange(
+            self.handler_class, self.server, self.sock, headers[b':method'].decode(), headers[b':path'].decode(),
+            [(name, value) for name, value in headers.items() if not name.startswith(b':')], bytes(body))
+        self.answers.put((stream_id, answer))
+        try:
+            self.wake_w.send(b'\0')
+        except OSError:
+            pass  # The session ended while answering.
+
+    def __event(self, event):
+        # pylint: disable=import-outside-toplevel
+        from h2 import events
+        if isinstance(event, events.RequestReceived):
+            self.requests[event.stream_id] = (event.headers, bytearray())
+        elif isinstance(event, events.DataReceived):
+            self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            if event.stream_id in self.requests:
+                self.requests[event.stream_id][1].extend(event.data)
+        elif isinstance(event, events.StreamEnded) and event.stream_id in self.requests:
+            threading.Thread(
+                target=self.__answer, args=(event.stream_id, *self.requests.pop(event.stream_id)),
+                daemon=True).start()
+        elif isinstance(event, events.StreamReset):
+            self.requests.pop(event.stream_id, None)
+            self.outbound.pop(event.stream_id, None)
+        elif isinstance(event, events.ConnectionTerminated):
+            return False
+        return True
+
+    def __send_bodies(self):
+        from h2.exceptions import StreamClosedError  # pylint: disable=import-outside-toplevel
+        for stream_id, body in list(self.outbound.items()):
+            try:
+                while body:
+                    window = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size)
+                    if window <= 0:
+                        break
+                    self.conn.send_data(stream_id, body[:window])
+                    body = body[window:]
+                if body:
+                    self.outbound[stream_id] = body
+                else:
+                    self.conn.end_stream(stream_id)
+                    del self.outbound[stream_id]
+            except StreamClosedError:
+                del self.outbound[stream_id]
+
+    def __send_answers(self):
+        from h2.exceptions import StreamClosedError  # pylint: disable=import-outside-toplevel
+        while not self.answers.empty():
+            stream_id, (status, headers, body) = self.answers.get_nowait()
+            headers = [(name, value) for name, value in headers if name not in _HOP_BY_HOP]
+            try:
+                self.conn.send_headers(stream_id, [(b':status', str(status).encode())] + headers)
+            except StreamClosedError:
+                continue
+            self.outbound[stream_id] = body
+
+    def run(self):
+        """Serve the connection until the client closes it or breaks the protocol."""
+        from h2.exceptions import ProtocolError  # pylint: disable=import-outside-toplevel
+        self.conn.initiate_connection()
+        self.sock.sendall(self.conn.data_to_send())
+        try:
+            while True:
+                readable = [self.sock]
+                if not self.sock.pending():
+                    readable, _, _ = select.select([self.sock, self.wake_r], [], [])
+                if self.wake_r in readable:
+                    self.wake_r.recv(4096)
+                if self.sock in readable:
+                    data = self.sock.recv(65535)
+                    try:
+                        if not data or not all(map(self.__event, self.conn.receive_data(data))):
+                            return
+                    except ProtocolError:
+                        # h2 has queued a GOAWAY telling the client why.
+                        self.sock.sendall(self.conn.data_to_send())
+                        return
+                self.__send_answers()
+                self.__send_bodies()
+                self.sock.sendall(self.conn.data_to_send())
+        except (OSError, ssl.SSLError):
+            return
+        finally:
+            self.wake_r.close()
+            self.wake_w.close()
+
+
+class H2TLSServer(TLSServer):
+    """TLSServer answering connections that selected h2 through ALPN over HTTP/2."""
+
+    def serve_connection(self, request, client_address):
+        if request.selected_alpn_protocol() == 'h2':
+            H2Session(request, self.RequestHandlerClass, self).run()
+        else:
+            super().serve_connection(request, client_address)
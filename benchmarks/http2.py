@@ -0,0 +1,116 @@
+"""
+Compare the HTTP/1.1 and HTTP/2 transports on concurrent reads against a local h2-capable stand-in.
+
+    python -m benchmarks.http2 --calls 400 --concurrency 32 --latency 0.01 --output http2.json
+
+Every operation is run concurrently from the sync client, in a thread pool,
+and from the async client, in tasks, with and without http2. Besides the
+latencies, the number of connections the server accepted is reported.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+from pathlib import Path
+from storedsafe import StoredSafe
+from storedsafe.aio import AsyncStoredSafe
+from .server import StandInServer, TOKEN, OBJECT_ID
+from .__main__ import version, measure, percentile
+
+OPERATIONS = ('decrypt_object', 'get_object')
+
+
+async def ameasure(operation, calls, concurrency):
+    """Await operation calls times, concurrency at a time, and summarize the latencies."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed():
+        async with semaphore:
+            started = time.perf_counter()
+            res = await operation()
+            elapsed = time.perf_counter() - started
+        if res.status_code != 200:
+            raise RuntimeError(f'HTTP {res.status_code}')
+        return elapsed
+
+    for _ in range(min(calls, 5)):
+        await timed()
+    started = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(timed() for _ in range(calls))))
+    total = time.perf_counter() - started
+    return {
+        'calls': calls,
+        'concurrency': concurrency,
+        'calls_per_sec': calls / total,
+        'mean': sum(latencies) / calls,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+    }
+
+
+def run_sync(server, name, http2, args):
+    """Measure an operation of the sync client."""
+    with StoredSafe(
+            host=server.host, token=TOKEN, verify=server.cert, pool_size=args.concurrency, http2=http2) as api:
+        return measure(lambda: getattr(api, name)(OBJECT_ID), args.calls, args.concurrency)
+
+
+def run_async(server, name, http2, args):
+    """Measure an operation of the async client."""
+    async def main():
+        async with AsyncStoredSafe(
+                host=server.host, token=TOKEN, verify=server.cert, pool_size=args.concurrency, http2=http2) as api:
+            return await ameasure(lambda: getattr(api, name)(OBJECT_ID), args.calls, args.concurrency)
+    return asyncio.run(main())
+
+
+def run(args):
+    """Run every operation on every client and transport and return the results document."""
+    config = {'calls': args.calls, 'concurrency': args.concurrency, 'latency': args.latency}
+    results = []
+    with StandInServer(args.latency, http2=True) as server:
+        for name in OPERATIONS:
+            for client, runner in (('sync', run_sync), ('async', run_async)):
+                for transport, http2 in (('http/1.1', False), ('h2', True)):
+                    server.server.connections = 0
+                    result = {
+                        'operation': name, 'client': client, 'transport': transport,
+                        **runner(server, name, http2, args), 'connections': server.server.connections}
+                    results.append(result)
+                    print(
+                        f'{name:<16} {client:<6} {transport:<9} {result["calls_per_sec"]:>9.1f} calls/s  '
+                        f'p50 {result["p50"] * 1000:>7.2f} ms  p99 {result["p99"] * 1000:>7.2f} ms  '
+                        f'{result["connections"]:>4} connections', file=sys.stderr)
+    return {
+        'meta': {
+            'storedsafe': version(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': time.time(),
+            'config': config,
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    """Parse arguments, run the comparison and write the results."""
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.http2', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--calls', type=int, default=400, help='calls per operation, client and transport')
+    parser.add_argument('--concurrency', type=int, default=32, help='requests in flight at a time')
+    parser.add_argument('--latency', type=float, default=0.01, help='seconds the server waits per request')
+    parser.add_argument('--output', help='write the results as JSON to this path instead of stdout')
+    args = parser.parse_args(argv)
+
+    document = json.dumps(run(args), indent=2)
+    if args.output:
+        Path(args.output).write_text(document + '\n')
+    else:
+        print(document)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Local HTTPS stand-in for the StoredSafe API endpoints exercised by the benchmarks.
+
+Responses are rendered once up front, so the measured time is spent in the
+client and the transport rather than in the server. Every request can be
+delayed by a fixed latency to mimic a round trip to a real appliance. With
+http2, clients selecting h2 through ALPN are served over HTTP/2, with every
+stream answered concurrently, and the others over HTTP/1.1.
+"""
+import json
+import ssl
+import time
+import tempfile
+import threading
+from base64 import b64encode
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from storedsafe.fake import create_self_signed_cert
+from .h2bridge import H2TLSServer
+
+TOKEN = 'benchmark-token'
+VAULT_ID = 1
+OBJECT_ID = 1
+TEMPLATE = {'id': '1', 'info': {'name': 'Server', 'ico': 'server'}, 'structure': {
+    'host': {'translation': 'Host', 'encrypted': False},
+    'username': {'translation': 'Username', 'encrypted': False},
+    'password': {'translation': 'Password', 'encrypted': True},
+}}
+
+
+def listing_entry(object_id, secret_size=0):
+    """Get a vault listing entry, with a decrypted password of secret_size characters if non-zero."""
+    entry = {
+        'id': str(object_id), 'parentid': '0', 'templateid': '1', 'groupid': str(VAULT_ID),
+        'status': '128', 'objectname': f'host-{object_id}.example.com', 'filename': '',
+        'children': '0', 'notes': '', 'tags': 'benchmark',
+        'public': {'host': f'host-{object_id}.example.com', 'username': 'root'},
+    }
+    if secret_size:
+        entry['crypted'] = {'password': 'x' * secret_size}
+    return entry
+
+
+def render(data):
+    """Encode a response body."""
+    return json.dumps(data).encode()
+
+
+class Payloads:
+    """Pre-rendered response bodies by endpoint."""
+
+    def __init__(self, objects=100, file_size=1024 * 1024, secret_size=32):
+        callinfo = {'status': 'SUCCESS', 'errorcodes': 0, 'token': TOKEN}
+        entries = [listing_entry(object_id) for object_id in range(1, objects + 1)]
+        self.login = render({'CALLINFO': callinfo})
+        self.listing = render({'OBJECTS': entries, 'TEMPLATES': [TEMPLATE], 'CALLINFO': callinfo})
+        self.found = render({'OBJECT': entries, 'TEMPLATES': [TEMPLATE], 'CALLINFO': callinfo})
+        self.decrypted = render({
+            'OBJECT': [listing_entry(OBJECT_ID, secret_size)], 'TEMPLATES': [TEMPLATE], 'CALLINFO': callinfo})
+        self.file = render({
+            'OBJECT': [listing_entry(OBJECT_ID)], 'FILEDATA': b64encode(b'\0' * file_size).decode(),
+            'CALLINFO': callinfo})
+        self.created = render({'OBJECT': [listing_entry(OBJECT_ID)], 'CALLINFO': callinfo})
+        self.invalid = render({'ERRORS': ['Invalid token'], 'CALLINFO': {'status': 'FAIL', 'errorcodes': 1}})
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answer the benchmarked endpoints with pre-rendered payloads."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def __respond(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __drain(self):
+        """Read and discard the request body."""
+        remaining = int(self.headers.get('Content-Length') or 0)
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, 1024 * 1024)))
+
+    def __handle(self):
+        self.__drain()
+        payloads = self.server.payloads
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+        path = url.path[len('/api/1.0'):]
+        if path == '/auth' and self.command == 'POST':
+            self.__respond(200, payloads.login)
+        elif self.headers.get('X-Http-Token') != TOKEN:
+            self.__respond(403, payloads.invalid)
+        elif path.startswith('/vault/'):
+            self.__respond(200, payloads.listing)
+        elif path == '/find':
+            self.__respond(200, payloads.found)
+        elif path == '/object' and self.command == 'POST':
+            self.__respond(200, payloads.created)
+        elif path.startswith('/object/'):
+            query = parse_qs(url.query)
+            self.__respond(200, payloads.file if query.get('filedata') == ['true'] else payloads.decrypted)
+        else:
+            self.__respond(404, render({'ERRORS': ['Not found']}))
+
+    do_GET = do_POST = do_PUT = do_DELETE = __handle
+
+
+class StandInServer:
+    """Serve the stand-in handler over HTTPS from a background thread, and over HTTP/2 with http2."""
+
+    def __init__(self, latency=0.0, http2=False, **payload_options):
+        self.__tmpdir = tempfile.TemporaryDirectory()
+        self.cert, key = create_self_signed_cert(self.__tmpdir.name)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.cert, key)
+        context.set_alpn_protocols(['h2', 'http/1.1'] if http2 else ['http/1.1'])
+        self.server = H2TLSServer(('127.0.0.1', 0), StandInHandler, context)
+        self.server.latency = latency
+        self.server.payloads = Payloads(**payload_options)
+        self.host = f'127.0.0.1:{self.server.server_address[1]}'
+        self.__thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """Start serving in the background."""
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and clean up the certificate."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.__tmpdir.cleanup()
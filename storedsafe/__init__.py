@@ -1,7 +1,39 @@
-"""StoredSafe API wrapper module."""
+"""
+StoredSafe API wrapper module.
+
+The HTTP stack is imported on first request rather than with the package,
+so importing storedsafe stays cheap for short-lived scripts.
+"""
+import re
+import time
+import weakref
+import warnings
 from pathlib import Path
 from base64 import b64encode
-import requests
+from collections import OrderedDict
+from .batch import run_batch
+from .codec import get_codec
+from .cache import ResponseCache
+from .coalesce import RequestCoalescer
+from .secretcache import SecretCache
+from .multipart import MultipartFileEncoder, DEFAULT_CHUNK_SIZE
+from .filedata import FileDataDecoder
+from .iteration import ListingException, TreeWalk, ObjectTree, listing_entries  # pylint: disable=unused-import
+from .resilience import Attempts, CircuitOpenException  # pylint: disable=unused-import
+
+
+_HOST_PORT = re.compile(r'^(\[.*\]|[^:]*):\d+$')
+
+
+def _http2_support(http2):
+    """Get whether HTTP/2 can be used as requested, warning and falling back to HTTP/1.1 if h2 is missing."""
+    if not http2:
+        return False
+    from importlib.util import find_spec  # pylint: disable=import-outside-toplevel
+    if find_spec('httpx') is None or find_spec('h2') is None:
+        warnings.warn('HTTP/2 requires httpx[http2], falling back to HTTP/1.1', RuntimeWarning, stacklevel=3)
+        return False
+    return True
 
 
 class RCException(Exception):
@@ -16,12 +48,20 @@ class TokenUndefinedException(Exception):
     """Cannot use privileged StoredSafe API calls because token is not defined."""
 
 
+class FileDataMissingException(Exception):
+    """A successful file download response had no file data, e.g. because the object is not a file."""
+
+
 # pylint: disable=too-many-public-methods
-class StoredSafe:
-    """StoredSafe API wrapper class."""
+class StoredSafeBase:
+    """
+    Shared URL, header, auth and endpoint logic of the StoredSafe API wrappers.
 
-    @staticmethod
-    def from_rc(path=Path.home() / '.storedsafe-client.rc', **requests_options):
+    Subclasses provide the transport by implementing `_send` and `_then`.
+    """
+
+    @classmethod
+    def from_rc(cls, path=Path.home() / '.storedsafe-client.rc', **requests_options):
         """Create StoredSafe instance from rc-file"""
         config = {}
         try:
@@ -36,14 +76,72 @@ class StoredSafe:
                         config['token'] = value
         except Exception:
             raise RCException()
-        return StoredSafe(**config, **requests_options)
+        return cls(**config, **requests_options)
 
-    def __init__(self, host, apikey=None, token=None, version='1.0', **requests_options):
+    # pylint: disable=too-many-arguments
+    def __init__(
+            self, host, apikey=None, token=None, version='1.0', cache=None, metrics=None,
+            retry=None, circuit_breaker=None, mtls_port=8443, codec=None, coalesce=None, secret_cache=None,
+            **requests_options):
         self.host = host
+        self.mtls_port = mtls_port
         self.apikey = apikey
         self.token = token
         self.api_version = version
+        # Compared to False rather than tested for truth, since an empty cache has no length.
+        self.cache = ResponseCache() if cache is True else None if cache is False else cache
+        self.coalescer = RequestCoalescer() if coalesce is True else None if coalesce is False else coalesce
+        self.secret_cache = SecretCache() if secret_cache is True else None if secret_cache is False else secret_cache
+        self.metrics = metrics
+        self.retry = retry
+        self.circuit_breaker = circuit_breaker
         self.requests_options = requests_options
+        self.session_manager = None
+        self.__codec = codec
+        self.__file_headers = OrderedDict()
+
+    @property
+    def codec(self):
+        """
+        The JSON codec encoding request bodies and decoding responses.
+
+        Given as a name in storedsafe.codec.CODECS or a codec instance, or
+        selected from the installed backends on first use if None.
+        """
+        if self.__codec is None or isinstance(self.__codec, str):
+            self.__codec = get_codec(self.__codec)
+        return self.__codec
+
+    ###
+    # Transport methods.
+    ##
+    def _send(self, method, url, **args):
+        """Send a request with requests-style arguments and return the response."""
+        raise NotImplementedError()
+
+    def _then(self, res, callback):
+        """Apply callback to the result of `_send` and return the outcome."""
+        raise NotImplementedError()
+
+    def _resolve(self, res):
+        """Return an already received response the way `_send` would."""
+        raise NotImplementedError()
+
+    def _guard(self, send, cleanup):
+        """Call send() and run cleanup() once the request has finished or failed."""
+        raise NotImplementedError()
+
+    def _consume(self, res, sink, chunk_size):
+        """Feed the body of a streamed successful response to sink and close both."""
+        raise NotImplementedError()
+
+    def _coalesce(self, key, send):
+        """Return the result of send(), shared with identical requests in flight."""
+        raise NotImplementedError()
+
+    def _response(self, url, status_code, body):
+        """Build a JSON response with the body, returned the way `_send` would."""
+        raise NotImplementedError()
 
     ###
     # Helper methods.
@@ -63,30 +161,47 @@ class StoredSafe:
             headers['X-Http-Token'] = self.token
         return headers
 
+    def __json(self, data, args):
+        """Encode data with the codec as the JSON body of the request arguments, unless files are sent."""
+        if 'files' not in args:
+            args['headers'] = {'Content-Type': 'application/json', **args['headers']}
+            args['data'] = self.codec.dumps(data)
+        return args
+
     def __auth(self, data, mtls=False, **requests_options):
         """Authenticate with StoredSafe and save token if the request was successful."""
         self.__assert_apikey_exists()
-        res = requests.post(
-            self.__get_url('/auth', mtls), **{
+        res = self._send(
+            'post', self.__get_url('/auth', mtls), **self.__json(data, {
             **self.requests_options,
             **requests_options,
             'headers': self.__headers(requests_options, False)
-            }, json=data)
+            }))
+        return self._then(res, self.__save_token)
+
+    def __save_token(self, res):
+        """Save the token of a successful login response."""
         if res.status_code == 200:
             data = res.json()
             self.token = data['CALLINFO']['token']
         return res
 
-
     def __assert_token_exists(self):
         """Throws TokenUndefinedException if token is None."""
         if self.token is None:
             raise TokenUndefinedException()
 
+    def _origin(self, mtls=False, host=None):
+        """Get the scheme and authority of the API, or of its mTLS port replacing any port of host."""
+        host = self.host if host is None else host
+        if not mtls:
+            return f'https://{host}'
+        match = _HOST_PORT.match(host)
+        return f'https://{match.group(1) if match else host}:{self.mtls_port}'
+
     def __get_url(self, path, mtls=False):
         """Get the full url of the relative API path."""
-        port = mtls and ':8443' or ''
-        return f'https://{self.host}{port}/api/{self.api_version}/{path.strip("/")}'
+        return f'{self._origin(mtls)}/api/{self.api_version}/{path.strip("/")}'
 
     def __get(self, path, params=None, mtls=False, **requests_options):
         """Send a GET request to the provided relative API path."""
@@ -98,48 +213,138 @@ class StoredSafe:
         }
         if params is not None:
             args['params'] = params
-        return requests.get(
-            self.__get_url(path, mtls), **args)
+        url = self.__get_url(path, mtls)
+        if self.coalescer is None or args.get('stream'):
+            send = lambda: self._send('get', url, **args)
+        else:
+            coalesce_key = self.coalescer.key(path, params, self.token)
+            send = lambda: self._coalesce(coalesce_key, lambda: self._send('get', url, **args))
+        ttl = self.cache is not None and self.cache.ttl(path)
+        if not ttl:
+            return send()
+        key = self.cache.key(path, params, self.token)
+        res = self.cache.get(key)
+        if res is not None:
+            return self._resolve(res)
+        generation = self.cache.generation(path)
+        return self._then(send(), lambda res: self.__cache_response(key, res, ttl, generation))
+
+    def __cache_secret(self, object_id, token, res, generation):
+        """Cache the body of a successful decrypt response, unless the object was changed meanwhile."""
+        if res.status_code == 200:
+            self.secret_cache.put(object_id, token, res.content, generation)
+        return res
+
+    def __forget_secret(self, object_id, send):
+        """
+        Wipe the cached decryption of an object changed by the request of
+        send(), before it is sent and again once it is done, in case a
+        decryption in flight cached the old secret meanwhile. Decryptions in
+        flight completing later see the object's generation advanced and do
+        not cache.
+        """
+        if self.secret_cache is None:
+            return send()
+        self.secret_cache.invalidate(object_id)
+
+        def forget(res):
+            self.secret_cache.invalidate(object_id)
+            return res
+        return self._then(send(), forget)
+
+    def __cache_response(self, key, res, ttl, generation):
+        """Cache the response if the request was successful and nothing it depends on changed meanwhile."""
+        if res.status_code == 200:
+            self.cache.put(key, res, ttl, generation)
+        return res
+
+    def __invalidate(self, path, send):
+        """
+        Drop cached responses affected by a change to the relative API path,
+        before the request of send() is sent and again once it is done, in
+        case a read in flight cached the old data meanwhile. Reads in flight
+        completing later see the generation advanced and do not cache.
+        """
+        if self.cache is None:
+            return send()
+        self.cache.invalidate(path)
+
+        def invalidate(res):
+            self.cache.invalidate(path)
+            return res
+        return self._then(send(), invalidate)
 
     def __post(self, path, data={}, mtls=False, **requests_options):
         """Send a POST request to the provided relative API path."""
         self.__assert_token_exists()
-        return requests.post(
-            self.__get_url(path, mtls), **{
+        return self.__invalidate(path, lambda: self._send(
+            'post', self.__get_url(path, mtls), **self.__json(data, {
                 **self.requests_options,
                 **requests_options,
                 'headers': self.__headers(requests_options)
-            }, json=data)
+            })))
 
     def __put(self, path, data={}, mtls=False, **requests_options):
         """Send a PUT request to the provided relative API path."""
         self.__assert_token_exists()
-        return requests.put(
-            self.__get_url(path, mtls), **{
+        return self.__invalidate(path, lambda: self._send(
+            'put', self.__get_url(path, mtls), **self.__json(data, {
                 **self.requests_options,
                 **requests_options,
                 'headers': self.__headers(requests_options)
-            }, json=data)
+            })))
 
     def __delete(self, path, mtls=False, **requests_options):
         """Send a DELETE request to the provided relative API path."""
         self.__assert_token_exists()
-        return requests.delete(
-            self.__get_url(path, mtls), **{
+        return self.__invalidate(path, lambda: self._send(
+            'delete', self.__get_url(path, mtls), **{
                 **self.requests_options,
                 **requests_options,
                 'headers': self.__headers(requests_options)
-            })
+            }))
 
     def __post_file(self, path, file, data={}, mtls=False, **requests_options):
         """Send a POST request to the provided relative API path."""
         self.__assert_token_exists()
-        return requests.post(
-            self.__get_url(path, mtls), **{
+        return self.__invalidate(path, lambda: self._send(
+            'post', self.__get_url(path, mtls), **{
                 **self.requests_options,
                 **requests_options,
                 'headers': self.__headers(requests_options)
-            }, files={'upload': file}, data=data)
+            }, files={'upload': file}, data=data))
+
+    def __post_stream(self, path, encoder, mtls=False, **requests_options):
+        """Send a POST request with a streaming multipart body, closing it when done."""
+        self.__assert_token_exists()
+        headers = self.__headers(requests_options)
+        headers['Content-Type'] = encoder.content_type
+        headers['Content-Length'] = str(len(encoder))
+        return self.__invalidate(path, lambda: self._guard(lambda: self._send(
+            'post', self.__get_url(path, mtls), **{
+                **self.requests_options,
+                **requests_options,
+                'headers': headers
+            }, data=encoder), encoder.close))
+
+    def __file_header(self, file):
+        """
+        Read the first 64 bytes of a file, used to detect its type.
+
+        The last few headers are kept, so checking, collecting and uploading
+        the same unchanged file only reads the header once.
+        """
+        path = Path(file)
+        stat = path.stat()
+        key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+        header = self.__file_headers.get(key)
+        if header is None:
+            with path.open('rb') as f:
+                header = f.read(64)
+            self.__file_headers[key] = header
+            while len(self.__file_headers) > 8:
+                self.__file_headers.popitem(last=False)
+        return header
 
     ###
     # API Auth methods.
@@ -224,13 +429,30 @@ class StoredSafe:
     ###
     # API Object methods.
     ##
-    def get_object(self, object_id, children=False, requests_options={}):
-        """Request a StoredSafe object and optionally its children."""
-        return self.__get(f'/object/{object_id}', {'children': 'true' if children else 'false'}, **requests_options)
+    def get_object(self, object_id, children=False, requests_options={}, decrypt=False):
+        """Request a StoredSafe object and optionally its children, decrypted if decrypt is True."""
+        params = {'children': 'true' if children else 'false'}
+        if decrypt:
+            params['decrypt'] = 'true'
+        return self.__get(f'/object/{object_id}', params, **requests_options)
 
     def decrypt_object(self, object_id, requests_options={}):
-        """Request the decryption of a StoredSafe object."""
-        return self.__get(f'/object/{object_id}', {'decrypt': 'true'}, **requests_options)
+        """
+        Request the decryption of a StoredSafe object.
+
+        With a secret cache, a recent successful decryption of the object in
+        the same session is returned without a request.
+        """
+        if self.secret_cache is None:
+            return self.__get(f'/object/{object_id}', {'decrypt': 'true'}, **requests_options)
+        token = self.token
+        body = self.secret_cache.get(object_id, token)
+        if body is not None:
+            return self._response(self.__get_url(f'/object/{object_id}'), 200, body)
+        generation = self.secret_cache.generation(object_id)
+        return self._then(
+            self.__get(f'/object/{object_id}', {'decrypt': 'true'}, **requests_options),
+            lambda res: self.__cache_secret(object_id, token, res, generation))
 
     def create_object(self, requests_options={}, **params):
         """Request the creation of an object."""
@@ -238,11 +460,12 @@ class StoredSafe:
 
     def edit_object(self, object_id, requests_options={}, **params):
         """Request the edit of an existing object."""
-        return self.__put(f'/object/{object_id}', params, **requests_options)
+        return self.__forget_secret(
+            object_id, lambda: self.__put(f'/object/{object_id}', params, **requests_options))
 
     def delete_object(self, object_id, requests_options={}):
         """Request the deletion of an object."""
-        return self.__delete(f'/object/{object_id}', **requests_options)
+        return self.__forget_secret(object_id, lambda: self.__delete(f'/object/{object_id}', **requests_options))
 
     def find(self, needle, requests_options={}):
         """Request all objects with searchable fields matching the needle."""
@@ -257,27 +480,52 @@ class StoredSafe:
         path = Path(file)
         data['extension'] = path.suffix
         data['size'] = path.stat().st_size
-        with open(file, 'rb') as f:
-            data['data'] = b64encode(f.read(64)).decode("utf-8")
+        data['data'] = b64encode(self.__file_header(file)).decode("utf-8")
         return self.__post('/utils/get_mime_type', { **data, **params }, **requests_options)
 
     def filecollect(self, file, requests_options={}, **params):
         """Request the appropriate template for the file."""
         path = Path(file)
-        with path.open('rb') as f:
-            data = f.read(64)
-        return self.__post_file('/filecollect', (path.name, data), params, **requests_options)
+        return self.__post_file('/filecollect', (path.name, self.__file_header(file)), params, **requests_options)
 
-    def upload_file(self, file, requests_options={}, **params):
-        """Request the creation of a file object."""
+    def upload_file(self, file, requests_options={}, progress=None, chunk_size=DEFAULT_CHUNK_SIZE, **params):
+        """
+        Request the creation of a file object.
+
+        The file is streamed in chunks of chunk_size bytes and closed when the
+        request is done. If given, progress is called with an UploadProgress
+        after every chunk.
+        """
+        self.__assert_token_exists()
         if not params.get('templateid'):
             params['templateid'] = 3
-        return self.__post_file('/object', open(file, 'rb'), params, **requests_options)
+        encoder = MultipartFileEncoder.from_path(
+            params, 'upload', file, self.__file_header(file), chunk_size=chunk_size, callback=progress)
+        return self.__post_stream('/object', encoder, **requests_options)
 
     def get_file(self, object_id, requests_options={}):
         """Request a base64 string of a file object."""
         return self.__get(f'/object/{object_id}', {'decrypt': 'true', 'filedata': 'true'}, **requests_options)
 
+    def download_file(self, object_id, dest, chunk_size=DEFAULT_CHUNK_SIZE, requests_options={}):
+        """
+        Request a file object and decode its file data straight into dest.
+
+        dest is a path or a writable binary buffer. The response is streamed and
+        decoded in chunks, so memory use does not grow with the file size. On
+        success the body is consumed by the download, otherwise it is read as usual.
+        Raises FileDataMissingException if a successful response has no file data.
+        """
+        res = self.__get(
+            f'/object/{object_id}', {'decrypt': 'true', 'filedata': 'true'}, stream=True, **requests_options)
+        decoder = FileDataDecoder(dest)
+
+        def downloaded(res):
+            if res.status_code == 200 and not decoder.found:
+                raise FileDataMissingException(f'Object {object_id} has no file data')
+            return res
+        return self._then(self._consume(res, decoder, chunk_size), downloaded)
+
 
     ###
     # API Templates methods.
@@ -346,3 +594,262 @@ class StoredSafe:
     def generate_password(self, requests_options={}, **params):
         """Request a password generated with the passed settings (or vault policy)."""
         return self.__get('/utils/pwgen', params, **requests_options)
+
+
+class StoredSafe(StoredSafeBase):
+    """
+    StoredSafe API wrapper class.
+
+    With http2, requests are sent through an httpx-based adapter that
+    multiplexes concurrent requests over one connection per port when the
+    server negotiates HTTP/2, and uses HTTP/1.1 when it does not.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+            self, host, apikey=None, token=None, version='1.0',
+            pool_size=10, mtls_pool_size=None, max_retries=0, keep_alive=True,
+            cache=None, metrics=None, retry=None, circuit_breaker=None, mtls_port=8443, codec=None,
+            coalesce=None, secret_cache=None, http2=False, **requests_options):
+        super().__init__(
+            host, apikey, token, version, cache, metrics, retry, circuit_breaker, mtls_port, codec, coalesce,
+            secret_cache, **requests_options)
+        self.pool_size = pool_size
+        self.mtls_pool_size = pool_size if mtls_pool_size is None else mtls_pool_size
+        self.max_retries = max_retries
+        self.keep_alive = keep_alive
+        self.http2 = _http2_support(http2)
+        self.__session = None
+        self.__sockets = weakref.WeakSet()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def session(self):
+        """
+        The pooled session shared by all requests of this instance.
+
+        The normal API port and the mTLS port are mounted on separate adapters
+        so each gets its own connection pool. The session is created on first use.
+        """
+        if self.__session is None:
+            import requests  # pylint: disable=import-outside-toplevel
+            session = requests.Session()
+            session.mount(f'{self._origin()}/', self._adapter(self.pool_size))
+            session.mount(f'{self._origin(mtls=True)}/', self._adapter(self.mtls_pool_size))
+            if not self.keep_alive:
+                session.headers['Connection'] = 'close'
+            if self.metrics is not None:
+                session.hooks['response'].append(lambda res, **kwargs: self.__track_connection(res))
+            session.hooks['response'].append(lambda res, **kwargs: self.codec.bind(res))
+            self.__session = session
+        return self.__session
+
+    def _adapter(self, pool_size):
+        """Build the transport adapter of one connection pool."""
+        # pylint: disable=import-outside-toplevel
+        if self.http2:
+            from .http2 import HTTP2Adapter
+            return HTTP2Adapter(pool_maxsize=pool_size, max_retries=self.max_retries, keep_alive=self.keep_alive)
+        from requests.adapters import HTTPAdapter
+        return HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=self.max_retries)
+
+    def __track_connection(self, res):
+        """Note on a response if it was received over a connection used before, told apart by its socket."""
+        if hasattr(res, 'connection_reused'):
+            return
+        sock = getattr(getattr(res.raw, 'connection', None), 'sock', None)
+        if sock is None:
+            res.connection_reused = None
+        elif sock in self.__sockets:
+            res.connection_reused = True
+        else:
+            self.__sockets.add(sock)
+            res.connection_reused = False
+
+    def close(self):
+        """Close the session and release all pooled connections."""
+        if self.__session is not None:
+            self.__session.close()
+            self.__session = None
+
+    def _send(self, method, url, **args):
+        manager = self.session_manager
+        generation = manager and manager.generation
+        res = self.__attempt(method, url, **args)
+        if manager is not None and manager.expired(url, args, res):
+            if manager.refresh(generation):
+                res.close()
+                args['headers'] = {**args['headers'], 'X-Http-Token': self.token}
+                res = self.__attempt(method, url, **args)
+        return res
+
+    def __attempt(self, method, url, **args):
+        """Send a request, retrying it under the retry policy and circuit breaker if enabled."""
+        if self.retry is None and self.circuit_breaker is None:
+            return self.__send(method, url, **args)
+        import requests  # pylint: disable=import-outside-toplevel
+        attempts = Attempts(self.retry, self.circuit_breaker, method)
+        while True:
+            attempts.before()
+            try:
+                res = self.__send(method, url, **args)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                time.sleep(attempts.failed(error))
+                continue
+            except BaseException:
+                attempts.abandoned()
+                raise
+            delay = attempts.responded(res)
+            if delay is None:
+                return res
+            res.close()
+            time.sleep(delay)
+
+    def __send(self, method, url, **args):
+        """Send a single request through the session, recording metrics if enabled."""
+        if self.metrics is None:
+            return getattr(self.session, method)(url, **args)
+        started = time.perf_counter()
+        try:
+            res = getattr(self.session, method)(url, **args)
+        except Exception:
+            self.metrics.record(method, url, time.perf_counter() - started)
+            raise
+        self.metrics.record(method, url, time.perf_counter() - started, res, args.get('stream', False))
+        return res
+
+    def _then(self, res, callback):
+        return callback(res)
+
+    def _resolve(self, res):
+        return res
+
+    def _guard(self, send, cleanup):
+        try:
+            return send()
+        finally:
+            cleanup()
+
+    def _consume(self, res, sink, chunk_size):
+        try:
+            if res.status_code == 200:
+                for chunk in res.iter_content(chunk_size):
+                    sink.feed(chunk)
+            else:
+                res.content  # pylint: disable=pointless-statement
+        finally:
+            sink.close()
+            res.close()
+        return res
+
+    def _coalesce(self, key, send):
+        return self.coalescer.call(key, send)
+
+    def _response(self, url, status_code, body):
+        import requests  # pylint: disable=import-outside-toplevel
+        res = requests.Response()
+        res.status_code = status_code
+        res.url = url
+        res.encoding = 'utf-8'
+        res.headers['Content-Type'] = 'application/json'
+        res._content = body  # pylint: disable=protected-access
+        return self.codec.bind(res)
+
+    ###
+    # Batch methods.
+    ##
+    def __batch(self, func, items, max_workers, as_completed):
+        """Run func over items on a bounded worker pool sharing the session."""
+        results = run_batch(func, items, max_workers or self.pool_size, ordered=not as_completed)
+        return results if as_completed else list(results)
+
+    def decrypt_objects(self, object_ids, max_workers=None, as_completed=False, requests_options={}):
+        """
+        Request the decryption of many StoredSafe objects concurrently.
+
+        Returns a list of BatchResult in input order, or an iterator yielding
+        them as they complete if as_completed is True. Errors are collected per
+        item. max_workers defaults to the pool size.
+        """
+        return self.__batch(
+            lambda object_id: self.decrypt_object(object_id, requests_options),
+            object_ids, max_workers, as_completed)
+
+    def get_objects(self, object_ids, children=False, max_workers=None, as_completed=False, requests_options={}):
+        """Request many StoredSafe objects concurrently, see decrypt_objects."""
+        return self.__batch(
+            lambda object_id: self.get_object(object_id, children, requests_options),
+            object_ids, max_workers, as_completed)
+
+    ###
+    # Iteration methods.
+    ##
+    def iter_vaults(self, requests_options={}):
+        """Yield the entries of all vaults, raising ListingException if the listing fails."""
+        yield from listing_entries(self.list_vaults(requests_options), 'vaults', 'VAULTS')
+
+    def iter_users(self, search=None, requests_options={}):
+        """Yield the entries of all users, or of the users matching search."""
+        yield from listing_entries(self.list_users(search, requests_options), 'users', 'USERS', 'USER')
+
+    def iter_objects(self, vault_id=None, prefetch=True, requests_options={}):
+        """
+        Yield the listing entries of the objects in a vault, or in all vaults.
+
+        With prefetch, the listing of the next vault is fetched in the
+        background while the entries of the current one are consumed.
+        """
+        if vault_id is not None:
+            vault_ids = [vault_id]
+        else:
+            vault_ids = [vault['id'] for vault in self.iter_vaults(requests_options)]
+
+        def fetch(vault_id):
+            return listing_entries(self.vault_objects(vault_id, requests_options), f'vault {vault_id}', 'OBJECTS')
+
+        if not prefetch or len(vault_ids) < 2:
+            for vault_id in vault_ids:
+                yield from fetch(vault_id)
+            return
+        from concurrent.futures import ThreadPoolExecutor  # pylint: disable=import-outside-toplevel
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(fetch, vault_ids[0])
+            try:
+                for index in range(1, len(vault_ids) + 1):
+                    entries = future.result()
+                    future = executor.submit(fetch, vault_ids[index]) if index < len(vault_ids) else None
+                    yield from entries
+            finally:
+                if future is not None:
+                    future.cancel()
+
+    def fetch_tree(self, object_id, depth=None, decrypt=False, max_workers=None, requests_options={}):
+        """
+        Get an ObjectTree of an object and its descendants down to depth,
+        fetched with concurrent get_object requests when iterated or completed.
+
+        Iterating it yields a TreeNode per object as soon as it arrives, while
+        its parents, children and depths index is filled in. max_workers
+        defaults to the pool size.
+        """
+        return ObjectTree(
+            object_id, lambda object_id: self.get_object(object_id, True, requests_options, decrypt),
+            depth, max_workers or self.pool_size)
+
+    def walk_tree(self, object_id, requests_options={}):
+        """
+        Yield the entry of an object and of all its descendants, depth first
+        with every parent before its children, fetching subtrees as needed.
+        """
+        walk = TreeWalk(object_id)
+        while walk:
+            missing = walk.missing()
+            if missing is not None:
+                res = self.get_object(missing, True, requests_options)
+                walk.add(missing, listing_entries(res, f'object {missing}', 'OBJECT'))
+            yield walk.take()
@@ -0,0 +1,295 @@
+"""Asyncio StoredSafe API wrapper module."""
+import os
+import ssl
+import time
+import asyncio
+import weakref
+import httpx
+from . import StoredSafeBase, TreeWalk, ObjectTree, listing_entries, _http2_support
+from .resilience import Attempts
+from .batch import arun_batch
+
+# Options accepted by requests that httpx only supports on the client.
+_CLIENT_OPTIONS = ('verify', 'cert', 'proxies')
+
+
+class AsyncStoredSafe(StoredSafeBase):
+    """
+    Asyncio StoredSafe API wrapper class.
+
+    Exposes the same methods as StoredSafe, but every API method returns a
+    coroutine resolving to a `httpx.Response`. Requests-style options such as
+    `timeout`, `verify`, `cert` and `headers` are translated for httpx.
+    With http2, concurrent requests share one connection per port when the
+    server negotiates HTTP/2.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+            self, host, apikey=None, token=None, version='1.0',
+            pool_size=10, mtls_pool_size=None, max_retries=0, keep_alive=True,
+            cache=None, metrics=None, retry=None, circuit_breaker=None, mtls_port=8443, codec=None,
+            coalesce=None, secret_cache=None, http2=False, **requests_options):
+        super().__init__(
+            host, apikey, token, version, cache, metrics, retry, circuit_breaker, mtls_port, codec, coalesce,
+            secret_cache, **requests_options)
+        self.pool_size = pool_size
+        self.mtls_pool_size = pool_size if mtls_pool_size is None else mtls_pool_size
+        self.max_retries = max_retries
+        self.keep_alive = keep_alive
+        self.http2 = _http2_support(http2)
+        self.__clients = {}
+        self.__streams = weakref.WeakSet()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close all clients and release all pooled connections."""
+        clients, self.__clients = self.__clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def __client(self, mtls, verify=True, cert=None, proxies=None):
+        """Get the pooled client for the port and TLS settings, created on first use."""
+        key = (mtls, verify, cert, proxies if proxies is None else tuple(sorted(proxies.items())))
+        client = self.__clients.get(key)
+        if client is None:
+            pool_size = self.mtls_pool_size if mtls else self.pool_size
+            limits = httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size if self.keep_alive else 0)
+            proxy = None
+            if proxies:
+                proxy = proxies.get('https') or proxies.get('all')
+            client = httpx.AsyncClient(
+                timeout=None,
+                transport=httpx.AsyncHTTPTransport(
+                    verify=_ssl_context(verify, cert), http2=self.http2, limits=limits, retries=self.max_retries,
+                    proxy=proxy))
+            self.__clients[key] = client
+        return client
+
+    async def _send(self, method, url, **args):
+        manager = self.session_manager
+        generation = manager and manager.generation
+        res = await self.__attempt(method, url, **args)
+        if manager is not None and res.status_code in (401, 403):
+            await res.aread()
+        if manager is not None and manager.expired(url, args, res):
+            if await manager.refresh(generation):
+                await res.aclose()
+                args['headers'] = {**args['headers'], 'X-Http-Token': self.token}
+                res = await self.__attempt(method, url, **args)
+        return res
+
+    async def __attempt(self, method, url, **args):
+        """Send a request, retrying it under the retry policy and circuit breaker if enabled."""
+        if self.retry is None and self.circuit_breaker is None:
+            return await self.__send(method, url, **args)
+        attempts = Attempts(self.retry, self.circuit_breaker, method)
+        while True:
+            attempts.before()
+            try:
+                res = await self.__send(method, url, **args)
+            except httpx.TransportError as error:
+                await asyncio.sleep(attempts.failed(error))
+                continue
+            except BaseException:
+                attempts.abandoned()
+                raise
+            delay = attempts.responded(res)
+            if delay is None:
+                return res
+            await res.aclose()
+            await asyncio.sleep(delay)
+
+    async def __send(self, method, url, **args):
+        """Send a single request through the pooled client, recording metrics if enabled."""
+        client_options = {key: args.pop(key) for key in _CLIENT_OPTIONS if key in args}
+        stream = args.pop('stream', False)
+        follow_redirects = args.pop('allow_redirects', True)
+        if hasattr(args.get('data'), '__aiter__'):
+            args['content'] = args.pop('data').__aiter__()
+        elif isinstance(args.get('data'), bytes):
+            args['content'] = args.pop('data')
+        if isinstance(args.get('timeout'), tuple):
+            connect, read = args['timeout']
+            args['timeout'] = httpx.Timeout(None, connect=connect, read=read)
+        mtls = url.startswith(f'{self._origin(mtls=True)}/')
+        client = self.__client(mtls, **client_options)
+        request = client.build_request(method.upper(), url, **args)
+        if self.metrics is None:
+            return self.codec.bind(await client.send(request, stream=stream, follow_redirects=follow_redirects))
+        started = time.perf_counter()
+        try:
+            res = await client.send(request, stream=stream, follow_redirects=follow_redirects)
+        except Exception:
+            self.metrics.record(method, url, time.perf_counter() - started)
+            raise
+        res.connection_reused = self.__reused(res)
+        self.metrics.record(method, url, time.perf_counter() - started, res, stream)
+        return self.codec.bind(res)
+
+    def __reused(self, res):
+        """Check if a response was received over a connection used before, or None if unknown."""
+        stream = res.extensions.get('network_stream')
+        if stream is None:
+            return None
+        if stream in self.__streams:
+            return True
+        self.__streams.add(stream)
+        return False
+
+    async def _then(self, res, callback):
+        return callback(await res)
+
+    async def _resolve(self, res):
+        return res
+
+    async def _guard(self, send, cleanup):
+        try:
+            return await send()
+        finally:
+            cleanup()
+
+    async def _consume(self, res, sink, chunk_size):
+        res = await res
+        try:
+            if res.status_code == 200:
+                async for chunk in res.aiter_bytes(chunk_size):
+                    sink.feed(chunk)
+            else:
+                await res.aread()
+        finally:
+            sink.close()
+            await res.aclose()
+        return res
+
+    def _coalesce(self, key, send):
+        return self.coalescer.acall(key, send)
+
+    async def _response(self, url, status_code, body):
+        return self.codec.bind(httpx.Response(
+            status_code, content=body, headers={'Content-Type': 'application/json'},
+            request=httpx.Request('GET', url)))
+
+    ###
+    # Batch methods.
+    ##
+    def __batch(self, func, items, max_workers, as_completed):
+        """Run func over items with bounded concurrency sharing the client pool."""
+        results = arun_batch(func, items, max_workers or self.pool_size, ordered=not as_completed)
+        return results if as_completed else _collect(results)
+
+    def decrypt_objects(self, object_ids, max_workers=None, as_completed=False, requests_options={}):
+        """
+        Request the decryption of many StoredSafe objects concurrently.
+
+        Returns a coroutine resolving to a list of BatchResult in input order, or
+        an async iterator yielding them as they complete if as_completed is True.
+        """
+        return self.__batch(
+            lambda object_id: self.decrypt_object(object_id, requests_options),
+            object_ids, max_workers, as_completed)
+
+    def get_objects(self, object_ids, children=False, max_workers=None, as_completed=False, requests_options={}):
+        """Request many StoredSafe objects concurrently, see decrypt_objects."""
+        return self.__batch(
+            lambda object_id: self.get_object(object_id, children, requests_options),
+            object_ids, max_workers, as_completed)
+
+    ###
+    # Iteration methods.
+    ##
+    async def iter_vaults(self, requests_options={}):
+        """Yield the entries of all vaults, raising ListingException if the listing fails."""
+        for vault in listing_entries(await self.list_vaults(requests_options), 'vaults', 'VAULTS'):
+            yield vault
+
+    async def iter_users(self, search=None, requests_options={}):
+        """Yield the entries of all users, or of the users matching search."""
+        for user in listing_entries(await self.list_users(search, requests_options), 'users', 'USERS', 'USER'):
+            yield user
+
+    async def iter_objects(self, vault_id=None, prefetch=True, requests_options={}):
+        """
+        Yield the listing entries of the objects in a vault, or in all vaults.
+
+        With prefetch, the listing of the next vault is fetched in a task
+        while the entries of the current one are consumed.
+        """
+        if vault_id is not None:
+            vault_ids = [vault_id]
+        else:
+            vault_ids = [vault['id'] async for vault in self.iter_vaults(requests_options)]
+
+        async def fetch(vault_id):
+            res = await self.vault_objects(vault_id, requests_options)
+            return listing_entries(res, f'vault {vault_id}', 'OBJECTS')
+
+        if not prefetch:
+            for vault_id in vault_ids:
+                for entry in await fetch(vault_id):
+                    yield entry
+            return
+        task = asyncio.ensure_future(fetch(vault_ids[0])) if vault_ids else None
+        try:
+            for index in range(1, len(vault_ids) + 1):
+                entries = await task
+                task = asyncio.ensure_future(fetch(vault_ids[index])) if index < len(vault_ids) else None
+                for entry in entries:
+                    yield entry
+        finally:
+            if task is not None:
+                task.cancel()
+
+    def fetch_tree(self, object_id, depth=None, decrypt=False, max_workers=None, requests_options={}):
+        """
+        Get an ObjectTree of an object and its descendants down to depth, see
+        StoredSafe.fetch_tree. Iterate it with async for, or await acomplete().
+        """
+        return ObjectTree(
+            object_id, lambda object_id: self.get_object(object_id, True, requests_options, decrypt),
+            depth, max_workers or self.pool_size)
+
+    async def walk_tree(self, object_id, requests_options={}):
+        """
+        Yield the entry of an object and of all its descendants, depth first
+        with every parent before its children, fetching subtrees as needed.
+        """
+        walk = TreeWalk(object_id)
+        while walk:
+            missing = walk.missing()
+            if missing is not None:
+                res = await self.get_object(missing, True, requests_options)
+                walk.add(missing, listing_entries(res, f'object {missing}', 'OBJECT'))
+            yield walk.take()
+
+
+async def _collect(results):
+    """Gather the results of an async batch into a list."""
+    return [result async for result in results]
+
+
+def _ssl_context(verify, cert):
+    """Build the SSL context equivalent of the requests `verify` and `cert` options."""
+    if verify is False:
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    elif isinstance(verify, str) and os.path.isdir(verify):
+        context = ssl.create_default_context(capath=verify)
+    elif isinstance(verify, str):
+        context = ssl.create_default_context(cafile=verify)
+    else:
+        context = ssl.create_default_context()
+    if cert is not None:
+        if isinstance(cert, str):
+            context.load_cert_chain(cert)
+        else:
+            context.load_cert_chain(*cert)
+    return context
@@ -0,0 +1,151 @@
+"""Bounded concurrent execution of StoredSafe API calls."""
+import time
+import threading
+from collections import deque
+
+
+class BatchResult:
+    """Outcome of one item in a batch, either a response or the raised error."""
+
+    __slots__ = ('index', 'item', 'response', 'error')
+
+    def __init__(self, index, item, response=None, error=None):
+        self.index = index
+        self.item = item
+        self.response = response
+        self.error = error
+
+    @property
+    def ok(self):
+        """True if the request was sent and answered with a successful status."""
+        return self.error is None and self.response.status_code == 200
+
+    def __repr__(self):
+        outcome = self.error if self.error is not None else self.response.status_code
+        return f'BatchResult({self.index}, {self.item!r}, {outcome!r})'
+
+
+class RateLimiter:
+    """Token bucket allowing rate calls per second in bursts of up to burst calls."""
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+        self.tokens = self.burst
+        self.__clock = clock
+        self.__updated = clock()
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token and return 0, or return the seconds until one is available."""
+        with self.__lock:
+            now = self.__clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def wait(self):
+        """Block until a token is taken."""
+        delay = self.acquire()
+        while delay:
+            time.sleep(delay)
+            delay = self.acquire()
+
+
+def run_batch(func, items, max_workers, ordered=True, limiter=None):
+    """
+    Call func(item) for every item on a bounded thread pool and yield a
+    BatchResult per item, in input order or as soon as each one completes.
+
+    At most 2 * max_workers items are in flight or buffered at any time, so
+    items may be a lazy iterable of any length. Exceptions raised by func are
+    collected on the result instead of aborting the batch. If given, the
+    RateLimiter limiter paces the calls.
+    """
+    # pylint: disable=import-outside-toplevel
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    def call(index, item):
+        try:
+            if limiter is not None:
+                limiter.wait()
+            return BatchResult(index, item, response=func(item))
+        except Exception as error:  # pylint: disable=broad-except
+            return BatchResult(index, item, error=error)
+
+    window = max(1, max_workers) * 2
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        pending = deque()
+        items = iter(enumerate(items))
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < window:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append(executor.submit(call, index, item))
+            if not pending:
+                return
+            try:
+                if ordered:
+                    yield pending.popleft().result()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                        yield future.result()
+            except GeneratorExit:
+                for future in pending:
+                    future.cancel()
+                raise
+
+
+async def arun_batch(func, items, max_workers, ordered=True, limiter=None):
+    """
+    Asyncio counterpart of run_batch, where func(item) returns an awaitable.
+
+    This is an async generator yielding a BatchResult per item.
+    """
+    import asyncio  # pylint: disable=import-outside-toplevel
+
+    async def call(index, item):
+        try:
+            if limiter is not None:
+                delay = limiter.acquire()
+                while delay:
+                    await asyncio.sleep(delay)
+                    delay = limiter.acquire()
+            return BatchResult(index, item, response=await func(item))
+        except Exception as error:  # pylint: disable=broad-except
+            return BatchResult(index, item, error=error)
+
+    window = max(1, max_workers)
+    pending = deque()
+    items = iter(enumerate(items))
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < window:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.append(asyncio.ensure_future(call(index, item)))
+            if not pending:
+                return
+            if ordered:
+                yield await pending.popleft()
+            else:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,177 @@
+"""Bulk edit and delete of StoredSafe objects with dry-run diffing."""
+from .batch import run_batch, RateLimiter
+from .index import listing_objects
+from .models import Listing, Template
+
+# Object attributes edited directly rather than as template fields.
+OBJECT_ATTRIBUTES = ('objectname', 'tags', 'parentid', 'groupid')
+
+EDIT = 'edit'
+DELETE = 'delete'
+
+# Stand-in for the values of encrypted fields in dry-run reports.
+MASK = '***'
+
+
+class BulkSelectionException(Exception):
+    """Failed to fetch the objects matching a selector."""
+
+
+def field_value(entry, field):
+    """Get the current value of an object attribute or template field, or None if unset."""
+    if field in OBJECT_ATTRIBUTES:
+        return entry.get(field)
+    for values in (entry.get('public'), entry.get('crypted')):
+        if isinstance(values, dict) and field in values:
+            return values[field]
+    return None
+
+
+def encrypted_fields(data, entry):
+    """Get the names of the encrypted fields of an object entry, from the templates of its response."""
+    fields = set(entry.get('crypted') or ())
+    for template in Listing(data.get('TEMPLATES', data.get('TEMPLATE')), Template):
+        if template.id == str(entry.get('templateid')):
+            fields.update(template.encrypted_fields)
+    return frozenset(fields)
+
+
+class ObjectChange:
+    """
+    Planned change of one object, with the diff of its fields as {field: (old, new)}
+    and the names of its encrypted fields in encrypted.
+    """
+
+    __slots__ = ('object_id', 'action', 'before', 'diff', 'encrypted')
+
+    def __init__(self, object_id, action, before, diff, encrypted=frozenset()):
+        self.object_id = object_id
+        self.action = action
+        self.before = before
+        self.diff = diff
+        self.encrypted = encrypted
+
+    @property
+    def changed(self):
+        """True if applying the change would modify the object."""
+        return self.action == DELETE or bool(self.diff)
+
+    def __repr__(self):
+        return f'ObjectChange({self.object_id!r}, {self.action!r}, {self.diff!r})'
+
+
+class BulkPlan:
+    """The changes of a bulk edit or delete, and the objects that could not be fetched."""
+
+    __slots__ = ('action', 'changes', 'errors')
+
+    def __init__(self, action):
+        self.action = action
+        self.changes = []
+        self.errors = {}
+
+    def report(self, show_secrets=False):
+        """
+        Get a dry-run report of the plan. The old and new values of encrypted
+        fields are replaced by MASK unless show_secrets is True.
+        """
+        def values(change, field, old_new):
+            if show_secrets or field not in change.encrypted:
+                return list(old_new)
+            return [None if value is None else MASK for value in old_new]
+
+        changed = [change for change in self.changes if change.changed]
+        return {
+            'action': self.action,
+            'selected': len(self.changes) + len(self.errors),
+            'changed': len(changed),
+            'unchanged': len(self.changes) - len(changed),
+            'errors': dict(self.errors),
+            'diff': {
+                change.object_id: {field: values(change, field, old_new) for field, old_new in change.diff.items()}
+                for change in changed},
+        }
+
+
+class BulkMutator:
+    """
+    Edit or delete many objects, planning the changes with concurrent
+    get_object fetches before applying them concurrently.
+
+    Objects are selected by vault_id, find needle and explicit ids; when
+    several are given, only objects matching all of them are selected.
+    Changes are a dict of new field values, or a callable returning one from
+    the current object entry. Values are compared as they are, and the API
+    returns them as strings, so changes should be given as strings too.
+    Encrypted fields are only diffed correctly with decrypt=True. At most
+    rate_limit edits or deletes are sent per second.
+    """
+
+    def __init__(self, api, max_workers=8, rate_limit=None, decrypt=False):
+        self.api = api
+        self.max_workers = max_workers
+        self.rate_limit = rate_limit
+        self.decrypt = decrypt
+
+    def select(self, vault_id=None, needle=None, ids=None):
+        """Get the ids of the objects matching the selector."""
+        selections = []
+        if ids is not None:
+            selections.append([str(object_id) for object_id in ids])
+        for name, selected, fetch in (
+                ('vault', vault_id, self.api.vault_objects), ('find', needle, self.api.find)):
+            if selected is None:
+                continue
+            res = fetch(selected)
+            if res.status_code != 200:
+                raise BulkSelectionException(f'{name} {selected}: HTTP {res.status_code}')
+            selections.append([str(entry['id']) for entry in listing_objects(res.json())])
+        if not selections:
+            raise BulkSelectionException('No selector given')
+        common = set.intersection(*map(set, selections))
+        return [object_id for object_id in dict.fromkeys(selections[0]) if object_id in common]
+
+    def __fetch(self, object_id):
+        if self.decrypt:
+            return self.api.decrypt_object(object_id)
+        return self.api.get_object(object_id)
+
+    def __plan(self, action, object_ids, diff):
+        plan = BulkPlan(action)
+        for result in run_batch(self.__fetch, object_ids, self.max_workers):
+            data = entry = None
+            if result.ok:
+                data = result.response.json()
+                entry = next((entry for entry in listing_objects(data) if str(entry.get('id')) == result.item), None)
+            if entry is None:
+                plan.errors[result.item] = str(result.error or f'HTTP {result.response.status_code}')
+                continue
+            plan.changes.append(ObjectChange(result.item, action, entry, diff(entry), encrypted_fields(data, entry)))
+        return plan
+
+    def plan_edit(self, changes, vault_id=None, needle=None, ids=None):
+        """Plan setting the fields of changes on the selected objects, without sending any edits."""
+        def diff(entry):
+            values = changes(entry) if callable(changes) else changes
+            return {
+                field: (field_value(entry, field), value) for field, value in values.items()
+                if field_value(entry, field) != value}
+        return self.__plan(EDIT, self.select(vault_id, needle, ids), diff)
+
+    def plan_delete(self, vault_id=None, needle=None, ids=None):
+        """Plan deleting the selected objects, without sending any deletes."""
+        return self.__plan(DELETE, self.select(vault_id, needle, ids), lambda entry: {})
+
+    def __apply(self, change):
+        if change.action == DELETE:
+            return self.api.delete_object(change.object_id)
+        return self.api.edit_object(change.object_id, **{field: new for field, (_, new) in change.diff.items()})
+
+    def apply(self, plan, ordered=False):
+        """
+        Apply the changes of a plan, yielding a BatchResult per changed object
+        as soon as it completes. Only the changed fields of an edit are sent.
+        """
+        limiter = None if self.rate_limit is None else RateLimiter(self.rate_limit)
+        changes = (change for change in plan.changes if change.changed)
+        return run_batch(self.__apply, changes, self.max_workers, ordered, limiter)
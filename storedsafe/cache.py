@@ -0,0 +1,126 @@
+"""Response cache for read-mostly StoredSafe API endpoints."""
+import time
+import threading
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+
+# Time to live in seconds for the cacheable GET endpoints, by API path pattern.
+DEFAULT_TTLS = {
+    'template': 300,
+    'template/*': 300,
+    'utils/statusvalues': 3600,
+    'utils/policies': 300,
+    'utils/version': 3600,
+    'vault': 60,
+}
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of successful GET responses with per-endpoint TTLs.
+
+    Endpoints are matched against the patterns in ttls, where `*` matches any
+    path segment. Requests to endpoints without a TTL are never cached.
+    Every invalidation advances the generation of the changed collection,
+    and responses put with an older generation than the current one, read
+    before the change, are not cached.
+    """
+
+    def __init__(self, maxsize=256, ttls=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttls = DEFAULT_TTLS if ttls is None else ttls
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__clock = clock
+        self.__entries = OrderedDict()
+        self.__generations = {}
+        self.__clears = 0
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def ttl(self, path):
+        """Get the TTL of the relative API path, or None if it is not cacheable."""
+        path = path.strip('/')
+        ttl = self.ttls.get(path)
+        if ttl is None:
+            for pattern, pattern_ttl in self.ttls.items():
+                if fnmatchcase(path, pattern):
+                    return pattern_ttl
+        return ttl
+
+    @staticmethod
+    def key(path, params, token):
+        """Build the cache key of a request."""
+        params = tuple(sorted((params or {}).items()))
+        return (path.strip('/'), params, token)
+
+    def __generation(self, path):
+        return (self.__clears, self.__generations.get(path.strip('/').split('/')[0], 0))
+
+    def generation(self, path):
+        """Get the generation of the collection of the relative API path, to pass to put with its response."""
+        with self.__lock:
+            return self.__generation(path)
+
+    def get(self, key):
+        """Get a cached response, or None if it is missing or expired."""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                expires, res = entry
+                if expires > self.__clock():
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return res
+                del self.__entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, res, ttl, generation=None):
+        """
+        Cache a response for ttl seconds, evicting the least recently used
+        entries. The response is not cached if generation is given and its
+        collection was invalidated since it was taken.
+        """
+        with self.__lock:
+            if generation is not None and generation != self.__generation(key[0]):
+                return
+            self.__entries[key] = (self.__clock() + ttl, res)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, path=None):
+        """
+        Drop the cached entries affected by a change to the relative API path.
+
+        A change to `vault/5/member/3` drops the `vault` listing and everything
+        below `vault/5`. Without a path the whole cache is cleared.
+        """
+        with self.__lock:
+            if path is None:
+                self.__clears += 1
+                self.__entries.clear()
+                return
+            segments = path.strip('/').split('/')
+            collection = segments[0]
+            self.__generations[collection] = self.__generations.get(collection, 0) + 1
+            resource = '/'.join(segments[:2])
+            for key in list(self.__entries):
+                if key[0] == collection or key[0] == resource or key[0].startswith(resource + '/'):
+                    del self.__entries[key]
+
+    def stats(self):
+        """Get the hit/miss counters and current size of the cache."""
+        with self.__lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.__entries),
+                'maxsize': self.maxsize,
+            }
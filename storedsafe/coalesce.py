@@ -0,0 +1,102 @@
+"""Single-flight coalescing of identical in-flight StoredSafe GET requests."""
+import threading
+
+
+class _Flight:
+    """An in-flight request shared by the callers waiting for it."""
+
+    __slots__ = ('done', 'response', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """
+    Share one network call between identical GET requests in flight at the
+    same time, from threads or from asyncio tasks.
+
+    Requests are identical when their path, params and token are. The first
+    caller sends the request and every caller arriving before it completes
+    gets the same response, or the same raised error.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.deduplicated = 0
+        self.__flights = {}
+        self.__futures = {}
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def key(path, params, token):
+        """Build the key identifying a request."""
+        params = tuple(sorted((params or {}).items()))
+        return (path.strip('/'), params, token)
+
+    def call(self, key, send):
+        """Call send() unless an identical request is in flight, and return its response."""
+        with self.__lock:
+            flight = self.__flights.get(key)
+            if flight is None:
+                flight = self.__flights[key] = _Flight()
+                self.calls += 1
+                leader = True
+            else:
+                self.deduplicated += 1
+                leader = False
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.response
+        try:
+            flight.response = send()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self.__lock:
+                del self.__flights[key]
+            flight.done.set()
+        return flight.response
+
+    async def acall(self, key, send):
+        """
+        Await send() unless an identical request is in flight on the event
+        loop, and return its response.
+
+        The request runs in a task of its own, so cancelling any caller,
+        including the one that started it, leaves the others waiting for it.
+        """
+        import asyncio  # pylint: disable=import-outside-toplevel
+        loop = asyncio.get_running_loop()
+        key = (id(loop), key)
+        with self.__lock:
+            task = self.__futures.get(key)
+            if task is None:
+                task = self.__futures[key] = loop.create_task(send())
+                task.add_done_callback(lambda task: self.__landed(key, task))
+                self.calls += 1
+            else:
+                self.deduplicated += 1
+        return await asyncio.shield(task)
+
+    def __landed(self, key, task):
+        """Forget a completed async request."""
+        with self.__lock:
+            del self.__futures[key]
+        if not task.cancelled():
+            # Mark the error as retrieved in case every caller was cancelled.
+            task.exception()
+
+    def stats(self):
+        """Get the counters of sent and deduplicated requests."""
+        with self.__lock:
+            return {
+                'calls': self.calls,
+                'deduplicated': self.deduplicated,
+                'in_flight': len(self.__flights) + len(self.__futures),
+            }
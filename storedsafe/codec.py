@@ -0,0 +1,102 @@
+"""
+JSON codecs encoding request bodies and decoding response bodies.
+
+The fastest installed backend is selected by default: orjson if it is
+installed, otherwise the standard library json module. Backends are only
+imported when a codec is created.
+"""
+
+
+class JsonCodec:
+    """Codec backed by the standard library json module."""
+
+    name = 'json'
+
+    def __init__(self):
+        import json  # pylint: disable=import-outside-toplevel
+        self.__json = json
+
+    def dumps(self, data):
+        """Encode data as a compact UTF-8 JSON body."""
+        return self.__json.dumps(data, separators=(',', ':'), allow_nan=False).encode()
+
+    def loads(self, body):
+        """Decode a JSON body given as bytes or str, raising ValueError if it is invalid."""
+        return self.__json.loads(body)
+
+    def bind(self, res):
+        """
+        Make res.json() decode the body with the codec.
+
+        Bodies the codec rejects, and calls with keyword arguments, are handed
+        to the original json() of the response, so errors and charset handling
+        stay those of the HTTP library.
+        """
+        fallback = res.json
+
+        def json(**kwargs):
+            if not kwargs:
+                try:
+                    return self.loads(res.content)
+                except ValueError:
+                    pass
+            return fallback(**kwargs)
+
+        res.json = json
+        return res
+
+    def __repr__(self):
+        return f'{type(self).__name__}()'
+
+
+class OrjsonCodec(JsonCodec):
+    """Codec backed by orjson, raising ImportError when created if it is not installed."""
+
+    name = 'orjson'
+
+    def __init__(self):
+        super().__init__()
+        import orjson  # pylint: disable=import-outside-toplevel
+        self.__orjson = orjson
+
+    def dumps(self, data):
+        try:
+            return self.__orjson.dumps(data, option=self.__orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Types orjson does not serialize, such as integers beyond 64 bits.
+            return super().dumps(data)
+
+    def loads(self, body):
+        return self.__orjson.loads(body)
+
+
+CODECS = {codec.name: codec for codec in (OrjsonCodec, JsonCodec)}
+
+
+def get_codec(codec=None):
+    """
+    Get the codec for a name in CODECS or a codec instance, or the
+    fastest installed codec if codec is None.
+    """
+    if codec is None:
+        for factory in CODECS.values():
+            try:
+                return factory()
+            except ImportError:
+                continue
+    if isinstance(codec, str):
+        if codec not in CODECS:
+            raise ValueError(f'Unknown JSON codec {codec!r}, expected one of {", ".join(CODECS)}')
+        return CODECS[codec]()
+    return codec
+
+
+def available_codecs():
+    """Get an instance of every installed codec by name."""
+    codecs = {}
+    for name, factory in CODECS.items():
+        try:
+            codecs[name] = factory()
+        except ImportError:
+            continue
+    return codecs
@@ -0,0 +1,813 @@
+"""
+Stateful in-memory fake of the StoredSafe REST-like API for load and integration testing.
+
+FakeStoredSafe holds vaults, members, objects, templates, users, user
+certificates and session tokens in memory and answers the endpoints called
+by the wrappers. FakeServer serves it over HTTPS on a local API port and a
+separate mTLS port, so a client is pointed at it through host and mtls_port:
+
+    with FakeServer() as server:
+        alice = server.fake.add_user('alice', 'secret', admin=True)
+        api = StoredSafe(apikey=server.fake.apikey, **server.client_options())
+        api.login_totp('alice', 'secret', '123456')
+
+TLSServer, which FakeServer listens through, can also serve other handlers.
+
+Response shapes follow the real API closely, but the fake is not a
+specification of it. Latency, random server errors and rate limiting can be
+injected to see how the code under test copes.
+"""
+import re
+import ssl
+import json
+import time
+import random
+import string
+import shutil
+import secrets
+import tempfile
+import threading
+import itertools
+import mimetypes
+import subprocess
+from pathlib import Path
+from base64 import b64encode, b64decode
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from .batch import RateLimiter
+
+# Vault member statuses, each including the permissions of the ones before.
+READ = 1
+WRITE = 2
+ADMIN = 4
+
+FILE_TEMPLATE_ID = '3'
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024
+
+
+def _template(template_id, name, ico, fields):
+    """Build a template from (name, translation, encrypted) field definitions."""
+    return {
+        'id': template_id,
+        'info': {'name': name, 'ico': ico, 'active': True, 'file': template_id == FILE_TEMPLATE_ID},
+        'structure': {
+            field: {'translation': translation, 'type': 'text', 'encrypted': encrypted}
+            for field, translation, encrypted in fields},
+    }
+
+
+DEFAULT_TEMPLATES = (
+    _template('1', 'Server', 'server', (
+        ('host', 'Host', False), ('username', 'Username', False), ('password', 'Password', True),
+        ('info', 'Information', False), ('cryptedinfo', 'Sensitive information', True))),
+    _template('3', 'File', 'file', (
+        ('filename', 'Filename', False), ('info', 'Information', False),
+        ('cryptedinfo', 'Sensitive information', True))),
+    _template('4', 'Login', 'login', (
+        ('url', 'URL', False), ('username', 'Username', False), ('password', 'Password', True),
+        ('info', 'Information', False))),
+    _template('20', 'Folder', 'folder', (('objectname', 'Name', False), ('info', 'Information', False))),
+)
+
+
+class FakeError(Exception):
+    """Request rejected with an HTTP status and error message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class FakeRequest:
+    """A request as seen by the fake, with its body parsed."""
+
+    __slots__ = ('method', 'path', 'query', 'headers', 'data', 'files', 'mtls', 'peer_cert', 'token', 'user')
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, method, path, query=None, headers=None, body=b'', mtls=False, peer_cert=None):
+        self.method = method.upper()
+        self.path = path
+        self.query = query or {}
+        self.headers = headers or {}
+        self.mtls = mtls
+        self.peer_cert = peer_cert
+        self.token = self.headers.get('X-Http-Token')
+        self.user = None
+        self.data, self.files = _parse_body(self.headers.get('Content-Type', ''), body)
+
+
+def _parse_body(content_type, body):
+    """Parse a JSON or multipart/form-data body into fields and files."""
+    if not body:
+        return {}, {}
+    if content_type.startswith('multipart/form-data'):
+        message = BytesParser(policy=HTTP).parsebytes(
+            f'Content-Type: {content_type}\r\n\r\n'.encode() + body)
+        data, files = {}, {}
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            content = part.get_payload(decode=True)
+            if part.get_filename() is None:
+                data[name] = content.decode()
+            else:
+                files[name] = (part.get_filename(), content)
+        return data, files
+    try:
+        data = json.loads(body)
+    except ValueError as error:
+        raise FakeError(400, 'Malformed JSON body') from error
+    return (data if isinstance(data, dict) else {}), {}
+
+
+class FakeStoredSafe:
+    """
+    In-memory state and request handling of the fake StoredSafe.
+
+    latency is a number of seconds, or a (min, max) range, to wait before
+    each request. A fraction error_rate of requests fail with 503, and
+    requests beyond rate_limit per second are rejected with 429 and a
+    Retry-After header. Tokens expire after token_timeout idle seconds.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+            self, apikey='fake-apikey', token_timeout=900.0, latency=0.0, error_rate=0.0,
+            rate_limit=None, seed=None, clock=time.monotonic, version='2.1.0'):
+        self.apikey = apikey
+        self.token_timeout = token_timeout
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limiter = None if rate_limit is None else RateLimiter(rate_limit, clock=clock)
+        self.version = version
+        self.random = random.Random(seed)
+        self.clock = clock
+        self.lock = threading.RLock()
+        self.templates = {template['id']: template for template in DEFAULT_TEMPLATES}
+        self.users = {}
+        self.passphrases = {}
+        self.otps = {}
+        self.certs = {}
+        self.vaults = {}
+        self.members = {}
+        self.objects = {}
+        self.secrets = {}
+        self.files = {}
+        self.tokens = {}
+        self.requests = 0
+        self.injected = {'errors': 0, 'rate_limited': 0}
+        self.__ids = {kind: itertools.count(1) for kind in ('user', 'vault', 'object')}
+        self.__routes = [(method, re.compile(f'^{pattern}$'), handler) for method, pattern, handler in (
+            ('POST', '/auth', self.__login),
+            ('POST', '/auth/check', self.__check),
+            ('GET', '/auth/logout', self.__logout),
+            ('GET', '/vault', self.__list_vaults),
+            ('POST', '/vault', self.__create_vault),
+            ('GET', r'/vault/(\w+)', self.__vault_objects),
+            ('PUT', r'/vault/(\w+)', self.__edit_vault),
+            ('DELETE', r'/vault/(\w+)', self.__delete_vault),
+            ('GET', r'/vault/(\w+)/members', self.__vault_members),
+            ('POST', r'/vault/(\w+)/member/(\w+)', self.__set_member),
+            ('PUT', r'/vault/(\w+)/member/(\w+)', self.__set_member),
+            ('DELETE', r'/vault/(\w+)/member/(\w+)', self.__remove_member),
+            ('POST', '/object', self.__create_object),
+            ('GET', r'/object/(\w+)', self.__get_object),
+            ('PUT', r'/object/(\w+)', self.__edit_object),
+            ('DELETE', r'/object/(\w+)', self.__delete_object),
+            ('GET', '/find', self.__find),
+            ('POST', '/filecollect', self.__filecollect),
+            ('GET', '/template', self.__list_templates),
+            ('GET', r'/template/(\w+)', self.__get_template),
+            ('GET', '/user', self.__list_users),
+            ('POST', '/user', self.__create_user),
+            ('GET', r'/user/([^/]+)', self.__get_user),
+            ('PUT', r'/user/(\w+)', self.__edit_user),
+            ('DELETE', r'/user/(\w+)', self.__delete_user),
+            ('GET', r'/usercert/(\w+)', self.__get_cert),
+            ('POST', r'/usercert/(\w+)', self.__set_cert),
+            ('DELETE', r'/usercert/(\w+)', self.__remove_cert),
+            ('GET', '/utils/statusvalues', self.__status_values),
+            ('GET', '/utils/policies', self.__policies),
+            ('GET', '/utils/version', self.__version),
+            ('GET', '/utils/pwgen', self.__pwgen),
+            ('POST', '/utils/get_mime_type', self.__mime_type),
+        )]
+
+    ###
+    # Seeding.
+    ##
+    def add_user(self, username, passphrase, otp=None, admin=False, **fields):
+        """Add a user, logging in with any one-time password unless otp is given."""
+        with self.lock:
+            user_id = str(next(self.__ids['user']))
+            self.users[user_id] = {
+                'id': user_id, 'username': username, 'fullname': fields.pop('fullname', username),
+                'email': fields.pop('email', ''), 'admin': bool(admin), 'active': True, **fields}
+            self.passphrases[user_id] = passphrase
+            self.otps[user_id] = otp
+            return self.users[user_id]
+
+    def add_vault(self, groupname, policy=7, description='', members=None):
+        """Add a vault with members given as {user id: status}."""
+        with self.lock:
+            vault_id = str(next(self.__ids['vault']))
+            self.vaults[vault_id] = {
+                'id': vault_id, 'groupname': groupname, 'policy': str(policy), 'description': description}
+            self.members[vault_id] = {str(user_id): int(status) for user_id, status in (members or {}).items()}
+            return self.vaults[vault_id]
+
+    def add_object(self, vault_id, templateid='1', parentid='0', objectname=None, file=None, **fields):
+        """Add an object with template fields, and the contents of a file object as bytes."""
+        with self.lock:
+            return self.__store(None, {
+                'groupid': vault_id, 'templateid': templateid, 'parentid': parentid,
+                'objectname': objectname, **fields}, file)
+
+    def login(self, username):
+        """Get a new session token for a user without going through /auth."""
+        with self.lock:
+            user = next(user for user in self.users.values() if user['username'] == username)
+            return self.__new_token(user['id'])
+
+    ###
+    # Request handling.
+    ##
+    def handle(self, request):
+        """Handle a FakeRequest and return (status, headers, data)."""
+        self.__delay()
+        with self.lock:
+            self.requests += 1
+        if self.rate_limiter is not None:
+            wait = self.rate_limiter.acquire()
+            if wait:
+                self.injected['rate_limited'] += 1
+                return 429, {'Retry-After': str(max(1, round(wait)))}, self.__error('Too many requests')
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.injected['errors'] += 1
+            return 503, {}, self.__error('Service unavailable')
+        try:
+            handler, args = self.__route(request)
+            with self.lock:
+                if handler != self.__login:
+                    self.__authenticate(request)
+                data = handler(request, *args)
+        except FakeError as error:
+            return error.status, {}, self.__error(str(error))
+        data['CALLINFO'] = {
+            'status': 'SUCCESS', 'errorcodes': 0, 'errors': [],
+            'token': request.token, 'userid': request.user and request.user['id'], **data.get('CALLINFO', {})}
+        return 200, {}, data
+
+    def __delay(self):
+        latency = self.latency
+        if isinstance(latency, (tuple, list)):
+            latency = self.random.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+
+    @staticmethod
+    def __error(message):
+        return {'ERRORS': [message], 'CALLINFO': {'status': 'FAIL', 'errorcodes': 1, 'errors': [message]}}
+
+    def __route(self, request):
+        path = re.sub(r'^/api/[^/]+', '', request.path).rstrip('/') or '/'
+        methods = set()
+        for method, pattern, handler in self.__routes:
+            match = pattern.match(path)
+            if match:
+                if method == request.method:
+                    return handler, match.groups()
+                methods.add(method)
+        raise FakeError(405 if methods else 404, 'Method not allowed' if methods else 'Not found')
+
+    def __new_token(self, user_id):
+        token = secrets.token_urlsafe(24)
+        self.tokens[token] = [user_id, self.clock() + self.token_timeout]
+        return token
+
+    def __authenticate(self, request):
+        session = self.tokens.get(request.token)
+        if session is None or session[1] <= self.clock() or session[0] not in self.users:
+            self.tokens.pop(request.token, None)
+            raise FakeError(403, 'Invalid token')
+        session[1] = self.clock() + self.token_timeout
+        request.user = self.users[session[0]]
+
+    def __permission(self, request, vault_id, status=READ):
+        """Check the vault exists and the user has at least status in it."""
+        if vault_id not in self.vaults:
+            raise FakeError(404, 'Vault not found')
+        if not request.user['admin'] and self.members[vault_id].get(request.user['id'], 0) < status:
+            raise FakeError(403, 'Insufficient permissions')
+
+    @staticmethod
+    def __require_admin(request):
+        if not request.user['admin']:
+            raise FakeError(403, 'Insufficient permissions')
+
+    def __object(self, request, object_id, status=READ):
+        entry = self.objects.get(object_id)
+        if entry is None:
+            raise FakeError(404, 'Object not found')
+        self.__permission(request, entry['groupid'], status)
+        return entry
+
+    def __readable(self, request):
+        """Get the ids of the vaults the user can read."""
+        return {
+            vault_id for vault_id in self.vaults
+            if request.user['admin'] or self.members[vault_id].get(request.user['id'], 0) >= READ}
+
+    ###
+    # Auth.
+    ##
+    def __login(self, request):
+        data = request.data
+        if data.get('apikey') != self.apikey:
+            raise FakeError(403, 'Invalid API key')
+        user = next((user for user in self.users.values() if user['username'] == data.get('username')), None)
+        if user is None or not user['active']:
+            raise FakeError(403, 'Authentication failed')
+        passphrase, otp = self.passphrases[user['id']], self.otps[user['id']]
+        logintype = data.get('logintype', 'yubikey')
+        if logintype == 'smartcard':
+            valid = request.mtls and request.peer_cert is not False and data.get('passphrase') == passphrase
+        elif logintype == 'totp':
+            valid = data.get('passphrase') == passphrase and (otp is None or data.get('otp') == otp)
+        else:
+            keys = data.get('keys', '')
+            prefix = passphrase + self.apikey
+            valid = keys.startswith(prefix) and len(keys) > len(prefix) and (otp is None or keys[len(prefix):] == otp)
+        if not valid:
+            raise FakeError(403, 'Authentication failed')
+        request.token = self.__new_token(user['id'])
+        request.user = user
+        return {'CALLINFO': {'username': user['username'], 'fullname': user['fullname'], 'timeout': self.token_timeout}}
+
+    @staticmethod
+    def __check(request):
+        return {'CALLINFO': {'username': request.user['username']}}
+
+    def __logout(self, request):
+        self.tokens.pop(request.token, None)
+        return {'CALLINFO': {'token': None}}
+
+    ###
+    # Vaults.
+    ##
+    def __vault_entry(self, request, vault_id):
+        return {**self.vaults[vault_id], 'status': str(self.members[vault_id].get(request.user['id'], 0))}
+
+    def __list_vaults(self, request):
+        return {'VAULTS': [self.__vault_entry(request, vault_id) for vault_id in sorted(
+            self.__readable(request), key=int)]}
+
+    def __create_vault(self, request):
+        data = request.data
+        groupname = data.get('groupname') or data.get('vaultname')
+        if not groupname:
+            raise FakeError(400, 'Missing vault name')
+        vault = self.add_vault(groupname, data.get('policy', 7), data.get('description', ''))
+        self.members[vault['id']][request.user['id']] = ADMIN
+        return {'VAULT': [self.__vault_entry(request, vault['id'])]}
+
+    def __vault_objects(self, request, vault_id):
+        self.__permission(request, vault_id)
+        entries = [self.__entry(entry) for entry in self.objects.values() if entry['groupid'] == vault_id]
+        return {
+            'VAULT': [self.__vault_entry(request, vault_id)],
+            'OBJECTS': entries,
+            'TEMPLATES': self.__templates_of(entries),
+        }
+
+    def __edit_vault(self, request, vault_id):
+        self.__permission(request, vault_id, ADMIN)
+        vault = self.vaults[vault_id]
+        data = request.data
+        if data.get('groupname') or data.get('vaultname'):
+            vault['groupname'] = data.get('groupname') or data.get('vaultname')
+        for key in ('policy', 'description'):
+            if key in data:
+                vault[key] = str(data[key])
+        return {'VAULT': [self.__vault_entry(request, vault_id)]}
+
+    def __delete_vault(self, request, vault_id):
+        self.__permission(request, vault_id, ADMIN)
+        if any(entry['groupid'] == vault_id for entry in self.objects.values()):
+            raise FakeError(403, 'Vault is not empty')
+        del self.vaults[vault_id]
+        del self.members[vault_id]
+        return {}
+
+    def __vault_members(self, request, vault_id):
+        self.__permission(request, vault_id)
+        return {
+            'VAULT': [self.__vault_entry(request, vault_id)],
+            'MEMBERS': [
+                {'userid': user_id, 'username': self.users[user_id]['username'], 'status': str(status)}
+                for user_id, status in sorted(self.members[vault_id].items(), key=lambda item: int(item[0]))
+                if user_id in self.users],
+        }
+
+    def __set_member(self, request, vault_id, user_id):
+        self.__permission(request, vault_id, ADMIN)
+        if user_id not in self.users:
+            raise FakeError(404, 'User not found')
+        try:
+            status = int(request.data.get('status'))
+        except (TypeError, ValueError) as error:
+            raise FakeError(400, 'Invalid status') from error
+        if status not in (READ, WRITE, ADMIN):
+            raise FakeError(400, 'Invalid status')
+        exists = user_id in self.members[vault_id]
+        if request.method == 'PUT' and not exists:
+            raise FakeError(404, 'Member not found')
+        if request.method == 'POST' and exists:
+            raise FakeError(400, 'Already a member')
+        self.members[vault_id][user_id] = status
+        return self.__vault_members(request, vault_id)
+
+    def __remove_member(self, request, vault_id, user_id):
+        self.__permission(request, vault_id, ADMIN)
+        if self.members[vault_id].pop(user_id, None) is None:
+            raise FakeError(404, 'Member not found')
+        return self.__vault_members(request, vault_id)
+
+    ###
+    # Objects.
+    ##
+    def __store(self, object_id, params, file=None):
+        """Create or update an object, splitting template fields into public and encrypted values."""
+        params = dict(params)
+        template = self.templates.get(str(params.get('templateid')))
+        if template is None:
+            raise FakeError(400, 'Unknown template')
+        vault_id = str(params.pop('groupid', '') or '')
+        if vault_id not in self.vaults:
+            raise FakeError(400, 'Unknown vault')
+        parent_id = str(params.pop('parentid', None) or '0')
+        if parent_id != '0' and parent_id not in self.objects:
+            raise FakeError(400, 'Unknown parent')
+        public, crypted = {}, {}
+        for field, value in params.items():
+            definition = template['structure'].get(field)
+            if definition is not None:
+                (crypted if definition['encrypted'] else public)[field] = '' if value is None else str(value)
+        objectname = params.get('objectname') or next(iter(public.values()), '') or params.get('filename', '')
+        if object_id is None:
+            object_id = str(next(self.__ids['object']))
+        self.objects[object_id] = {
+            'id': object_id, 'parentid': parent_id, 'templateid': template['id'], 'groupid': vault_id,
+            'status': '128', 'objectname': str(objectname), 'filename': params.get('filename', ''),
+            'notes': '', 'tags': str(params.get('tags', '')), 'public': public}
+        self.secrets[object_id] = crypted
+        if file is not None:
+            self.files[object_id] = bytes(file)
+        return self.objects[object_id]
+
+    def __entry(self, entry, decrypt=False):
+        """Get the listing entry of an object, with its child count and optionally decrypted."""
+        entry = {**entry, 'children': str(sum(1 for child in self.objects.values() if child['parentid'] == entry['id']))}
+        if decrypt:
+            entry['crypted'] = dict(self.secrets[entry['id']])
+        return entry
+
+    def __templates_of(self, entries):
+        return [self.templates[template_id] for template_id in sorted({entry['templateid'] for entry in entries})]
+
+    def __descendants(self, object_id):
+        children = [child_id for child_id, child in self.objects.items() if child['parentid'] == object_id]
+        return children + [descendant for child_id in children for descendant in self.__descendants(child_id)]
+
+    def __create_object(self, request):
+        params = dict(request.data)
+        self.__permission(request, str(params.get('groupid', '')), WRITE)
+        content = None
+        if 'upload' in request.files:
+            filename, content = request.files['upload']
+            if len(content) > MAX_UPLOAD_SIZE:
+                raise FakeError(413, 'File too large')
+            params.setdefault('templateid', FILE_TEMPLATE_ID)
+            params.setdefault('filename', filename)
+        entry = self.__store(None, params, content)
+        return {'OBJECT': [self.__entry(entry)], 'TEMPLATES': self.__templates_of([entry])}
+
+    def __get_object(self, request, object_id):
+        entry = self.__object(request, object_id)
+        query = request.query
+        decrypt = query.get('decrypt') == 'true'
+        ids = [object_id] + (self.__descendants(object_id) if query.get('children') == 'true' else [])
+        entries = [self.__entry(self.objects[entry_id], decrypt) for entry_id in ids]
+        data = {'OBJECT': entries, 'TEMPLATES': self.__templates_of(entries)}
+        if query.get('filedata') == 'true':
+            if object_id not in self.files:
+                raise FakeError(400, 'Not a file object')
+            data['FILEDATA'] = b64encode(self.files[object_id]).decode()
+        return data
+
+    def __edit_object(self, request, object_id):
+        entry = self.__object(request, object_id, WRITE)
+        params = {**entry, **entry['public'], **self.secrets[object_id], **request.data}
+        self.__permission(request, str(params.get('groupid')), WRITE)
+        for key in ('id', 'public', 'status', 'notes', 'children'):
+            params.pop(key, None)
+        entry = self.__store(object_id, params)
+        return {'OBJECT': [self.__entry(entry)], 'TEMPLATES': self.__templates_of([entry])}
+
+    def __delete_object(self, request, object_id):
+        self.__object(request, object_id, WRITE)
+        for entry_id in [object_id] + self.__descendants(object_id):
+            del self.objects[entry_id]
+            del self.secrets[entry_id]
+            self.files.pop(entry_id, None)
+        return {}
+
+    def __find(self, request):
+        needle = request.query.get('needle', '').lower()
+        readable = self.__readable(request)
+        entries = [
+            self.__entry(entry) for entry in self.objects.values() if entry['groupid'] in readable and any(
+                needle in str(value).lower()
+                for value in (entry['objectname'], entry['filename'], entry['tags'], *entry['public'].values()))]
+        return {'OBJECT': entries, 'TEMPLATES': self.__templates_of(entries)}
+
+    def __filecollect(self, request):
+        if 'upload' not in request.files:
+            raise FakeError(400, 'Missing file')
+        filename, _ = request.files['upload']
+        return {
+            'TEMPLATE': [self.templates[FILE_TEMPLATE_ID]],
+            'FILE': {'filename': filename, 'mimetype': mimetypes.guess_type(filename)[0] or 'application/octet-stream'},
+        }
+
+    ###
+    # Templates.
+    ##
+    def __list_templates(self, _request):
+        return {'TEMPLATES': list(self.templates.values())}
+
+    def __get_template(self, _request, template_id):
+        if template_id not in self.templates:
+            raise FakeError(404, 'Template not found')
+        return {'TEMPLATE': [self.templates[template_id]]}
+
+    ###
+    # Users.
+    ##
+    def __list_users(self, _request):
+        return {'USERS': [self.users[user_id] for user_id in sorted(self.users, key=int)]}
+
+    def __get_user(self, _request, user_id):
+        if user_id in self.users:
+            return {'USER': [self.users[user_id]]}
+        needle = user_id.lower()
+        return {'USERS': [
+            user for user in self.users.values()
+            if needle in user['username'].lower() or needle in user['fullname'].lower()]}
+
+    def __create_user(self, request):
+        self.__require_admin(request)
+        data = dict(request.data)
+        username = data.pop('username', None)
+        if not username or any(user['username'] == username for user in self.users.values()):
+            raise FakeError(400, 'Invalid or taken username')
+        user = self.add_user(username, data.pop('passphrase', ''), admin=bool(data.pop('admin', False)), **data)
+        return {'USER': [user]}
+
+    def __edit_user(self, request, user_id):
+        self.__require_admin(request)
+        if user_id not in self.users:
+            raise FakeError(404, 'User not found')
+        data = dict(request.data)
+        if 'passphrase' in data:
+            self.passphrases[user_id] = data.pop('passphrase')
+        data.pop('id', None)
+        self.users[user_id].update(data)
+        return {'USER': [self.users[user_id]]}
+
+    def __delete_user(self, request, user_id):
+        self.__require_admin(request)
+        if self.users.pop(user_id, None) is None:
+            raise FakeError(404, 'User not found')
+        for members in self.members.values():
+            members.pop(user_id, None)
+        self.certs.pop(user_id, None)
+        return {}
+
+    def __get_cert(self, _request, user_id):
+        if user_id not in self.certs:
+            raise FakeError(404, 'No certificate')
+        return {'CERT': self.certs[user_id]}
+
+    def __set_cert(self, request, user_id):
+        self.__require_admin(request)
+        if user_id not in self.users:
+            raise FakeError(404, 'User not found')
+        if 'user_cert' not in request.files:
+            raise FakeError(400, 'Missing certificate')
+        self.certs[user_id] = request.files['user_cert'][1].decode('utf-8', 'replace')
+        return {}
+
+    def __remove_cert(self, request, user_id):
+        self.__require_admin(request)
+        if self.certs.pop(user_id, None) is None:
+            raise FakeError(404, 'No certificate')
+        return {}
+
+    ###
+    # Utils.
+    ##
+    @staticmethod
+    def __status_values(_request):
+        return {'STATUSVALUES': {'vault': {str(READ): 'Read', str(WRITE): 'Write', str(ADMIN): 'Admin'}}}
+
+    @staticmethod
+    def __policies(_request):
+        return {'POLICIES': [{'id': '7', 'name': 'Default', 'rules': {'min_length': 12}}]}
+
+    def __version(self, _request):
+        return {'VERSION': self.version}
+
+    def __pwgen(self, request):
+        try:
+            length = int(request.query.get('length', 20))
+        except ValueError as error:
+            raise FakeError(400, 'Invalid length') from error
+        alphabet = string.ascii_letters + string.digits + '!#%&()*+,-./:;<=>?@'
+        return {'PASSWORD': ''.join(secrets.choice(alphabet) for _ in range(max(1, min(length, 256))))}
+
+    @staticmethod
+    def __mime_type(request):
+        extension = request.data.get('extension', '')
+        try:
+            b64decode(request.data.get('data', ''), validate=True)
+        except ValueError as error:
+            raise FakeError(400, 'Invalid data') from error
+        return {'DATA': {
+            'mimetype': mimetypes.guess_type('file' + extension)[0] or 'application/octet-stream',
+            'maxuploadsize': MAX_UPLOAD_SIZE,
+            'allowed': int(request.data.get('size', 0)) <= MAX_UPLOAD_SIZE,
+        }}
+
+
+def create_self_signed_cert(directory):
+    """Create a throwaway self-signed certificate for 127.0.0.1 with the openssl command, returning (cert, key)."""
+    if shutil.which('openssl') is None:
+        raise RuntimeError('The openssl command is required to create a certificate, pass cert and key instead')
+    cert = Path(directory) / 'cert.pem'
+    key = Path(directory) / 'key.pem'
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', '/CN=localhost', '-addext', 'subjectAltName=IP:127.0.0.1,DNS:localhost',
+         '-keyout', str(key), '-out', str(cert)],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return str(cert), str(key)
+
+
+class FakeRequestHandler(BaseHTTPRequestHandler):
+    """Pass HTTP requests on to the FakeStoredSafe of the server."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def __handle(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        peer_cert = None
+        if self.server.mtls and self.server.verify_clients:
+            peer_cert = bool(self.connection.getpeercert())
+        request_options = {
+            'query': {key: values[0] for key, values in parse_qs(url.query).items()},
+            'headers': dict(self.headers.items()),
+            'body': body,
+            'mtls': self.server.mtls,
+            'peer_cert': peer_cert,
+        }
+        try:
+            request = FakeRequest(self.command, url.path, **request_options)
+        except FakeError as error:
+            status, headers, data = error.status, {}, {'ERRORS': [str(error)]}
+        else:
+            status, headers, data = self.server.fake.handle(request)
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = __handle
+
+
+class TLSServer(ThreadingHTTPServer):
+    """
+    Threading HTTPS server doing the TLS handshake of every connection in
+    its handler thread, so a slow or idle client only holds up itself.
+
+    Handshakes taking longer than handshake_timeout seconds are dropped,
+    the others are passed on to serve_connection. The number of accepted
+    connections is counted in connections.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, context, handshake_timeout=10.0):
+        super().__init__(server_address, handler_class)
+        self.context = context
+        self.handshake_timeout = handshake_timeout
+        self.connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+    def finish_request(self, request, client_address):
+        request.settimeout(self.handshake_timeout)
+        try:
+            request = self.context.wrap_socket(request, server_side=True)
+        except OSError:
+            return
+        try:
+            request.settimeout(None)
+            self.serve_connection(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def serve_connection(self, request, client_address):
+        """Serve a connection done with the TLS handshake with the handler class."""
+        super().finish_request(request, client_address)
+
+
+class FakeServer:
+    """
+    Serve a FakeStoredSafe over HTTPS on a local API port and mTLS port.
+
+    A self-signed certificate is created with the openssl command unless cert
+    and key are given. If client_ca is given, smartcard logins on the mTLS
+    port require a client certificate signed by it. Connections not done with
+    the TLS handshake within handshake_timeout seconds are dropped. Remaining
+    keyword arguments are passed on to FakeStoredSafe unless fake is given.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, fake=None, cert=None, key=None, client_ca=None, handshake_timeout=10.0, **fake_options):
+        self.fake = fake or FakeStoredSafe(**fake_options)
+        self.handshake_timeout = handshake_timeout
+        self.__tmpdir = None
+        if cert is None:
+            self.__tmpdir = tempfile.TemporaryDirectory()
+            cert, key = create_self_signed_cert(self.__tmpdir.name)
+        self.cert = cert
+        self.__servers = [self.__listen(cert, key, False), self.__listen(cert, key, True, client_ca)]
+        self.host = f'127.0.0.1:{self.__servers[0].server_address[1]}'
+        self.mtls_port = self.__servers[1].server_address[1]
+        self.__threads = []
+
+    def __listen(self, cert, key, mtls, client_ca=None):
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        if client_ca is not None:
+            context.load_verify_locations(client_ca)
+            context.verify_mode = ssl.CERT_OPTIONAL
+        server = TLSServer(('127.0.0.1', 0), FakeRequestHandler, context, self.handshake_timeout)
+        server.fake = self.fake
+        server.mtls = mtls
+        server.verify_clients = client_ca is not None
+        return server
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def client_options(self):
+        """Get the StoredSafe and AsyncStoredSafe options to connect to the fake."""
+        return {'host': self.host, 'mtls_port': self.mtls_port, 'verify': self.cert}
+
+    def start(self):
+        """Start serving in the background."""
+        if not self.__threads:
+            self.__threads = [
+                threading.Thread(target=server.serve_forever, daemon=True) for server in self.__servers]
+            for thread in self.__threads:
+                thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and clean up the certificate."""
+        for server in self.__servers:
+            if self.__threads:
+                server.shutdown()
+            server.server_close()
+        self.__threads = []
+        if self.__tmpdir is not None:
+            self.__tmpdir.cleanup()
+            self.__tmpdir = None
@@ -0,0 +1,154 @@
+"""Incremental decoding of the base64 file data in StoredSafe file object responses."""
+import re
+import binascii
+from pathlib import Path
+
+_SCAN, _STRING, _COLON, _VALUE_START, _VALUE, _DONE = range(6)
+_WHITESPACE = b' \t\r\n'
+_STRUCTURE = re.compile(rb'["{}\[\]]')
+_URLSAFE = bytes.maketrans(b'-_', b'+/')
+_ESCAPES = {ord('/'): b'/', ord('\\'): b'\\', ord('"'): b'"'}
+
+
+class FileDataDecoder:
+    """
+    Scan a JSON response body fed in chunks for the string value of field and
+    base64-decode it straight into dest as it arrives.
+
+    Only the field of the top level object is decoded. Memory use is bounded
+    by the size of the chunks fed. dest is either a path, which is only
+    created once the field is found, or a writable binary buffer.
+    """
+
+    def __init__(self, dest, field='FILEDATA'):
+        self.dest = dest
+        self.field = field.encode()
+        self.size = 0
+        self.found = False
+        self.__out = None
+        self.__state = _SCAN
+        self.__depth = 0
+        self.__string = bytearray()
+        self.__escape = False
+        self.__unicode = None
+        self.__carry = b''
+
+    def feed(self, data):
+        """Feed the next chunk of the response body."""
+        i, n = 0, len(data)
+        while i < n and self.__state != _DONE:
+            state = self.__state
+            if state == _SCAN:
+                match = _STRUCTURE.search(data, i)
+                if match is None:
+                    return
+                i = match.end()
+                char = data[match.start()]
+                if char == ord('"'):
+                    self.__string.clear()
+                    self.__state = _STRING
+                elif char in b'{[':
+                    self.__depth += 1
+                else:
+                    self.__depth -= 1
+            elif state == _STRING:
+                i = self.__scan_string(data, i)
+            elif state in (_COLON, _VALUE_START):
+                while i < n and data[i] in _WHITESPACE:
+                    i += 1
+                if i == n:
+                    return
+                expected = b':' if state == _COLON else b'"'
+                is_field = self.__depth == 1 and self.__string == self.field
+                if data[i] == expected[0] and (state == _VALUE_START or is_field):
+                    self.__state = _VALUE if state == _VALUE_START else _VALUE_START
+                    i += 1
+                else:
+                    self.__state = _SCAN
+            elif state == _VALUE:
+                i = self.__scan_value(data, i)
+
+    def __scan_string(self, data, i):
+        """Scan a JSON string, keeping just enough of it to compare with the field."""
+        if self.__escape:
+            self.__escape = False
+            self.__string += b'\\'
+            i += 1
+        quote = data.find(b'"', i)
+        backslash = data.find(b'\\', i, None if quote < 0 else quote)
+        if backslash >= 0:
+            self.__keep(data[i:backslash])
+            self.__escape = True
+            return backslash + 1
+        if quote < 0:
+            self.__keep(data[i:])
+            return len(data)
+        self.__keep(data[i:quote])
+        self.__state = _COLON
+        return quote + 1
+
+    def __keep(self, part):
+        if len(self.__string) <= len(self.field):
+            self.__string += part[:len(self.field) + 1]
+
+    def __scan_value(self, data, i):
+        """Decode the base64 string value, handling JSON escapes split across chunks."""
+        if self.__unicode is not None:
+            missing = 4 - len(self.__unicode)
+            self.__unicode += data[i:i + missing]
+            i += min(missing, len(data) - i)
+            if len(self.__unicode) == 4:
+                self.__decode(chr(int(self.__unicode, 16)).encode())
+                self.__unicode = None
+            return i
+        if self.__escape:
+            self.__escape = False
+            char = data[i]
+            if char == ord('u'):
+                self.__unicode = bytearray()
+            elif char in _ESCAPES:
+                self.__decode(_ESCAPES[char])
+            return i + 1
+        quote = data.find(b'"', i)
+        backslash = data.find(b'\\', i, None if quote < 0 else quote)
+        if backslash >= 0:
+            self.__decode(data[i:backslash])
+            self.__escape = True
+            return backslash + 1
+        if quote < 0:
+            self.__decode(data[i:])
+            return len(data)
+        self.__decode(data[i:quote])
+        self.__finish()
+        return quote + 1
+
+    def __decode(self, part):
+        if self.__out is None:
+            self.found = True
+            self.__out = self.__open()
+        part = self.__carry + part.translate(_URLSAFE)
+        end = len(part) - len(part) % 4
+        if end:
+            decoded = binascii.a2b_base64(part[:end])
+            self.__out.write(decoded)
+            self.size += len(decoded)
+        self.__carry = part[end:]
+
+    def __finish(self):
+        if self.__carry:
+            self.__carry += b'=' * (-len(self.__carry) % 4)
+            self.__decode(b'')
+        elif self.__out is None:
+            self.__decode(b'')
+        self.__state = _DONE
+
+    def __open(self):
+        if isinstance(self.dest, (str, Path)):
+            return open(self.dest, 'wb')  # pylint: disable=consider-using-with
+        return self.dest
+
+    def close(self):
+        """Finish decoding, closing dest if it was opened from a path."""
+        if self.__out is not None and self.__out is not self.dest:
+            self.__out.close()
+        self.__out = None
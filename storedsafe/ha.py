@@ -0,0 +1,207 @@
+"""High-availability StoredSafe client balancing requests over several appliances."""
+import time
+import threading
+from . import StoredSafe
+
+# Methods routed to the lowest-latency node, the others go to the first healthy host.
+READ_METHODS = frozenset(('get',))
+
+
+class NoHealthyHostException(Exception):
+    """Every host failed to answer the request."""
+
+
+class Node:
+    """Health and latency of one StoredSafe host."""
+
+    __slots__ = (
+        'host', 'healthy', 'latency', 'requests', 'errors', 'failovers', 'checks', 'checked', 'last_error')
+
+    def __init__(self, host):
+        self.host = host
+        self.healthy = True
+        self.latency = None
+        self.requests = 0
+        self.errors = 0
+        self.failovers = 0
+        self.checks = 0
+        self.checked = None
+        self.last_error = None
+
+    def observe(self, latency, smoothing):
+        """Fold a measured round trip into the moving average latency."""
+        self.latency = latency if self.latency is None else self.latency + smoothing * (latency - self.latency)
+
+    def stats(self):
+        """Get the metrics of the node."""
+        return {
+            'healthy': self.healthy, 'latency': self.latency, 'requests': self.requests, 'errors': self.errors,
+            'failovers': self.failovers, 'checks': self.checks, 'checked': self.checked,
+            'last_error': self.last_error}
+
+    def __repr__(self):
+        return f'Node({self.host!r}, healthy={self.healthy}, latency={self.latency})'
+
+
+class MultiHostStoredSafe(StoredSafe):
+    """
+    StoredSafe API wrapper spreading requests over several hosts.
+
+    Reads go to the healthy host with the lowest moving average latency and
+    writes to the first healthy host in hosts. With affinity, every request
+    carrying a token goes to the host that issued it, for appliances that do
+    not share sessions. A request failing with a
+    connection error is sent to the next host and the failed host is marked
+    unhealthy until a health check succeeds; POST requests only fail over if
+    the connection could not be established. Health checks time a version
+    request to every host, on demand with check_health or every
+    health_interval seconds between start and stop.
+
+    All other options are those of StoredSafe.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+            self, hosts, apikey=None, token=None, version='1.0', affinity=False,
+            health_interval=30.0, health_timeout=5.0, smoothing=0.3, **options):
+        if not hosts:
+            raise ValueError('At least one host is required')
+        super().__init__(hosts[0], apikey, token, version, **options)
+        self.nodes = [Node(host) for host in hosts]
+        self.affinity = affinity
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.smoothing = smoothing
+        self.token_host = hosts[0] if token is not None else None
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__thread = None
+
+    @property
+    def session(self):
+        """The pooled session, with its own connection pools for every host."""
+        session = StoredSafe.session.fget(self)
+        if f'{self._origin(host=self.nodes[-1].host)}/' not in session.adapters:
+            for node in self.nodes[1:]:
+                for mtls, pool_size in ((False, self.pool_size), (True, self.mtls_pool_size)):
+                    session.mount(f'{self._origin(mtls, node.host)}/', self._adapter(pool_size))
+        return session
+
+    def node(self, host):
+        """Get the node of a host."""
+        return next(node for node in self.nodes if node.host == host)
+
+    def __candidates(self, method, url):
+        """Get the nodes to try for a request, best first, ending with the unhealthy ones."""
+        with self.__lock:
+            healthy = [node for node in self.nodes if node.healthy]
+            unhealthy = [node for node in self.nodes if not node.healthy]
+            if method in READ_METHODS:
+                healthy.sort(key=lambda node: float('inf') if node.latency is None else node.latency)
+            preferred = None
+            if self.affinity and self.token_host is not None and not url.endswith('/auth'):
+                preferred = self.node(self.token_host)
+            ordered = healthy + sorted(
+                unhealthy, key=lambda node: float('inf') if node.latency is None else node.latency)
+            if preferred is not None:
+                ordered.remove(preferred)
+                ordered.insert(0, preferred)
+            return ordered
+
+    def __route(self, url, node):
+        """Rewrite url built for the primary host to the node."""
+        for mtls in (True, False):
+            origin = f'{self._origin(mtls)}/'
+            if url.startswith(origin):
+                return f'{self._origin(mtls, node.host)}/{url[len(origin):]}'
+        return url
+
+    def _send(self, method, url, **args):
+        # pylint: disable=import-outside-toplevel
+        import requests
+        from urllib3.exceptions import ConnectTimeoutError
+        failed = None
+        for node in self.__candidates(method, url):
+            started = time.perf_counter()
+            try:
+                res = super()._send(method, self.__route(url, node), **args)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                # Connection refused and connect timeouts mean nothing was sent.
+                reason = getattr(error.args[0], 'reason', None) if error.args else None
+                unsent = isinstance(error, requests.ConnectTimeout) or isinstance(reason, ConnectTimeoutError)
+                with self.__lock:
+                    node.requests += 1
+                    node.errors += 1
+                    node.healthy = False
+                    node.last_error = repr(error)
+                    if method == 'post' and not unsent:
+                        raise
+                    node.failovers += 1
+                failed = error
+                continue
+            with self.__lock:
+                node.requests += 1
+                if res.status_code >= 500:
+                    node.errors += 1
+                else:
+                    node.observe(time.perf_counter() - started, self.smoothing)
+            if url.endswith('/auth') and res.status_code == 200:
+                self.token_host = node.host
+            return res
+        raise NoHealthyHostException(f'No host answered {method.upper()} {url}') from failed
+
+    def check_health(self):
+        """Time a version request to every host, update their health and return the stats."""
+        import requests  # pylint: disable=import-outside-toplevel
+        headers = dict(self.requests_options.get('headers', {}))
+        if self.token is not None:
+            headers['X-Http-Token'] = self.token
+        options = {key: value for key, value in self.requests_options.items() if key in ('verify', 'cert')}
+        for node in self.nodes:
+            started = time.perf_counter()
+            try:
+                res = self.session.get(
+                    f'{self._origin(host=node.host)}/api/{self.api_version}/utils/version',
+                    headers=headers, timeout=self.health_timeout, **options)
+                res.close()
+                error = f'HTTP {res.status_code}' if res.status_code >= 500 else None
+            except requests.RequestException as exception:
+                error = repr(exception)
+            with self.__lock:
+                node.checks += 1
+                node.checked = time.time()
+                node.healthy = error is None
+                if error is None:
+                    node.observe(time.perf_counter() - started, self.smoothing)
+                else:
+                    node.last_error = error
+        return self.stats()
+
+    def stats(self):
+        """Get the latency and health metrics of every host."""
+        with self.__lock:
+            return {node.host: node.stats() for node in self.nodes}
+
+    def __run(self):
+        while not self.__stopped.wait(self.health_interval):
+            self.check_health()
+
+    def start(self):
+        """Check the health of every host now and then every health_interval seconds in a daemon thread."""
+        self.check_health()
+        if self.__thread is None:
+            self.__stopped.clear()
+            self.__thread = threading.Thread(target=self.__run, name='storedsafe-health', daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        """Stop the health checks."""
+        if self.__thread is not None:
+            self.__stopped.set()
+            self.__thread.join()
+            self.__thread = None
+
+    def close(self):
+        self.stop()
+        super().close()
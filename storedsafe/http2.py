@@ -0,0 +1,157 @@
+"""HTTP/2 transport adapter of the requests-based StoredSafe client."""
+import threading
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+from .aio import _ssl_context
+from .multipart import DEFAULT_CHUNK_SIZE
+
+# Connection-specific headers, forbidden in HTTP/2 and set by httpx itself in HTTP/1.1.
+_HOP_BY_HOP = frozenset(('connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'))
+
+
+def _content(body):
+    """Get the httpx content of a prepared request body."""
+    if isinstance(body, str):
+        return body.encode('utf-8')
+    if hasattr(body, 'read'):
+        return iter(lambda: body.read(DEFAULT_CHUNK_SIZE), b'')
+    return body
+
+
+def _timeout(timeout):
+    """Get the httpx timeout of a requests timeout."""
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return httpx.Timeout(None, connect=connect, read=read)
+    return httpx.Timeout(timeout)
+
+
+def _translate(error, request):
+    """Get the requests exception HTTPAdapter raises for the equivalent urllib3 error."""
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.ConnectTimeout(error, request=request)
+    if isinstance(error, httpx.TimeoutException):
+        return requests.ReadTimeout(error, request=request)
+    if isinstance(error, httpx.ConnectError):
+        # Like urllib3, report that nothing was sent so callers can safely resend.
+        reason = NewConnectionError(None, str(error))
+        return requests.ConnectionError(MaxRetryError(None, request.url, reason), request=request)
+    return requests.ConnectionError(error, request=request)
+
+
+class _RawStream:
+    """The httpx response behind a requests response, streamed as Response.raw."""
+
+    def __init__(self, response, request):
+        self.response = response
+        self.request = request
+
+    def stream(self, amt=None, decode_content=None):  # pylint: disable=unused-argument
+        """Yield the decoded body in chunks of amt bytes."""
+        try:
+            yield from self.response.iter_bytes(amt)
+        except httpx.TransportError as error:
+            raise _translate(error, self.request) from error
+
+    def close(self):
+        """Close the response, releasing its stream or connection."""
+        self.response.close()
+
+    release_conn = close
+
+
+class HTTP2Adapter(HTTPAdapter):
+    """
+    Transport adapter sending the requests of a session with httpx, over
+    HTTP/2 when the server negotiates it.
+
+    Concurrent requests to the same origin share one TLS connection as
+    multiplexed streams when the server selects h2 through ALPN, and are
+    spread over up to pool_maxsize HTTP/1.1 connections when it does not.
+    Responses and errors are translated to their requests equivalents, so
+    session hooks, retries and failover work unchanged. Responses also carry
+    the negotiated protocol in http_version, and whether their connection
+    was used before in connection_reused.
+    """
+
+    def __init__(self, pool_maxsize=10, max_retries=0, keep_alive=True):
+        super().__init__(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=max_retries)
+        self.keep_alive = keep_alive
+        self.__clients = {}
+        self.__streams = weakref.WeakSet()
+        self.__lock = threading.Lock()
+
+    def __client(self, verify, cert, proxy):
+        """Get the pooled client for the TLS settings and proxy, created on first use."""
+        key = (verify, cert, proxy)
+        with self.__lock:
+            client = self.__clients.get(key)
+            if client is None:
+                pool_size = self._pool_maxsize
+                limits = httpx.Limits(
+                    max_connections=pool_size, max_keepalive_connections=pool_size if self.keep_alive else 0)
+                client = self.__clients[key] = httpx.Client(
+                    timeout=None,
+                    transport=httpx.HTTPTransport(
+                        verify=_ssl_context(verify, cert), http2=True, limits=limits,
+                        retries=int(self.max_retries.total or 0), proxy=proxy))
+            return client
+
+    def __reused(self, res):
+        """Check if a response was received over a connection used before, or None if unknown."""
+        stream = res.extensions.get('network_stream')
+        if stream is None:
+            return None
+        with self.__lock:
+            if stream in self.__streams:
+                return True
+            self.__streams.add(stream)
+            return False
+
+    # pylint: disable=too-many-arguments
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        client = self.__client(verify, cert, select_proxy(request.url, proxies or {}))
+        headers = [(key, value) for key, value in request.headers.items() if key.lower() not in _HOP_BY_HOP]
+        try:
+            res = client.send(
+                client.build_request(
+                    request.method, request.url, headers=headers, content=_content(request.body),
+                    timeout=_timeout(timeout)),
+                stream=True)
+            reused = self.__reused(res)
+            if not stream:
+                res.read()
+        except httpx.TransportError as error:
+            raise _translate(error, request) from error
+        return self.__response(request, res, stream, reused)
+
+    def __response(self, request, res, stream, reused):
+        """Build the requests response of an httpx response."""
+        response = requests.Response()
+        response.status_code = res.status_code
+        response.headers = CaseInsensitiveDict(res.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = res.reason_phrase
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.raw = _RawStream(res, request)
+        response.http_version = res.http_version
+        response.connection_reused = reused
+        if not stream:
+            # pylint: disable=protected-access
+            response._content = res.content
+            response._content_consumed = True
+        return response
+
+    def close(self):
+        with self.__lock:
+            clients, self.__clients = self.__clients, {}
+        for client in clients.values():
+            client.close()
+        super().close()
@@ -0,0 +1,219 @@
+"""Streaming bulk import of StoredSafe objects from CSV or JSONL files."""
+import csv
+import json
+import time
+from pathlib import Path
+from .batch import run_batch
+
+# Object parameters that are not template fields.
+OBJECT_PARAMS = frozenset(('objectname', 'parentid', 'tags'))
+
+
+class ImportValidationException(Exception):
+    """A record cannot be imported with the template."""
+
+
+def read_records(path, format=None):  # pylint: disable=redefined-builtin
+    """
+    Lazily read the records of a CSV or JSONL file as (row, record) tuples.
+
+    The format is taken from the file suffix unless given as 'csv' or
+    'jsonl'. Rows are numbered from 1, not counting the CSV header.
+    """
+    path = Path(path)
+    format = format or ('csv' if path.suffix.lower() == '.csv' else 'jsonl')
+    with path.open('r', newline='' if format == 'csv' else None, encoding='utf-8') as source:
+        if format == 'csv':
+            yield from enumerate(csv.DictReader(source), 1)
+            return
+        row = 0
+        for line in source:
+            if line.strip():
+                row += 1
+                yield row, json.loads(line)
+
+
+def template_of(data):
+    """Get the template from the JSON data of a get_template response."""
+    template = data.get('TEMPLATE', data.get('TEMPLATES'))
+    if isinstance(template, dict) and 'structure' not in template:
+        template = list(template.values())
+    if isinstance(template, list):
+        template = template[0] if template else None
+    return template
+
+
+class ImportReport:
+    """Running totals of an import."""
+
+    __slots__ = ('created', 'skipped', 'failed', 'invalid', 'started', 'elapsed')
+
+    def __init__(self):
+        self.created = 0
+        self.skipped = 0
+        self.failed = {}
+        self.invalid = {}
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        """True if every record was created or skipped."""
+        return not self.failed and not self.invalid
+
+    @property
+    def throughput(self):
+        """Objects created per second."""
+        return self.created / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        return (
+            f'ImportReport(created={self.created}, skipped={self.skipped}, failed={len(self.failed)}, '
+            f'invalid={len(self.invalid)}, elapsed={self.elapsed:.2f}s, throughput={self.throughput:.1f}/s)')
+
+
+class BulkImporter:
+    """
+    Create objects from records, concurrently on a bounded pool of workers.
+
+    mapping renames record columns to template fields, other columns must
+    already be named after a template field or one of objectname, parentid
+    and tags. Columns mapped to None are dropped. Records are validated
+    against the template before anything is sent.
+
+    If journal_path is given, the outcome of every record is appended to
+    it as a JSON line and records already created are skipped on reruns.
+    Records are keyed by the key column, or by their row number, and
+    records repeating the key of an earlier one are invalid.
+    progress(report) is called every progress_every records.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+            self, api, vault_id, templateid, mapping=None, required=(), journal_path=None,
+            key=None, max_workers=8, progress=None, progress_every=100):
+        self.api = api
+        self.vault_id = vault_id
+        self.templateid = str(templateid)
+        self.mapping = mapping or {}
+        self.required = tuple(required)
+        self.journal_path = None if journal_path is None else Path(journal_path)
+        self.key = key
+        self.max_workers = max_workers
+        self.progress = progress
+        self.progress_every = progress_every
+        self.__templates = {}
+
+    def template(self, templateid):
+        """Get a template, fetching it only once."""
+        templateid = str(templateid)
+        if templateid not in self.__templates:
+            res = self.api.get_template(templateid)
+            template = template_of(res.json()) if res.status_code == 200 else None
+            if template is None:
+                raise ImportValidationException(f'Template {templateid}: HTTP {res.status_code}')
+            self.__templates[templateid] = template
+        return self.__templates[templateid]
+
+    def params(self, record):
+        """Map and validate a record, returning the create_object parameters."""
+        structure = self.template(self.templateid)['structure']
+        params = {}
+        for column, value in record.items():
+            field = self.mapping.get(column, column)
+            if field is None or (self.key is not None and column == self.key and column not in self.mapping):
+                continue
+            if field not in structure and field not in OBJECT_PARAMS:
+                raise ImportValidationException(f'Unknown field {field!r}')
+            if value not in (None, ''):
+                params[field] = value if isinstance(value, str) else json.dumps(value)
+        missing = [field for field in self.required if field not in params]
+        if missing:
+            raise ImportValidationException(f'Missing {", ".join(missing)}')
+        if not any(field in structure for field in params):
+            raise ImportValidationException('No template fields')
+        return {**params, 'templateid': self.templateid, 'groupid': self.vault_id}
+
+    def __create(self, item):
+        """Create the object of a (key, params) item."""
+        return self.api.create_object(**item[1])
+
+    def completed(self):
+        """Get the keys of the records created according to the journal."""
+        if self.journal_path is None or not self.journal_path.exists():
+            return set()
+        done = set()
+        with self.journal_path.open('r', encoding='utf-8') as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by an interrupted run.
+                if entry.get('status') == 'created':
+                    done.add(str(entry['key']))
+        return done
+
+    def __terminated(self):
+        """Check if the journal ends with a complete line."""
+        with self.journal_path.open('rb') as journal:
+            journal.seek(-1, 2)
+            return journal.read(1) == b'\n'
+
+    def run(self, source, format=None):  # pylint: disable=redefined-builtin
+        """
+        Import the records of source, a CSV or JSONL path or an iterable of
+        (row, record) tuples, and return an ImportReport.
+        """
+        records = read_records(source, format) if isinstance(source, (str, Path)) else source
+        report = ImportReport()
+        self.template(self.templateid)
+        done = self.completed()
+        seen = set()
+        journal = None if self.journal_path is None else self.journal_path.open('a', encoding='utf-8')
+        try:
+            if journal is not None and journal.tell() and not self.__terminated():
+                journal.write('\n')
+
+            def log(key, status, **outcome):
+                if journal is not None:
+                    journal.write(json.dumps({'key': key, 'status': status, **outcome}) + '\n')
+                    journal.flush()
+
+            def pending():
+                for row, record in records:
+                    key = str(record.get(self.key, row) if self.key is not None else row)
+                    if key in done:
+                        report.skipped += 1
+                        continue
+                    if key in seen:
+                        report.invalid[key] = f'Duplicate key {key!r}'
+                        log(key, 'invalid', error=report.invalid[key])
+                        continue
+                    seen.add(key)
+                    try:
+                        params = self.params(record)
+                    except ImportValidationException as error:
+                        report.invalid[key] = str(error)
+                        log(key, 'invalid', error=str(error))
+                        continue
+                    yield key, params
+
+            results = run_batch(self.__create, pending(), self.max_workers, ordered=False)
+            for count, result in enumerate(results, 1):
+                key = result.item[0]
+                if result.ok:
+                    report.created += 1
+                    objects = result.response.json().get('OBJECT') or [{}]
+                    log(key, 'created', object_id=(objects[0] if isinstance(objects, list) else {}).get('id'))
+                else:
+                    error = str(result.error or f'HTTP {result.response.status_code}')
+                    report.failed[key] = error
+                    log(key, 'failed', error=error)
+                report.elapsed = time.perf_counter() - report.started
+                if self.progress is not None and count % self.progress_every == 0:
+                    self.progress(report)
+        finally:
+            if journal is not None:
+                journal.close()
+        report.elapsed = time.perf_counter() - report.started
+        return report
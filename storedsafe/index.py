@@ -0,0 +1,165 @@
+"""Local on-disk index of StoredSafe vault listings for offline find."""
+import json
+import time
+import sqlite3
+from .batch import run_batch
+
+
+class IndexRefreshException(Exception):
+    """Failed to fetch the vault listings needed to refresh the index."""
+
+
+def _has_trigram():
+    """Check if SQLite supports full text search with the trigram tokenizer."""
+    try:
+        sqlite3.connect(':memory:').execute("CREATE VIRTUAL TABLE t USING fts5(a, tokenize='trigram')")
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def searchable_text(entry):
+    """Get the searchable, non-encrypted text of a vault listing entry."""
+    values = [entry.get('objectname'), entry.get('filename'), entry.get('tags')]
+    public = entry.get('public')
+    if isinstance(public, dict):
+        values.extend(public.values())
+    return '\n'.join(str(value) for value in values if value not in (None, ''))
+
+
+def listing_objects(data):
+    """Get the object entries of a vault listing or find response."""
+    objects = data.get('OBJECTS', data.get('OBJECT', []))
+    return list(objects.values()) if isinstance(objects, dict) else objects
+
+
+def listing_templates(data):
+    """Get the template entries of a vault listing or find response."""
+    templates = data.get('TEMPLATES', [])
+    return list(templates.values()) if isinstance(templates, dict) else templates
+
+
+class VaultIndex:
+    """
+    SQLite index of the searchable fields of all objects in the vaults the
+    user can access, enabling find_local without a server round trip.
+
+    Only the entries of the vault listings are stored, never decrypted data.
+    Substring search uses FTS5 with the trigram tokenizer when available.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS objects (
+            rowid INTEGER PRIMARY KEY, id TEXT UNIQUE, vault_id TEXT, data TEXT);
+        CREATE INDEX IF NOT EXISTS objects_vault ON objects (vault_id);
+        CREATE TABLE IF NOT EXISTS templates (id TEXT PRIMARY KEY, data TEXT);
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    '''
+
+    def __init__(self, api, path=':memory:', max_workers=8):
+        self.api = api
+        self.path = str(path)
+        self.max_workers = max_workers
+        self.fts = _has_trigram()
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(self.SCHEMA)
+        if self.fts:
+            self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5(text, tokenize='trigram')")
+        else:
+            self.db.execute('CREATE TABLE IF NOT EXISTS search (rowid INTEGER PRIMARY KEY, text TEXT)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the index database."""
+        self.db.close()
+
+    def refresh(self, vault_ids=None):
+        """
+        Fetch the listings of the vaults with vault_ids, or all vaults, and
+        replace their entries in the index. The index is left untouched if
+        any listing fails. Returns the index stats.
+        """
+        started = time.perf_counter()
+        full = vault_ids is None
+        if full:
+            try:
+                res = self.api.list_vaults()
+            except Exception as error:
+                raise IndexRefreshException(f'vaults: {error}') from error
+            if res.status_code != 200:
+                raise IndexRefreshException(f'vaults: HTTP {res.status_code}')
+            vault_ids = [vault['id'] for vault in res.json().get('VAULTS', [])]
+        listings = {}
+        for result in run_batch(self.api.vault_objects, vault_ids, self.max_workers):
+            if result.error is not None or result.response.status_code != 200:
+                outcome = result.error or f'HTTP {result.response.status_code}'
+                raise IndexRefreshException(f'vault {result.item}: {outcome}')
+            listings[str(result.item)] = result.response.json()
+        with self.db:
+            if full:
+                self.db.execute('DELETE FROM search')
+                self.db.execute('DELETE FROM objects')
+                self.db.execute('DELETE FROM templates')
+            for vault_id, data in listings.items():
+                self.__replace(vault_id, data)
+            self.db.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', [
+                ('built_at', str(time.time())), ('build_time', str(time.perf_counter() - started))])
+        return self.stats()
+
+    def __replace(self, vault_id, data):
+        """Replace the indexed entries of a vault with those of its listing."""
+        db = self.db
+        db.execute('DELETE FROM search WHERE rowid IN (SELECT rowid FROM objects WHERE vault_id = ?)', (vault_id,))
+        db.execute('DELETE FROM objects WHERE vault_id = ?', (vault_id,))
+        for entry in listing_objects(data):
+            object_id = str(entry['id'])
+            # The object may still be indexed under the vault it moved from.
+            db.execute('DELETE FROM search WHERE rowid IN (SELECT rowid FROM objects WHERE id = ?)', (object_id,))
+            db.execute('DELETE FROM objects WHERE id = ?', (object_id,))
+            cursor = db.execute(
+                'INSERT INTO objects (id, vault_id, data) VALUES (?, ?, ?)', (object_id, vault_id, json.dumps(entry)))
+            db.execute('INSERT INTO search (rowid, text) VALUES (?, ?)', (cursor.lastrowid, searchable_text(entry)))
+        db.executemany('INSERT OR REPLACE INTO templates VALUES (?, ?)', (
+            (str(template['id']), json.dumps(template)) for template in listing_templates(data)))
+
+    def find_local(self, needle):
+        """
+        Find indexed objects with searchable fields containing the needle,
+        ignoring case. Returns data shaped like the JSON of a find response.
+        """
+        if self.fts and len(needle) >= 3:
+            query = 'SELECT o.data FROM search s JOIN objects o ON o.rowid = s.rowid WHERE s.text MATCH ?'
+            args = ('"' + needle.replace('"', '""') + '"',)
+        else:
+            query = "SELECT o.data FROM search s JOIN objects o ON o.rowid = s.rowid WHERE s.text LIKE ? ESCAPE '\\'"
+            escaped = needle.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            args = (f'%{escaped}%',)
+        objects = [json.loads(row[0]) for row in self.db.execute(query + ' ORDER BY o.rowid', args)]
+        template_ids = sorted({str(entry.get('templateid')) for entry in objects})
+        templates = [json.loads(row[0]) for row in self.db.execute(
+            f'SELECT data FROM templates WHERE id IN ({", ".join("?" * len(template_ids))})', template_ids)]
+        return {
+            'OBJECT': objects,
+            'TEMPLATES': templates,
+            'CALLINFO': {'status': 'SUCCESS', 'errorcodes': 0, 'local': True},
+        }
+
+    def stats(self):
+        """Get the number of indexed objects, the index size in bytes and the last build time."""
+        meta = dict(self.db.execute('SELECT key, value FROM meta'))
+        page_count, = self.db.execute('PRAGMA page_count').fetchone()
+        page_size, = self.db.execute('PRAGMA page_size').fetchone()
+        objects, vaults = self.db.execute('SELECT COUNT(*), COUNT(DISTINCT vault_id) FROM objects').fetchone()
+        return {
+            'objects': objects,
+            'vaults': vaults,
+            'size': page_count * page_size,
+            'build_time': float(meta.get('build_time', 0)),
+            'built_at': float(meta.get('built_at', 0)),
+            'fts': self.fts,
+        }
@@ -0,0 +1,219 @@
+"""Helpers of the generator-based iteration over vaults, objects and users."""
+
+
+class ListingException(Exception):
+    """Failed to fetch a listing while iterating."""
+
+
+def listing_entries(res, name, *keys):
+    """
+    Get the entries under the first of keys present in a listing response,
+    or raise ListingException if the request failed.
+    """
+    if res.status_code != 200:
+        raise ListingException(f'{name}: HTTP {res.status_code}')
+    data = res.json()
+    entries = next((data[key] for key in keys if key in data), [])
+    return list(entries.values()) if isinstance(entries, dict) else entries
+
+
+class TreeWalk:
+    """
+    Depth-first, pre-order walk of an object and its descendants.
+
+    The entries of get_object responses with children are added as they are
+    fetched. An object must be fetched before it is taken if it is not known
+    yet, or if it has children of which none are known, so both responses
+    holding all descendants and responses holding one level are walked.
+    """
+
+    def __init__(self, object_id):
+        self.stack = [str(object_id)]
+        self.entries = {}
+        self.children = {}
+        self.fetched = set()
+
+    def __bool__(self):
+        return bool(self.stack)
+
+    def add(self, object_id, entries):
+        """Add the entries of the response fetched for object_id."""
+        self.fetched.add(object_id)
+        for entry in entries:
+            entry_id = str(entry['id'])
+            if entry_id not in self.entries:
+                self.entries[entry_id] = entry
+                self.children.setdefault(str(entry.get('parentid')), []).append(entry_id)
+
+    def missing(self):
+        """Get the id of the next object if it must be fetched before it is taken, else None."""
+        object_id = self.stack[-1]
+        if object_id in self.fetched:
+            return None
+        entry = self.entries.get(object_id)
+        if entry is None or (int(entry.get('children') or 0) and object_id not in self.children):
+            return object_id
+        return None
+
+    def take(self):
+        """Take the entry of the next object and queue its children."""
+        object_id = self.stack.pop()
+        entry = self.entries.get(object_id)
+        if entry is None:
+            raise ListingException(f'object {object_id}: not found')
+        self.stack.extend(reversed(self.children.pop(object_id, [])))
+        return entry
+
+
+class TreeNode:
+    """An object reached by fetch_tree, with its depth below the root."""
+
+    __slots__ = ('object_id', 'parent_id', 'depth', 'entry')
+
+    def __init__(self, object_id, parent_id, depth, entry):
+        self.object_id = object_id
+        self.parent_id = parent_id
+        self.depth = depth
+        self.entry = entry
+
+    def __repr__(self):
+        return f'TreeNode({self.object_id!r}, parent={self.parent_id!r}, depth={self.depth})'
+
+
+class ObjectTree:
+    """
+    Parent/child index of an object and its descendants down to depth,
+    filled breadth first by fetching get_object responses with children.
+
+    Iterating the tree, or async iterating it for a coroutine fetch, fetches
+    it with up to max_workers requests in flight and yields a TreeNode for
+    every object as soon as its response arrives. An object is only fetched
+    if it has children none of the responses so far included, so each level
+    of the tree costs at most one round trip. Already seen ids are skipped.
+    Failures below the root are collected in errors; a failure to fetch the
+    root raises.
+    """
+
+    def __init__(self, object_id, fetch, depth=None, max_workers=8):
+        self.root = str(object_id)
+        self.fetch = fetch
+        self.max_depth = depth
+        self.max_workers = max(1, max_workers)
+        self.entries = {}
+        self.parents = {}
+        self.children = {}
+        self.depths = {}
+        self.errors = {}
+        self.__requested = set()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __place(self, entry):
+        """Get the parent id and depth of a new entry, or None if its parent is not known yet."""
+        entry_id = str(entry['id'])
+        if entry_id == self.root:
+            return None, 0
+        parent_id = str(entry.get('parentid'))
+        if parent_id in self.depths:
+            return parent_id, self.depths[parent_id] + 1
+        return None
+
+    def add(self, object_id, entries):
+        """
+        Add the entries of the response fetched for object_id, returning the
+        new nodes and the ids of the objects to fetch next.
+        """
+        pending = [entry for entry in entries if str(entry['id']) not in self.entries]
+        nodes = []
+        while pending:
+            deferred = []
+            for entry in pending:
+                place = self.__place(entry)
+                if place is None:
+                    deferred.append(entry)
+                    continue
+                parent_id, depth = place
+                if self.max_depth is not None and depth > self.max_depth:
+                    continue
+                entry_id = str(entry['id'])
+                self.entries[entry_id] = entry
+                self.parents[entry_id] = parent_id
+                self.depths[entry_id] = depth
+                if parent_id is not None:
+                    self.children.setdefault(parent_id, []).append(entry_id)
+                nodes.append(TreeNode(entry_id, parent_id, depth, entry))
+            if len(deferred) == len(pending):
+                break
+            pending = deferred
+        expand = [
+            node.object_id for node in nodes
+            if (self.max_depth is None or node.depth < self.max_depth) and int(node.entry.get('children') or 0)
+            and node.object_id not in self.children and node.object_id not in self.__requested]
+        self.__requested.update(expand)
+        nodes.sort(key=lambda node: node.depth)
+        return nodes, expand
+
+    def __received(self, object_id, result):
+        """Add the outcome of a fetch, given as a callable returning its response."""
+        try:
+            entries = listing_entries(result(), f'object {object_id}', 'OBJECT')
+        except Exception as error:  # pylint: disable=broad-except
+            if object_id == self.root:
+                raise
+            self.errors[object_id] = str(error)
+            return [], []
+        return self.add(object_id, entries)
+
+    def __iter__(self):
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+        self.__requested.add(self.root)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {executor.submit(self.fetch, self.root): self.root}
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        nodes, expand = self.__received(pending.pop(future), future.result)
+                        for object_id in expand:
+                            pending[executor.submit(self.fetch, object_id)] = object_id
+                        yield from nodes
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    async def __aiter__(self):
+        import asyncio  # pylint: disable=import-outside-toplevel
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def fetch(object_id):
+            async with semaphore:
+                return await self.fetch(object_id)
+
+        self.__requested.add(self.root)
+        pending = {asyncio.ensure_future(fetch(self.root)): self.root}
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    nodes, expand = self.__received(pending.pop(task), task.result)
+                    for object_id in expand:
+                        pending[asyncio.ensure_future(fetch(object_id))] = object_id
+                    for node in nodes:
+                        yield node
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def complete(self):
+        """Fetch the whole tree and return it."""
+        for _ in self:
+            pass
+        return self
+
+    async def acomplete(self):
+        """Fetch the whole tree with a coroutine fetch and return it."""
+        async for _ in self:
+            pass
+        return self
@@ -0,0 +1,150 @@
+"""Declarative reconciliation of StoredSafe vault memberships."""
+from .batch import run_batch, RateLimiter
+from .iteration import listing_entries
+
+ADD = 'add'
+EDIT = 'edit'
+REMOVE = 'remove'
+
+
+class MemberChange:
+    """Planned change of one member of a vault, with the status before and after it."""
+
+    __slots__ = ('vault_id', 'user_id', 'action', 'before', 'after')
+
+    def __init__(self, vault_id, user_id, action, before, after):
+        self.vault_id = vault_id
+        self.user_id = user_id
+        self.action = action
+        self.before = before
+        self.after = after
+
+    def __repr__(self):
+        return f'MemberChange({self.vault_id!r}, {self.user_id!r}, {self.action!r}, {self.before!r}, {self.after!r})'
+
+
+class MembershipPlan:
+    """The member changes of every vault, and the vaults whose members could not be planned."""
+
+    __slots__ = ('changes', 'unchanged', 'errors')
+
+    def __init__(self):
+        self.changes = []
+        self.unchanged = {}
+        self.errors = {}
+
+    def report(self):
+        """Get a report of the planned changes by vault."""
+        vaults = {vault_id: _vault_report(count) for vault_id, count in self.unchanged.items()}
+        for change in self.changes:
+            vault = vaults.setdefault(change.vault_id, _vault_report(0))
+            if change.action == EDIT:
+                vault[EDIT][change.user_id] = [change.before, change.after]
+            else:
+                vault[change.action].append(change.user_id)
+        for vault_id, error in self.errors.items():
+            vaults.setdefault(vault_id, _vault_report(0))['error'] = error
+        return vaults
+
+
+def _vault_report(unchanged):
+    """Get an empty report of the changes of a vault."""
+    return {ADD: [], EDIT: {}, REMOVE: [], 'unchanged': unchanged, 'error': None}
+
+
+class MembershipReconciler:
+    """
+    Make the members of many vaults match a desired state with as few calls
+    as possible.
+
+    The desired state maps vault ids to {user: status}, where a user is a user
+    id or a username. Current members are fetched concurrently and diffed into
+    a plan of adds, status edits and, with prune, removals of members missing
+    from the desired state. Changes are applied concurrently, at most
+    rate_limit per second.
+    """
+
+    def __init__(self, api, max_workers=8, rate_limit=None, prune=True):
+        self.api = api
+        self.max_workers = max_workers
+        self.rate_limit = rate_limit
+        self.prune = prune
+
+    def __user_ids(self, desired):
+        """Get the ids of the users named by username in the desired state."""
+        names = {str(user) for members in desired.values() for user in members if not str(user).isdigit()}
+        if not names:
+            return {}
+        users = listing_entries(self.api.list_users(), 'users', 'USERS')
+        return {user['username']: str(user['id']) for user in users if user['username'] in names}
+
+    def plan(self, desired):
+        """Plan the member changes making every vault in desired match it, without sending any changes."""
+        plan = MembershipPlan()
+        user_ids = self.__user_ids(desired)
+        wanted = {}
+        for vault_id, members in desired.items():
+            vault_id = str(vault_id)
+            unknown = [str(user) for user in members if not str(user).isdigit() and str(user) not in user_ids]
+            if unknown:
+                plan.errors[vault_id] = f'Unknown users: {", ".join(sorted(unknown))}'
+                continue
+            wanted[vault_id] = {
+                str(user) if str(user).isdigit() else user_ids[str(user)]: int(status)
+                for user, status in members.items()}
+        for result in run_batch(self.api.vault_members, list(wanted), self.max_workers, ordered=False):
+            vault_id = result.item
+            try:
+                if result.error is not None:
+                    raise result.error
+                members = listing_entries(result.response, f'vault {vault_id}', 'MEMBERS')
+            except Exception as error:  # pylint: disable=broad-except
+                plan.errors[vault_id] = str(error)
+                continue
+            current = {str(member['userid']): int(member['status']) for member in members}
+            self.__diff(plan, vault_id, current, wanted[vault_id])
+        return plan
+
+    def __diff(self, plan, vault_id, current, wanted):
+        """Add the changes turning the current members of a vault into the wanted ones."""
+        changes = [
+            MemberChange(vault_id, user_id, ADD if user_id not in current else EDIT, current.get(user_id), status)
+            for user_id, status in wanted.items() if current.get(user_id) != status]
+        if self.prune:
+            changes += [
+                MemberChange(vault_id, user_id, REMOVE, status, None)
+                for user_id, status in current.items() if user_id not in wanted]
+        plan.changes.extend(changes)
+        plan.unchanged[vault_id] = sum(1 for user_id, status in wanted.items() if current.get(user_id) == status)
+
+    def __apply(self, change):
+        if change.action == ADD:
+            return self.api.add_vault_member(change.vault_id, change.user_id, change.after)
+        if change.action == EDIT:
+            return self.api.edit_vault_member(change.vault_id, change.user_id, change.after)
+        return self.api.remove_vault_member(change.vault_id, change.user_id)
+
+    def apply(self, plan, ordered=False):
+        """Apply the changes of a plan, yielding a BatchResult per change as soon as it completes."""
+        limiter = None if self.rate_limit is None else RateLimiter(self.rate_limit)
+        return run_batch(self.__apply, plan.changes, self.max_workers, ordered, limiter)
+
+    def reconcile(self, desired, plan_only=False):
+        """
+        Plan and, unless plan_only, apply the changes making every vault in
+        desired match it. Returns the plan report by vault, where applied
+        changes are counted in applied and failed ones listed in failed.
+        """
+        plan = self.plan(desired)
+        report = plan.report()
+        if plan_only:
+            return report
+        for vault in report.values():
+            vault.update(applied=0, failed={})
+        for result in self.apply(plan):
+            vault = report[result.item.vault_id]
+            if result.ok:
+                vault['applied'] += 1
+            else:
+                vault['failed'][result.item.user_id] = str(result.error or f'HTTP {result.response.status_code}')
+        return report
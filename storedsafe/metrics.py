@@ -0,0 +1,180 @@
+"""Per-endpoint latency, status and traffic metrics for StoredSafe API calls."""
+import re
+import bisect
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Path segments that name an endpoint rather than a resource.
+_LITERALS = frozenset((
+    'members', 'member', 'logout', 'check', 'statusvalues', 'policies', 'version', 'pwgen', 'get_mime_type'))
+_API_PATH = re.compile(r'^/api/[^/]+/')
+
+
+def endpoint(url):
+    """Get the endpoint of an API url with resource ids replaced, e.g. `vault/{id}/members`."""
+    segments = _API_PATH.sub('', urlsplit(url).path).strip('/').split('/')
+    return '/'.join(
+        [segments[0]] + [segment if segment in _LITERALS else '{id}' for segment in segments[1:]])
+
+
+class EndpointStats:
+    """Latency histogram, status codes and traffic of one method and endpoint."""
+
+    __slots__ = (
+        'count', 'errors', 'latency_sum', 'buckets', 'statuses',
+        'bytes_sent', 'bytes_received', 'reused', 'recent')
+
+    def __init__(self, bucket_count, window):
+        self.count = 0
+        self.errors = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (bucket_count + 1)
+        self.statuses = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.reused = 0
+        self.recent = deque(maxlen=window)
+
+    def percentile(self, percent):
+        """Get the latency percentile over the most recent requests."""
+        if not self.recent:
+            return 0.0
+        latencies = sorted(self.recent)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+
+class MetricsCollector:
+    """
+    In-process collector of per-endpoint request metrics.
+
+    Latencies go into fixed histogram buckets for export, and the most recent
+    window of latencies per endpoint is kept for percentile summaries.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=1024):
+        self.buckets = tuple(buckets)
+        self.window = window
+        self.endpoints = {}
+        self.__lock = threading.Lock()
+
+    # pylint: disable=too-many-arguments
+    def observe(self, method, url, elapsed, status=None, bytes_sent=0, bytes_received=0, reused=None):
+        """Record one request, with status None if it failed without a response."""
+        key = (method.upper(), endpoint(url))
+        with self.__lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats(len(self.buckets), self.window)
+            stats.count += 1
+            stats.latency_sum += elapsed
+            stats.buckets[bisect.bisect_left(self.buckets, elapsed)] += 1
+            stats.recent.append(elapsed)
+            if status is None:
+                stats.errors += 1
+            else:
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            if reused:
+                stats.reused += 1
+
+    def record(self, method, url, elapsed, res=None, streamed=False):
+        """
+        Record a request from its response, or as failed if res is None.
+
+        The body of a streamed response is not read to measure its size when
+        the Content-Length header is missing.
+        """
+        if res is None:
+            self.observe(method, url, elapsed)
+            return
+        request = getattr(res, 'request', None)
+        headers = getattr(res, 'headers', {})
+        received = headers.get('Content-Length')
+        if received is None and not streamed:
+            received = len(getattr(res, 'content', b'') or b'')
+        self.observe(
+            method, url, elapsed, res.status_code,
+            int(request.headers.get('Content-Length') or 0) if request is not None else 0,
+            int(received or 0),
+            getattr(res, 'connection_reused', None))
+
+    def summary(self):
+        """Get count, errors, statuses, traffic and latency percentiles by 'METHOD endpoint'."""
+        with self.__lock:
+            return {
+                f'{method} {path}': {
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'statuses': dict(stats.statuses),
+                    'mean': stats.latency_sum / stats.count,
+                    'p50': stats.percentile(50),
+                    'p90': stats.percentile(90),
+                    'p99': stats.percentile(99),
+                    'bytes_sent': stats.bytes_sent,
+                    'bytes_received': stats.bytes_received,
+                    'reused': stats.reused,
+                } for (method, path), stats in sorted(self.endpoints.items())
+            }
+
+    def reset(self):
+        """Drop all recorded metrics."""
+        with self.__lock:
+            self.endpoints = {}
+
+    def snapshot(self):
+        """Get a consistent copy of the stats by (method, endpoint) for exporters."""
+        with self.__lock:
+            return {
+                key: (stats.count, stats.errors, stats.latency_sum, list(stats.buckets), dict(stats.statuses),
+                      stats.bytes_sent, stats.bytes_received, stats.reused)
+                for key, stats in self.endpoints.items()
+            }
+
+
+class Exporter:
+    """Interface of metrics exporters, rendering a collector in some format."""
+
+    def export(self, collector):
+        """Render the metrics of the collector."""
+        raise NotImplementedError()
+
+
+class PrometheusExporter(Exporter):
+    """Render metrics in the Prometheus text exposition format."""
+
+    def __init__(self, prefix='storedsafe'):
+        self.prefix = prefix
+
+    def export(self, collector):
+        prefix = self.prefix
+        lines = [
+            f'# HELP {prefix}_request_duration_seconds StoredSafe API request latency.',
+            f'# TYPE {prefix}_request_duration_seconds histogram',
+        ]
+        counters = {
+            'responses_total': [], 'errors_total': [], 'sent_bytes_total': [],
+            'received_bytes_total': [], 'reused_connections_total': []}
+        for (method, path), snapshot in sorted(collector.snapshot().items()):
+            count, errors, latency_sum, buckets, statuses, sent, received, reused = snapshot
+            labels = f'method="{method}",endpoint="{path}"'
+            cumulative = 0
+            for bound, bucket in zip(collector.buckets + (float('inf'),), buckets):
+                cumulative += bucket
+                bound = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_request_duration_seconds_sum{{{labels}}} {latency_sum}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{{labels}}} {count}')
+            for status, status_count in sorted(statuses.items()):
+                counters['responses_total'].append(f'{{{labels},status="{status}"}} {status_count}')
+            counters['errors_total'].append(f'{{{labels}}} {errors}')
+            counters['sent_bytes_total'].append(f'{{{labels}}} {sent}')
+            counters['received_bytes_total'].append(f'{{{labels}}} {received}')
+            counters['reused_connections_total'].append(f'{{{labels}}} {reused}')
+        for name, samples in counters.items():
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            lines.extend(f'{prefix}_{name}{sample}' for sample in samples)
+        return '\n'.join(lines) + '\n'
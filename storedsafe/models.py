@@ -0,0 +1,290 @@
+"""
+Typed, lazily parsed views of StoredSafe API responses.
+
+Wrap any response in a Result to get typed models instead of nested dicts:
+
+    result = Result(api.vault_objects(vault_id))
+    for obj in result.objects:
+        print(obj.id, obj.name, obj.public)
+
+Models only hold a reference to their entry of the JSON data and convert
+fields when they are accessed. Listings create a model per entry while
+iterating instead of up front. The raw response is kept on the result, and
+attributes not defined by Result, such as status_code and json(), are
+looked up on it, so a Result can stand in for the response.
+"""
+
+
+def _int(value):
+    """Convert a numeric string to int, leaving other values as they are."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _bool(value):
+    """Convert API flags such as '1', 1, 'true' or True to bool."""
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+class Field:
+    """Descriptor reading a key of the raw entry of a model, converted on access."""
+
+    __slots__ = ('key', 'convert', 'default')
+
+    def __init__(self, key, convert=None, default=None):
+        self.key = key
+        self.convert = convert
+        self.default = default
+
+    def __get__(self, model, owner=None):
+        if model is None:
+            return self
+        value = model.raw
+        for key in self.key.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is None:
+            return self.default
+        return value if self.convert is None else self.convert(value)
+
+
+class Model:
+    """Base of the typed models, wrapping one raw entry of the JSON data."""
+
+    __slots__ = ('raw',)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+    @classmethod
+    def fields(cls):
+        """Get the names of the fields of the model."""
+        return [
+            name for klass in reversed(cls.__mro__) for name, value in vars(klass).items()
+            if isinstance(value, Field)]
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.raw == other.raw
+
+    def __hash__(self):
+        return hash((type(self), str(self.raw.get('id'))))
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.fields()[:3])
+        return f'{type(self).__name__}({values})'
+
+
+class CallInfo(Model):
+    """The CALLINFO of a response."""
+
+    __slots__ = ()
+
+    status = Field('status')
+    errorcodes = Field('errorcodes', _int, 0)
+    errors = Field('errors', default=())
+    token = Field('token')
+    user_id = Field('userid')
+    username = Field('username')
+    fullname = Field('fullname')
+    timeout = Field('timeout', _int)
+
+    @property
+    def ok(self):
+        """True if the call succeeded."""
+        return self.status == 'SUCCESS'
+
+
+class Vault(Model):
+    """A vault."""
+
+    __slots__ = ()
+
+    id = Field('id', str)
+    name = Field('groupname')
+    policy = Field('policy', _int)
+    description = Field('description', default='')
+    status = Field('status', _int)
+
+
+class Object(Model):
+    """An object, with its encrypted fields if it was decrypted."""
+
+    __slots__ = ()
+
+    id = Field('id', str)
+    parent_id = Field('parentid', str)
+    template_id = Field('templateid', str)
+    vault_id = Field('groupid', str)
+    name = Field('objectname', default='')
+    filename = Field('filename', default='')
+    status = Field('status', _int)
+    tags = Field('tags', default='')
+    children = Field('children', _int, 0)
+    public = Field('public', dict, {})
+    crypted = Field('crypted', dict)
+
+    @property
+    def decrypted(self):
+        """True if the encrypted fields are included."""
+        return self.crypted is not None
+
+    def __getitem__(self, field):
+        """Get the value of a public or decrypted template field."""
+        for values in (self.raw.get('public'), self.raw.get('crypted')):
+            if isinstance(values, dict) and field in values:
+                return values[field]
+        raise KeyError(field)
+
+    def get(self, field, default=None):
+        """Get the value of a template field, or default if it is not set."""
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+
+class Template(Model):
+    """An object template."""
+
+    __slots__ = ()
+
+    id = Field('id', str)
+    name = Field('info.name')
+    icon = Field('info.ico')
+    is_file = Field('info.file', _bool, False)
+    structure = Field('structure', dict, {})
+
+    @property
+    def field_names(self):
+        """Get the names of the template fields."""
+        return list(self.structure)
+
+    @property
+    def encrypted_fields(self):
+        """Get the names of the encrypted template fields."""
+        return [name for name, field in self.structure.items() if _bool(field.get('encrypted'))]
+
+
+class User(Model):
+    """A user."""
+
+    __slots__ = ()
+
+    id = Field('id', str)
+    username = Field('username')
+    fullname = Field('fullname', default='')
+    email = Field('email', default='')
+    admin = Field('admin', _bool, False)
+    active = Field('active', _bool, True)
+
+
+class Listing:
+    """
+    Lazy sequence of models over a list, or a dict keyed by id, of raw entries.
+
+    A model is created for an entry each time it is accessed, so iterating
+    a large listing does not keep a model per entry alive.
+    """
+
+    __slots__ = ('raw', 'model')
+
+    def __init__(self, raw, model):
+        self.raw = list(raw.values()) if isinstance(raw, dict) else (raw or [])
+        self.model = model
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __iter__(self):
+        model = self.model
+        for entry in self.raw:
+            yield model(entry)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Listing(self.raw[index], self.model)
+        return self.model(self.raw[index])
+
+    def __bool__(self):
+        return bool(self.raw)
+
+    def get(self, item_id, default=None):
+        """Get the model of the entry with the id, or default."""
+        item_id = str(item_id)
+        return next((self.model(entry) for entry in self.raw if str(entry.get('id')) == item_id), default)
+
+    def __repr__(self):
+        return f'Listing({self.model.__name__}, {len(self)})'
+
+
+class Result:
+    """
+    Typed view of a response, with the JSON data parsed on first access.
+
+    Listings come from the plural key of the data, e.g. VAULTS, and fall back
+    to the singular key, e.g. VAULT, so they work for list and get responses.
+    """
+
+    __slots__ = ('response', '__data')
+
+    def __init__(self, response):
+        self.response = response
+        self.__data = None
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    @property
+    def data(self):
+        """The JSON data of the response, or an empty dict if the body is not JSON."""
+        if self.__data is None:
+            try:
+                self.__data = self.response.json()
+            except ValueError:
+                self.__data = {}
+        return self.__data
+
+    @property
+    def ok(self):
+        """True if the response has a successful status."""
+        return self.response.status_code == 200
+
+    @property
+    def errors(self):
+        """The error messages of the response."""
+        return self.data.get('ERRORS', [])
+
+    @property
+    def callinfo(self):
+        """The CALLINFO of the response."""
+        return CallInfo(self.data.get('CALLINFO') or {})
+
+    def __listing(self, plural, singular, model):
+        data = self.data
+        return Listing(data.get(plural, data.get(singular)), model)
+
+    @property
+    def vaults(self):
+        """The vaults of the response."""
+        return self.__listing('VAULTS', 'VAULT', Vault)
+
+    @property
+    def objects(self):
+        """The objects of the response."""
+        return self.__listing('OBJECTS', 'OBJECT', Object)
+
+    @property
+    def templates(self):
+        """The templates of the response."""
+        return self.__listing('TEMPLATES', 'TEMPLATE', Template)
+
+    @property
+    def users(self):
+        """The users of the response."""
+        return self.__listing('USERS', 'USER', User)
+
+    def __repr__(self):
+        return f'Result({self.response.status_code})'
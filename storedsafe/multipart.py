@@ -0,0 +1,120 @@
+"""Streaming multipart/form-data encoding for file uploads."""
+import os
+import time
+import binascii
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class UploadProgress:
+    """Progress of a streaming upload, passed to the progress callback."""
+
+    __slots__ = ('sent', 'total', 'elapsed')
+
+    def __init__(self, sent, total, elapsed):
+        self.sent = sent
+        self.total = total
+        self.elapsed = elapsed
+
+    @property
+    def throughput(self):
+        """Average bytes per second sent so far."""
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return f'UploadProgress({self.sent}/{self.total} bytes, {self.throughput:.0f} B/s)'
+
+
+class MultipartFileEncoder:
+    """
+    File-like multipart/form-data body with form fields and one file part.
+
+    The body is produced on demand in chunks of at most chunk_size bytes, so
+    memory use is bounded regardless of file size. The length is known up
+    front, letting the request be sent with a Content-Length header. The file
+    is closed as soon as it has been read to the end, or on close().
+
+    If head is given, those bytes are used as the start of the file content
+    and fileobj must already be positioned right after them.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+            self, fields, name, filename, fileobj, size, head=b'',
+            content_type='application/octet-stream', chunk_size=DEFAULT_CHUNK_SIZE, callback=None):
+        self.boundary = binascii.hexlify(os.urandom(16)).decode()
+        self.chunk_size = chunk_size
+        self.callback = callback
+        self.__file = fileobj
+        self.__remaining = size - len(head)
+        self.__sent = 0
+        self.__started = None
+        preamble = b''.join(self.__field(key, value) for key, value in fields.items())
+        preamble += (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n').encode()
+        self.__buffer = preamble + head
+        self.__epilogue = f'\r\n--{self.boundary}--\r\n'.encode()
+        self.length = len(preamble) + size + len(self.__epilogue)
+
+    @classmethod
+    def from_path(cls, fields, name, path, head=b'', **kwargs):
+        """Create an encoder streaming the file at path, skipping the bytes already in head."""
+        size = os.stat(path).st_size
+        fileobj = open(path, 'rb')  # pylint: disable=consider-using-with
+        if head:
+            fileobj.seek(len(head))
+        return cls(fields, name, os.path.basename(path), fileobj, size, head, **kwargs)
+
+    def __field(self, key, value):
+        if not isinstance(value, bytes):
+            value = str(value).encode()
+        return (
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{key}"\r\n\r\n').encode() + value + b'\r\n'
+
+    @property
+    def content_type(self):
+        """The Content-Type header value of the body."""
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        """Read at most size bytes of the body, capped at chunk_size."""
+        if self.__started is None:
+            self.__started = time.monotonic()
+        if size is None or size < 0 or size > self.chunk_size:
+            size = self.chunk_size
+        if len(self.__buffer) < size and self.__file is not None:
+            data = self.__file.read(min(size - len(self.__buffer), self.__remaining))
+            self.__remaining -= len(data)
+            self.__buffer += data
+            if self.__remaining <= 0 or not data:
+                self.close()
+                self.__buffer += self.__epilogue
+        chunk, self.__buffer = self.__buffer[:size], self.__buffer[size:]
+        if chunk:
+            self.__sent += len(chunk)
+            if self.callback is not None:
+                self.callback(UploadProgress(self.__sent, self.length, time.monotonic() - self.__started))
+        return chunk
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    async def __aiter__(self):
+        for chunk in self:
+            yield chunk
+
+    def close(self):
+        """Close the underlying file."""
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
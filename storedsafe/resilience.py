@@ -0,0 +1,170 @@
+"""Retry with backoff and circuit breaking for transient StoredSafe failures."""
+import time
+import random
+import threading
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpenException(Exception):
+    """Request was not sent because the circuit breaker is open."""
+
+
+class RetryPolicy:
+    """
+    Retry idempotent requests on connection errors and transient statuses
+    with jittered exponential backoff, honoring Retry-After headers.
+
+    Only the methods in methods are retried, GET by default. POST requests
+    such as create_object and upload_file are never retried.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+            self, retries=3, backoff_factor=0.5, max_backoff=30.0, statuses=(429, 502, 503, 504),
+            methods=('GET',), respect_retry_after=True, max_retry_after=60.0):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.statuses = frozenset(statuses)
+        self.methods = frozenset(method.upper() for method in methods) - {'POST'}
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+
+    def can_retry(self, method, attempt, status=None):
+        """Check if a request may be retried after attempt attempts and the status, if any."""
+        return (
+            attempt < self.retries and method.upper() in self.methods
+            and (status is None or status in self.statuses))
+
+    def delay(self, attempt, retry_after=None):
+        """Get the seconds to wait before the next attempt."""
+        if retry_after is not None and self.respect_retry_after:
+            seconds = _parse_retry_after(retry_after)
+            if seconds is not None:
+                return min(seconds, self.max_retry_after)
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+
+def _parse_retry_after(value):
+    """Parse a Retry-After header given in seconds or as an HTTP date."""
+    from email.utils import parsedate_to_datetime  # pylint: disable=import-outside-toplevel
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Fail fast while the StoredSafe host is down.
+
+    After failure_threshold consecutive failures (connection errors or
+    statuses in failure_statuses) the circuit opens and requests raise
+    CircuitOpenException without being sent. After recovery_timeout seconds
+    one probe request is let through; its outcome closes or reopens the circuit.
+    """
+
+    def __init__(
+            self, failure_threshold=5, recovery_timeout=30.0, failure_statuses=(429, 500, 502, 503, 504),
+            clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failure_statuses = frozenset(failure_statuses)
+        self.failures = 0
+        self.opened_at = None
+        self.__clock = clock
+        self.__probing = False
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self):
+        """The current state, one of closed, open or half-open."""
+        if self.opened_at is None:
+            return CLOSED
+        if self.__clock() - self.opened_at >= self.recovery_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def before_request(self):
+        """Raise CircuitOpenException unless a request may be sent now."""
+        with self.__lock:
+            state = self.state
+            if state == OPEN or (state == HALF_OPEN and self.__probing):
+                raise CircuitOpenException(f'Circuit open after {self.failures} consecutive failures')
+            if state == HALF_OPEN:
+                self.__probing = True
+
+    def record(self, status=None):
+        """Record the outcome of a request, with status None if it failed without a response."""
+        with self.__lock:
+            self.__probing = False
+            if status is None or status in self.failure_statuses:
+                self.failures += 1
+                if self.failures >= self.failure_threshold or self.opened_at is not None:
+                    self.opened_at = self.__clock()
+            else:
+                self.failures = 0
+                self.opened_at = None
+
+    def release(self):
+        """Let another probe through after one ended without an outcome, such as an interrupted request."""
+        with self.__lock:
+            self.__probing = False
+
+    def reset(self):
+        """Close the circuit."""
+        with self.__lock:
+            self.failures = 0
+            self.opened_at = None
+            self.__probing = False
+
+    def stats(self):
+        """Get the state and consecutive failure count."""
+        return {'state': self.state, 'failures': self.failures}
+
+
+class Attempts:
+    """Track the attempts of one request under a retry policy and circuit breaker."""
+
+    __slots__ = ('retry', 'breaker', 'method', 'attempt')
+
+    def __init__(self, retry, breaker, method):
+        self.retry = retry
+        self.breaker = breaker
+        self.method = method
+        self.attempt = 0
+
+    def before(self):
+        """Check the circuit breaker before sending an attempt."""
+        if self.breaker is not None:
+            self.breaker.before_request()
+
+    def failed(self, error):
+        """Record a failed attempt and return the delay before retrying, or raise error."""
+        if self.breaker is not None:
+            self.breaker.record()
+        if self.retry is None or not self.retry.can_retry(self.method, self.attempt):
+            raise error
+        self.attempt += 1
+        return self.retry.delay(self.attempt - 1)
+
+    def abandoned(self):
+        """Release the circuit breaker after an attempt ended without an outcome to record."""
+        if self.breaker is not None:
+            self.breaker.release()
+
+    def responded(self, res):
+        """Record a response and return the delay before retrying, or None to return it."""
+        if self.breaker is not None:
+            self.breaker.record(res.status_code)
+        if self.retry is None or not self.retry.can_retry(self.method, self.attempt, res.status_code):
+            return None
+        self.attempt += 1
+        return self.retry.delay(self.attempt - 1, res.headers.get('Retry-After'))
@@ -0,0 +1,137 @@
+"""Short-lived in-memory cache of decrypted StoredSafe objects."""
+import time
+import threading
+from collections import OrderedDict
+
+
+class _Secret:
+    """A cached response body, held in a buffer that is overwritten when dropped."""
+
+    __slots__ = ('created', 'buffer')
+
+    def __init__(self, created, body):
+        self.created = created
+        self.buffer = bytearray(body)
+
+    def wipe(self):
+        """Overwrite the buffer with zeros and empty it."""
+        self.buffer[:] = bytes(len(self.buffer))
+        self.buffer.clear()
+
+
+class SecretCache:
+    """
+    Size-bounded cache of decrypt_object response bodies with a strict TTL.
+
+    Entries are keyed by object id and token, so sessions never share them,
+    and are dropped ttl seconds after they were fetched regardless of use.
+    When the cache is full the oldest entry is dropped. Dropped, expired and
+    invalidated bodies are overwritten in place. Every invalidation of an
+    object advances its generation, and bodies put with an older generation
+    than the current one, fetched before the object changed, are not cached. Responses handed to callers
+    are copies the cache cannot wipe, so keep them as short-lived as the
+    cached entries.
+    """
+
+    def __init__(self, maxsize=128, ttl=30.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.__hit_age_sum = 0.0
+        self.__clock = clock
+        self.__entries = OrderedDict()
+        self.__generations = {}
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __expire(self, now):
+        """Wipe the expired entries, which are the oldest ones."""
+        while self.__entries:
+            key, secret = next(iter(self.__entries.items()))
+            if now - secret.created < self.ttl:
+                return
+            del self.__entries[key]
+            secret.wipe()
+            self.expirations += 1
+
+    def get(self, object_id, token):
+        """Get a copy of the cached body of a decrypted object, or None if it is missing or expired."""
+        with self.__lock:
+            now = self.__clock()
+            self.__expire(now)
+            secret = self.__entries.get((str(object_id), token))
+            if secret is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.__hit_age_sum += now - secret.created
+            return bytes(secret.buffer)
+
+    def generation(self, object_id):
+        """Get the number of times an object was invalidated, to pass to put with its body."""
+        with self.__lock:
+            return self.__generations.get(str(object_id), 0)
+
+    def put(self, object_id, token, body, generation=None):
+        """
+        Cache the body of a decrypted object, dropping the oldest entries
+        beyond maxsize. The body is not cached if generation is given and the
+        object was invalidated since it was taken.
+        """
+        with self.__lock:
+            if generation is not None and generation != self.__generations.get(str(object_id), 0):
+                return
+            now = self.__clock()
+            key = (str(object_id), token)
+            previous = self.__entries.pop(key, None)
+            if previous is not None:
+                previous.wipe()
+            self.__entries[key] = _Secret(now, body)
+            self.__expire(now)
+            while len(self.__entries) > self.maxsize:
+                _, secret = self.__entries.popitem(last=False)
+                secret.wipe()
+                self.evictions += 1
+
+    def invalidate(self, object_id):
+        """Wipe the cached bodies of an object for every token."""
+        object_id = str(object_id)
+        with self.__lock:
+            self.__generations[object_id] = self.__generations.get(object_id, 0) + 1
+            for key in [key for key in self.__entries if key[0] == object_id]:
+                self.__entries.pop(key).wipe()
+                self.invalidations += 1
+
+    def clear(self):
+        """Wipe every cached body."""
+        with self.__lock:
+            for secret in self.__entries.values():
+                secret.wipe()
+            self.__entries.clear()
+
+    def stats(self):
+        """Get the hit ratio, age and drop counters of the cache."""
+        with self.__lock:
+            now = self.__clock()
+            self.__expire(now)
+            lookups = self.hits + self.misses
+            ages = [now - secret.created for secret in self.__entries.values()]
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'mean_hit_age': self.__hit_age_sum / self.hits if self.hits else 0.0,
+                'oldest_age': max(ages, default=0.0),
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'size': len(self.__entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+            }
@@ -0,0 +1,258 @@
+"""Session keep-alive and transparent re-authentication for long-running clients."""
+import time
+import asyncio
+import threading
+from urllib.parse import urlsplit
+
+
+class TotpCredentials:
+    """Log in with TOTP, calling otp() for a fresh one-time password on every login."""
+
+    def __init__(self, username, passphrase, otp):
+        self.username = username
+        self.passphrase = passphrase
+        self.otp = otp
+
+    def login(self, api):
+        """Request login, returning what the login method of api returns."""
+        return api.login_totp(self.username, self.passphrase, self.otp())
+
+
+class SmartcardCredentials:
+    """Log in with a client certificate over mTLS."""
+
+    def __init__(self, username, passphrase, cert, key):
+        self.username = username
+        self.passphrase = passphrase
+        self.cert = cert
+        self.key = key
+
+    def login(self, api):
+        """Request login, returning what the login method of api returns."""
+        return api.login_smartcard(self.username, self.passphrase, self.cert, self.key)
+
+
+def token_expired(res):
+    """Check if a response was rejected because the session token is no longer valid."""
+    if res.status_code == 401:
+        return True
+    if res.status_code != 403:
+        return False
+    try:
+        errors = res.json().get('ERRORS', [])
+    except ValueError:
+        return False
+    return any('token' in str(error).lower() for error in errors)
+
+
+def resendable(args):
+    """Check if the body of a request can be sent again, which streamed bodies and open files cannot."""
+    if hasattr(args.get('data'), 'read'):
+        return False
+    files = args.get('files') or {}
+    for value in files.values() if isinstance(files, dict) else (value for _, value in files):
+        if hasattr(value[1] if isinstance(value, (tuple, list)) else value, 'read'):
+            return False
+    return True
+
+
+class SessionManagerBase:
+    """
+    Shared keep-alive and re-login bookkeeping of the session managers.
+
+    The keep-alive interval starts at interval seconds and shrinks to half
+    of the shortest idle time after which the token was observed to expire.
+    Every login attempt starts a new generation, and failed ones are
+    recorded, so callers waiting on the same generation share one attempt.
+    The manager handles the expired tokens of api from creation or start
+    until stop.
+    """
+
+    def __init__(self, api, credentials, interval=300.0, min_interval=10.0, is_expired=token_expired):
+        self.api = api
+        self.credentials = credentials
+        self.interval = interval
+        self.min_interval = min_interval
+        self.is_expired = is_expired
+        self.last_activity = time.monotonic()
+        self.generation = 0
+        self.failed_generation = None
+        self.logins = 0
+        self.keepalives = 0
+
+    def _attach(self):
+        """Handle the expired tokens of the api."""
+        self.api.session_manager = self
+
+    def _detach(self):
+        """Stop handling the expired tokens of the api, unless another manager took over."""
+        if self.api.session_manager is self:
+            self.api.session_manager = None
+
+    def touch(self):
+        """Note that the token was successfully used."""
+        self.last_activity = time.monotonic()
+
+    def expired(self, url, args, res):
+        """Check if a request failed because the token expired and can be resent after login."""
+        if urlsplit(url).path.endswith('/auth') or not self.is_expired(res):
+            if res.status_code < 400:
+                self.touch()
+            return False
+        idle = time.monotonic() - self.last_activity
+        self.interval = max(self.min_interval, min(self.interval, idle / 2))
+        return resendable(args)
+
+    def _attempted(self, generation):
+        """
+        Check if a login was attempted after the request of generation was
+        sent, returning whether it succeeded, or None if none was attempted.
+        """
+        if self.generation == generation:
+            return None
+        return self.generation != self.failed_generation
+
+    def _logged_in(self, res):
+        """Start a new token generation, recorded as failed unless the login response was successful."""
+        self.generation += 1
+        if res.status_code != 200:
+            self.failed_generation = self.generation
+            return False
+        self.touch()
+        return True
+
+    def _due(self):
+        """Check if the session has been idle long enough to need a keep-alive."""
+        return time.monotonic() - self.last_activity >= self.interval
+
+    def stats(self):
+        """Get the keep-alive interval and the number of logins and keep-alives."""
+        return {'interval': self.interval, 'logins': self.logins, 'keepalives': self.keepalives}
+
+
+class SessionManager(SessionManagerBase):
+    """
+    Keep the token of a StoredSafe instance warm from a background thread and
+    log in again through credentials when it has expired.
+
+    Requests rejected because of an expired token are resent once after the
+    login. Concurrent callers wait for a single login instead of each
+    logging in on their own.
+    """
+
+    def __init__(self, api, credentials, **kwargs):
+        super().__init__(api, credentials, **kwargs)
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__thread = None
+        self._attach()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def refresh(self, generation):
+        """
+        Log in unless another caller already tried to after the request of
+        generation was sent, returning True if the request can be resent.
+        """
+        with self.__lock:
+            attempted = self._attempted(generation)
+            if attempted is not None:
+                return attempted
+            self.logins += 1
+            res = self.credentials.login(self.api)
+            return self._logged_in(res)
+
+    def start(self):
+        """Start the keep-alive thread."""
+        self._attach()
+        if self.__thread is None:
+            self.__stopped.clear()
+            self.__thread = threading.Thread(target=self.__run, name='storedsafe-keepalive', daemon=True)
+            self.__thread.start()
+        return self
+
+    def stop(self):
+        """Stop the keep-alive thread and logging in again on expired tokens."""
+        self._detach()
+        if self.__thread is not None:
+            self.__stopped.set()
+            self.__thread.join()
+            self.__thread = None
+
+    def __run(self):
+        while not self.__stopped.wait(min(self.interval, self.min_interval)):
+            if self._due():
+                self.keepalive()
+
+    def keepalive(self):
+        """Check the session, logging in again if the token has expired."""
+        self.keepalives += 1
+        try:
+            self.api.check()
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+
+class AsyncSessionManager(SessionManagerBase):
+    """Asyncio counterpart of SessionManager for AsyncStoredSafe, keeping the token warm from a task."""
+
+    def __init__(self, api, credentials, **kwargs):
+        super().__init__(api, credentials, **kwargs)
+        self.__lock = asyncio.Lock()
+        self.__task = None
+        self._attach()
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def refresh(self, generation):
+        """
+        Log in unless another caller already tried to after the request of
+        generation was sent, returning True if the request can be resent.
+        """
+        async with self.__lock:
+            attempted = self._attempted(generation)
+            if attempted is not None:
+                return attempted
+            self.logins += 1
+            res = await self.credentials.login(self.api)
+            return self._logged_in(res)
+
+    def start(self):
+        """Start the keep-alive task on the running event loop."""
+        self._attach()
+        if self.__task is None:
+            self.__task = asyncio.ensure_future(self.__run())
+        return self
+
+    async def stop(self):
+        """Stop the keep-alive task and logging in again on expired tokens."""
+        self._detach()
+        if self.__task is not None:
+            self.__task.cancel()
+            try:
+                await self.__task
+            except asyncio.CancelledError:
+                pass
+            self.__task = None
+
+    async def __run(self):
+        while True:
+            await asyncio.sleep(min(self.interval, self.min_interval))
+            if self._due():
+                await self.keepalive()
+
+    async def keepalive(self):
+        """Check the session, logging in again if the token has expired."""
+        self.keepalives += 1
+        try:
+            await self.api.check()
+        except Exception:  # pylint: disable=broad-except
+            pass
@@ -0,0 +1,154 @@
+"""Incremental synchronization of StoredSafe vault objects to a local mirror."""
+import os
+import json
+import time
+import hashlib
+from pathlib import Path
+from .batch import run_batch
+from .index import listing_objects
+
+
+def fingerprint(entry):
+    """Get a stable fingerprint of a vault listing entry."""
+    return hashlib.sha256(json.dumps(entry, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+class SyncReport:
+    """Outcome of a sync run."""
+
+    __slots__ = ('added', 'changed', 'deleted', 'unchanged', 'errors', 'elapsed')
+
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.deleted = []
+        self.unchanged = 0
+        self.errors = {}
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        """True if every listing and object was fetched."""
+        return not self.errors
+
+    def __repr__(self):
+        return (
+            f'SyncReport(added={len(self.added)}, changed={len(self.changed)}, deleted={len(self.deleted)}, '
+            f'unchanged={self.unchanged}, errors={len(self.errors)}, elapsed={self.elapsed:.2f}s)')
+
+
+class VaultSync:
+    """
+    Keep a local mirror of vault objects in sync by fingerprinting each entry
+    of the vault listings and only fetching objects that were added or changed.
+
+    on_change(object_id, data) is called with the JSON data of every fetched
+    object and on_delete(object_id) for every object gone from its vault. The
+    fingerprints are checkpointed to state_path as objects are mirrored, so an
+    interrupted sync resumes where it stopped instead of starting over.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+            self, api, state_path, on_change, on_delete=None,
+            decrypt=False, max_workers=8, checkpoint_every=100):
+        self.api = api
+        self.state_path = Path(state_path)
+        self.on_change = on_change
+        self.on_delete = on_delete
+        self.decrypt = decrypt
+        self.max_workers = max_workers
+        self.checkpoint_every = checkpoint_every
+        self.objects = self.__load()
+
+    def __load(self):
+        """Load the fingerprints of the mirrored objects, by object id."""
+        try:
+            with self.state_path.open('r') as state_file:
+                return json.load(state_file)['objects']
+        except FileNotFoundError:
+            return {}
+
+    def checkpoint(self):
+        """Atomically write the fingerprints of the mirrored objects to the state file."""
+        tmp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        with tmp_path.open('w') as state_file:
+            json.dump({'objects': self.objects}, state_file)
+        os.replace(tmp_path, self.state_path)
+
+    def __listings(self, vault_ids, report):
+        """
+        Fetch the listings of vault_ids, or all vaults, by vault id. When all
+        vaults are listed, mirrored vaults no longer among them, because they
+        were deleted or access to them was revoked, are listed as empty.
+        """
+        listings = {}
+        if vault_ids is None:
+            res = self.api.list_vaults()
+            if res.status_code != 200:
+                report.errors['vaults'] = f'HTTP {res.status_code}'
+                return {}
+            vault_ids = [vault['id'] for vault in res.json().get('VAULTS', [])]
+            listed = {str(vault_id) for vault_id in vault_ids}
+            listings = {state['vault']: [] for state in self.objects.values() if state['vault'] not in listed}
+        for result in run_batch(self.api.vault_objects, vault_ids, self.max_workers):
+            if result.error is not None or result.response.status_code != 200:
+                report.errors[f'vault/{result.item}'] = result.error or f'HTTP {result.response.status_code}'
+            else:
+                listings[str(result.item)] = listing_objects(result.response.json())
+        return listings
+
+    def run(self, vault_ids=None):
+        """
+        Sync the objects of vault_ids, or all vaults, and return a SyncReport.
+
+        Objects in vaults whose listing failed are left as they are, and
+        objects that failed to fetch are retried on the next run. Syncing all
+        vaults also deletes the objects of vaults that are no longer listed.
+        """
+        started = time.perf_counter()
+        report = SyncReport()
+        listings = self.__listings(vault_ids, report)
+        wanted = {}
+        for vault_id, entries in listings.items():
+            for entry in entries:
+                object_id = str(entry['id'])
+                known = self.objects.get(object_id)
+                digest = fingerprint(entry)
+                if known is not None and known['fingerprint'] == digest:
+                    known['vault'] = vault_id
+                    report.unchanged += 1
+                else:
+                    wanted[object_id] = {'vault': vault_id, 'fingerprint': digest, 'new': known is None}
+        try:
+            self.__fetch(wanted, report)
+            self.__delete(listings, report)
+        finally:
+            self.checkpoint()
+        report.elapsed = time.perf_counter() - started
+        return report
+
+    def __fetch(self, wanted, report):
+        """Fetch the added and changed objects, checkpointing as they complete."""
+        fetch = self.api.decrypt_object if self.decrypt else self.api.get_object
+        for count, result in enumerate(run_batch(fetch, wanted, self.max_workers, ordered=False), 1):
+            object_id = result.item
+            if result.error is not None or result.response.status_code != 200:
+                report.errors[object_id] = result.error or f'HTTP {result.response.status_code}'
+            else:
+                self.on_change(object_id, result.response.json())
+                state = wanted[object_id]
+                (report.added if state.pop('new') else report.changed).append(object_id)
+                self.objects[object_id] = state
+            if count % self.checkpoint_every == 0:
+                self.checkpoint()
+
+    def __delete(self, listings, report):
+        """Drop mirrored objects missing from the fetched vault listings."""
+        listed = {str(entry['id']) for entries in listings.values() for entry in entries}
+        for object_id, state in list(self.objects.items()):
+            if state['vault'] in listings and object_id not in listed:
+                if self.on_delete is not None:
+                    self.on_delete(object_id)
+                del self.objects[object_id]
+                report.deleted.append(object_id)
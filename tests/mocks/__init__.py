@@ -5,3 +5,4 @@ from .mock_object import *
 from .mock_template import *
 from .mock_user import *
 from .mock_utils import *
+from .mock_server import MockServer, HAS_OPENSSL
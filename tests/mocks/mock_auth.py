@@ -7,7 +7,7 @@ from .mock_response import *
 
 def login_totp(*args, **kwargs):
     """Send mocked response for totp login."""
-    data = kwargs.get('json', {})
+    data = json_body(**kwargs)
     if is_endpoint('/api/1.0/auth', args[0]):
         login_type = data.get('logintype', 'yubikey')
         if login_type == 'totp':
@@ -24,7 +24,7 @@ def login_totp(*args, **kwargs):
 
 def login_yubikey(*args, **kwargs):
     """Send mocked response for yubikey login."""
-    data = kwargs.get('json', {})
+    data = json_body(**kwargs)
     if is_endpoint('/api/1.0/auth', args[0]):
         login_type = data.get('logintype', 'yubikey')
         if login_type == 'yubikey':
@@ -41,7 +41,7 @@ def login_yubikey(*args, **kwargs):
 
 def login_smartcard(*args, **kwargs):
     """Send mocked response for smartcard login."""
-    data = kwargs.get('json', {})
+    data = json_body(**kwargs)
     if is_endpoint('/api/1.0/auth', args[0], mtls=True):
         login_type = data.get('logintype', 'yubikey')
         if login_type == 'smartcard':
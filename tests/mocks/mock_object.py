@@ -1,8 +1,9 @@
 """
 /object endpoint mocks
 """
+import json
 import mocks.mock_response as mockr
-from base64 import b64encode
+from base64 import b64encode, urlsafe_b64encode
 
 
 def get_object(*args, **kwargs):
@@ -50,7 +51,7 @@ def get_file(*args, **kwargs):
 
 def get_mime_type(*args, **kwargs):
     """Send mocked response for getting file mime type."""
-    data = kwargs.get("json", {})
+    data = mockr.json_body(**kwargs)
     if mockr.is_endpoint("/api/1.0/utils/get_mime_type", args[0]):
         if (
             mockr.has_valid_token(**kwargs)
@@ -76,19 +77,17 @@ def filecollect(*args, **kwargs):
     return mockr.MockNotFound(**kwargs)
 
 def file_upload(*args, **kwargs):
-    """Send mocked response for filecollect."""
-    data = kwargs.get("data", {})
-    files = kwargs.get("files", {})
-    # Close file pointer since requests isn't doing it due to mock
-    content = files.get('upload').read()
-    files.get('upload').close()
+    """Send mocked response for file upload."""
+    encoder = kwargs.get("data")
+    body = b"".join(encoder)
+    data, files = mockr.parse_multipart(kwargs.get("headers", {}).get("Content-Type"), body)
     if mockr.is_endpoint("/api/1.0/object", args[0]):
         if (
             mockr.has_valid_token(**kwargs)
-            and data == mockr.MOCK_FILE_PARAMS
-            and files.get("upload").name.endswith(mockr.MOCK_FILE_EXTENSION)
-            and files.get("upload").mode == "rb"
-            and content == mockr.MOCK_FILE_CONTENT
+            and data == {key: str(value) for key, value in mockr.MOCK_FILE_PARAMS.items()}
+            and files.get("upload")[0].endswith(mockr.MOCK_FILE_EXTENSION)
+            and files.get("upload")[1] == mockr.MOCK_FILE_CONTENT
+            and len(body) == len(encoder)
         ):
             return mockr.MockSuccess(**kwargs)
         return mockr.MockError(**kwargs)
@@ -97,7 +96,7 @@ def file_upload(*args, **kwargs):
 
 def create_object(*args, **kwargs):
     """Send mocked response for creating an object."""
-    data = kwargs.get("json", {})
+    data = mockr.json_body(**kwargs)
     if mockr.is_endpoint("/api/1.0/object", args[0]):
         if mockr.has_valid_token(**kwargs) and data == mockr.MOCK_PARAMS:
             return mockr.MockSuccess(**kwargs)
@@ -107,7 +106,7 @@ def create_object(*args, **kwargs):
 
 def edit_object(*args, **kwargs):
     """Send mocked response for editing an object."""
-    data = kwargs.get("json", {})
+    data = mockr.json_body(**kwargs)
     if mockr.is_endpoint(f"/api/1.0/object/{mockr.MOCK_OBJECT_ID}", args[0]):
         if mockr.has_valid_token(**kwargs) and data == mockr.MOCK_PARAMS:
             return mockr.MockSuccess(**kwargs)
@@ -132,3 +131,22 @@ def find(*args, **kwargs):
             return mockr.MockSuccess(**kwargs)
         return mockr.MockError(**kwargs)
     return mockr.MockNotFound(**kwargs)
+
+
+def download_file(*args, **kwargs):
+    """Send mocked streaming response for getting file."""
+    data = kwargs.get("params", {})
+    if mockr.is_endpoint(f"/api/1.0/object/{mockr.MOCK_OBJECT_ID}", args[0]):
+        if (
+            mockr.has_valid_token(**kwargs)
+            and kwargs.get("stream")
+            and data.get("decrypt") == "true"
+            and data.get("filedata") == "true"
+        ):
+            body = json.dumps({
+                "OBJECT": [{"id": str(mockr.MOCK_OBJECT_ID), "filename": "file.txt"}],
+                "FILEDATA": urlsafe_b64encode(mockr.MOCK_FILE_CONTENT).decode(),
+            }).encode()
+            return mockr.MockStreamResponse(body, 200, **kwargs)
+        return mockr.MockStreamResponse(b'{"ERRORS": ["Denied"]}', 403, **kwargs)
+    return mockr.MockNotFound(**kwargs)
@@ -5,6 +5,10 @@ Because the wrapper is transparent, the only required return data
 is the token on login requests and the HTTP status to indicate whether
 the request was correct or not.
 """
+import json
+from email.parser import BytesParser
+from email.policy import HTTP
+
 MOCK_HOST = "test.storedsafe.com"
 MOCK_URL = f"https://{MOCK_HOST}"
 MOCK_URL_MTLS = f"https://{MOCK_HOST}:8443"
@@ -82,6 +86,29 @@ class MockSuccess(MockResponse):
         super().__init__({}, 200, **kwargs)
 
 
+class MockStreamResponse(MockResponse):
+    """MockResponse with a raw body that can be streamed in chunks"""
+
+    def __init__(self, body, status_code, **kwargs):
+        super().__init__(None, status_code, **kwargs)
+        self.body = body
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        """Yields the body in chunks."""
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    @property
+    def content(self):
+        """Returns the whole body."""
+        return self.body
+
+    def close(self):
+        """Mark the response as closed."""
+        self.closed = True
+
+
 def is_endpoint(endpoint, url, mtls=False):
     """Check if the intended enpoint matches the URL"""
     if mtls:
@@ -89,6 +116,12 @@ def is_endpoint(endpoint, url, mtls=False):
     return url == MOCK_URL + endpoint
 
 
+def json_body(**kwargs):
+    """Decode the JSON body of a request"""
+    data = kwargs.get('data')
+    return json.loads(data) if isinstance(data, bytes) else {}
+
+
 def has_valid_token(**kwargs):
     """Check if a valid token exists in the header"""
     headers = kwargs.get('headers', {})
@@ -102,3 +135,19 @@ def has_merged_options(options):
         options.get('option_override') == 2 and\
         headers.get('x-http-default') == 1 and\
         headers.get('x-http-override') == 2
+
+
+def parse_multipart(content_type, body):
+    """Parse a multipart/form-data body into form fields and files"""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f'Content-Type: {content_type}\r\n\r\n'.encode() + body)
+    data, files = {}, {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        filename = part.get_filename()
+        content = part.get_payload(decode=True)
+        if filename is None:
+            data[name] = content.decode()
+        else:
+            files[name] = (filename, content)
+    return data, files
@@ -0,0 +1,102 @@
+"""
+Local HTTPS stand-in for the StoredSafe REST-like API.
+
+Every request is answered with a JSON echo of what the server received, so
+tests can assert on the method, path, query, token and body. Logins with the
+mocked credentials return the mocked token. With http2, clients selecting h2
+through ALPN are answered over HTTP/2.
+"""
+import json
+import shutil
+import ssl
+import tempfile
+import threading
+from base64 import b64encode
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from storedsafe.fake import create_self_signed_cert
+from benchmarks.h2bridge import H2TLSServer
+from .mock_response import (
+    MOCK_TOKEN, MOCK_APIKEY, MOCK_USERNAME, MOCK_PASSPHRASE, MOCK_OTP, MOCK_FILE_CONTENT)
+
+HAS_OPENSSL = shutil.which('openssl') is not None
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    """Echo each request as JSON."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    def __respond(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def __handle(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        content_type = self.headers.get('Content-Type', '')
+        body = None
+        if content_type.startswith('application/json') and raw:
+            body = json.loads(raw)
+        elif raw:
+            body = raw.decode('utf-8', 'replace')
+        if url.path == '/api/1.0/auth' and self.command == 'POST':
+            if (
+                    body.get('username') == MOCK_USERNAME and
+                    body.get('passphrase') == MOCK_PASSPHRASE and
+                    body.get('otp') == MOCK_OTP and
+                    body.get('apikey') == MOCK_APIKEY
+            ):
+                self.__respond(200, {'CALLINFO': {'token': MOCK_TOKEN}})
+            else:
+                self.__respond(403, {'ERRORS': ['Authentication failed']})
+            return
+        if self.headers.get('X-Http-Token') != MOCK_TOKEN:
+            self.__respond(403, {'ERRORS': ['Invalid token']})
+            return
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if query.get('filedata') == 'true':
+            self.__respond(200, {'FILEDATA': b64encode(MOCK_FILE_CONTENT).decode()})
+            return
+        self.__respond(200, {
+            'method': self.command,
+            'path': url.path,
+            'query': query,
+            'content_type': content_type,
+            'body': body,
+        })
+
+    do_GET = do_POST = do_PUT = do_DELETE = __handle
+
+
+class MockServer:
+    """Run the mock request handler over HTTPS in a background thread, and over HTTP/2 with http2."""
+
+    def __init__(self, http2=False):
+        self.__tmpdir = tempfile.TemporaryDirectory()
+        self.cert, key = create_self_signed_cert(self.__tmpdir.name)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.cert, key)
+        context.set_alpn_protocols(['h2', 'http/1.1'] if http2 else ['http/1.1'])
+        self.server = H2TLSServer(('127.0.0.1', 0), MockRequestHandler, context)
+        self.host = f'127.0.0.1:{self.server.server_address[1]}'
+        self.__thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        """Start serving in the background."""
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and clean up the certificate."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.__tmpdir.cleanup()
@@ -34,7 +34,7 @@ def get_user(*args, **kwargs):
 
 def create_user(*args, **kwargs):
     """Send mocked response creating user."""
-    data = kwargs.get('json', {})
+    data = json_body(**kwargs)
     if is_endpoint('/api/1.0/user', args[0]):
         if has_valid_token(**kwargs) and data == MOCK_PARAMS:
             return MockSuccess(**kwargs)
@@ -44,7 +44,7 @@ def create_user(*args, **kwargs):
 
 def edit_user(*args, **kwargs):
     """Send mocked response editing user."""
-    data = kwargs.get('json', {})
+    data = json_body(**kwargs)
     if is_endpoint(f'/api/1.0/user/{MOCK_USER_ID}', args[0]):
         if has_valid_token(**kwargs) and data == MOCK_PARAMS:
             return MockSuccess(**kwargs)
@@ -34,7 +34,7 @@ def vault_members(*args, **kwargs):
 
 def add_vault_member(*args, **kwargs):
     """Send mocked response for adding a member to a vault."""
-    data = kwargs.get('json', {})
+    data = json_body(**kwargs)
     if is_endpoint(f'/api/1.0/vault/{MOCK_VAULT_ID}/member/{MOCK_USER_ID}', args[0]):
         if has_valid_token(**kwargs) and data.get('status') == MOCK_STATUS:
             return MockSuccess(**kwargs)
@@ -44,7 +44,7 @@ def add_vault_member(*args, **kwargs):
 
 def edit_vault_member(*args, **kwargs):
     """Send mocked response for editing a member in a vault."""
-    data = kwargs.get('json', {})
+    data = json_body(**kwargs)
     if is_endpoint(f'/api/1.0/vault/{MOCK_VAULT_ID}/member/{MOCK_USER_ID}', args[0]):
         if has_valid_token(**kwargs) and data.get('status') == MOCK_STATUS:
             return MockSuccess(**kwargs)
@@ -63,7 +63,7 @@ def remove_vault_member(*args, **kwargs):
 
 def create_vault(*args, **kwargs):
     """Send mocked response for creating a vault."""
-    data = kwargs.get('json', {})
+    data = json_body(**kwargs)
     if is_endpoint('/api/1.0/vault', args[0]):
         if has_valid_token(**kwargs) and data == MOCK_PARAMS:
             return MockSuccess(**kwargs)
@@ -73,7 +73,7 @@ def create_vault(*args, **kwargs):
 
 def edit_vault(*args, **kwargs):
     """Send mocked response for editing a vault."""
-    data = kwargs.get('json', {})
+    data = json_body(**kwargs)
     if is_endpoint(f'/api/1.0/vault/{MOCK_VAULT_ID}', args[0]):
         if has_valid_token(**kwargs) and data == MOCK_PARAMS:
             return MockSuccess(**kwargs)
@@ -88,3 +88,45 @@ def delete_vault(*args, **kwargs):
             return MockSuccess(**kwargs)
         return MockError(**kwargs)
     return MockNotFound(**kwargs)
+
+
+MOCK_LISTINGS = {
+    '1': {
+        'OBJECTS': [
+            {'id': '10', 'templateid': '1', 'objectname': 'web01.example.com',
+             'public': {'host': 'web01.example.com', 'username': 'root'}},
+            {'id': '11', 'templateid': '4', 'objectname': 'Waldo Nilsson', 'public': {'username': 'waldo'}},
+        ],
+        'TEMPLATES': [{'id': '1', 'name': 'Server'}, {'id': '4', 'name': 'Login'}],
+    },
+    '2': {
+        'OBJECTS': [
+            {'id': '20', 'templateid': '1', 'objectname': 'db01', 'public': {'host': 'db01.example.com'}},
+        ],
+        'TEMPLATES': [{'id': '1', 'name': 'Server'}],
+    },
+}
+
+
+def vault_listing(*args, **kwargs):
+    """Send mocked response for the vault list and vault listings."""
+    if not has_valid_token(**kwargs):
+        return MockError(**kwargs)
+    if is_endpoint('/api/1.0/vault', args[0]):
+        return MockResponse({'VAULTS': [{'id': vault_id} for vault_id in MOCK_LISTINGS]}, 200, **kwargs)
+    vault_id = args[0].rsplit('/', 1)[1]
+    if is_endpoint(f'/api/1.0/vault/{vault_id}', args[0]) and vault_id in MOCK_LISTINGS:
+        return MockResponse(MOCK_LISTINGS[vault_id], 200, **kwargs)
+    return MockNotFound(**kwargs)
+
+
+def listed_object(*args, **kwargs):
+    """Send mocked response for getting any object in the vault listings."""
+    if not has_valid_token(**kwargs):
+        return MockError(**kwargs)
+    object_id = args[0].rsplit('/', 1)[1]
+    for data in MOCK_LISTINGS.values():
+        for entry in data['OBJECTS']:
+            if entry['id'] == object_id and is_endpoint(f'/api/1.0/object/{object_id}', args[0]):
+                return MockResponse({'OBJECT': [entry], 'params': kwargs.get('params')}, 200, **kwargs)
+    return MockNotFound(**kwargs)
@@ -0,0 +1,128 @@
+"""
+Test the asyncio client against a local stand-in server.
+"""
+import io
+import unittest
+import tempfile
+from storedsafe.aio import AsyncStoredSafe
+from storedsafe.metrics import MetricsCollector
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the stand-in server')
+class AsyncClient(unittest.IsolatedAsyncioTestCase):
+    """Test AsyncStoredSafe"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    async def asyncSetUp(self):
+        self.api = AsyncStoredSafe(
+            host=self.server.host, apikey=MOCK_APIKEY, token=MOCK_TOKEN, verify=self.server.cert)
+
+    async def asyncTearDown(self):
+        await self.api.aclose()
+
+    async def test_login_totp(self):
+        """Successful login using TOTP saves the token"""
+        async with AsyncStoredSafe(host=self.server.host, apikey=MOCK_APIKEY, verify=self.server.cert) as api:
+            res = await api.login_totp(MOCK_USERNAME, MOCK_PASSPHRASE, MOCK_OTP)
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(api.token, MOCK_TOKEN)
+
+    async def test_login_failed(self):
+        """Failed login keeps the token unset"""
+        async with AsyncStoredSafe(host=self.server.host, apikey=MOCK_APIKEY, verify=self.server.cert) as api:
+            res = await api.login_totp(MOCK_USERNAME, 'wrong', MOCK_OTP)
+            self.assertEqual(res.status_code, 403)
+            self.assertIsNone(api.token)
+
+    async def test_vault_objects(self):
+        """Successfully list vault objects"""
+        res = await self.api.vault_objects(MOCK_VAULT_ID)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['path'], f'/api/1.0/vault/{MOCK_VAULT_ID}')
+
+    async def test_decrypt_object(self):
+        """Successfully decrypt object"""
+        res = await self.api.decrypt_object(MOCK_OBJECT_ID)
+        data = res.json()
+        self.assertEqual(data['path'], f'/api/1.0/object/{MOCK_OBJECT_ID}')
+        self.assertEqual(data['query'], {'decrypt': 'true'})
+
+    async def test_find(self):
+        """Successfully request find"""
+        res = await self.api.find(MOCK_NEEDLE)
+        self.assertEqual(res.json()['query'], {'needle': MOCK_NEEDLE})
+
+    async def test_create_object(self):
+        """Successfully create object with a JSON body"""
+        res = await self.api.create_object(**MOCK_PARAMS)
+        data = res.json()
+        self.assertEqual(data['method'], 'POST')
+        self.assertEqual(data['body'], MOCK_PARAMS)
+
+    async def test_edit_user(self):
+        """Successfully edit user with a JSON body"""
+        res = await self.api.edit_user(MOCK_USER_ID, **MOCK_PARAMS)
+        data = res.json()
+        self.assertEqual(data['method'], 'PUT')
+        self.assertEqual(data['path'], f'/api/1.0/user/{MOCK_USER_ID}')
+
+    async def test_delete_vault(self):
+        """Successfully delete vault"""
+        res = await self.api.delete_vault(MOCK_VAULT_ID)
+        self.assertEqual(res.json()['method'], 'DELETE')
+
+    async def test_get_template(self):
+        """Successfully get template"""
+        res = await self.api.get_template(MOCK_TEMPLATE_ID)
+        self.assertEqual(res.json()['path'], f'/api/1.0/template/{MOCK_TEMPLATE_ID}')
+
+    async def test_upload_file(self):
+        """Successfully upload file as multipart form data"""
+        with tempfile.NamedTemporaryFile(suffix='.txt') as fp:
+            fp.write(MOCK_FILE_CONTENT)
+            fp.flush()
+            res = await self.api.upload_file(fp.name, **MOCK_PARAMS)
+        data = res.json()
+        self.assertTrue(data['content_type'].startswith('multipart/form-data'))
+        self.assertIn(MOCK_FILE_CONTENT.decode(), data['body'])
+
+    async def test_override_options(self):
+        """The session token header is not overridden by options"""
+        res = await self.api.list_vaults({'headers': {'X-Http-Token': 'other'}})
+        self.assertEqual(res.status_code, 200)
+
+    async def test_decrypt_objects(self):
+        """Successfully decrypt many objects concurrently"""
+        ids = list(range(10))
+        results = await self.api.decrypt_objects(ids, max_workers=3)
+        self.assertEqual([result.item for result in results], ids)
+        self.assertTrue(all(result.ok for result in results))
+        results = [result async for result in self.api.get_objects(ids, as_completed=True)]
+        self.assertEqual(sorted(result.item for result in results), ids)
+
+    async def test_download_file(self):
+        """Successfully stream file data into a buffer"""
+        out = io.BytesIO()
+        res = await self.api.download_file(MOCK_OBJECT_ID, out, chunk_size=7)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(out.getvalue(), MOCK_FILE_CONTENT)
+
+    async def test_metrics(self):
+        """Requests are recorded with their traffic"""
+        metrics = MetricsCollector()
+        async with AsyncStoredSafe(
+                host=self.server.host, token=MOCK_TOKEN, metrics=metrics, verify=self.server.cert) as api:
+            await api.create_object(**MOCK_PARAMS)
+        summary = metrics.summary()['POST object']
+        self.assertEqual(summary['statuses'], {200: 1})
+        self.assertGreater(summary['bytes_sent'], 0)
+        self.assertGreater(summary['bytes_received'], 0)
@@ -11,7 +11,7 @@ from mocks import *
 class Auth(unittest.TestCase):
     """Test /auth endpoint"""
 
-    @patch('requests.post', login_totp)
+    @patch('requests.Session.post', staticmethod(login_totp))
     def test_login_totp(self):
         """Successful login using TOTP"""
         api = StoredSafe(host=MOCK_HOST, apikey=MOCK_APIKEY,
@@ -23,7 +23,7 @@ class Auth(unittest.TestCase):
         self.assertEqual(api.token, MOCK_TOKEN)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.post', login_yubikey)
+    @patch('requests.Session.post', staticmethod(login_yubikey))
     def test_login_yubikey(self):
         """Successful login using YubiKey"""
         api = StoredSafe(host=MOCK_HOST, apikey=MOCK_APIKEY,
@@ -35,7 +35,7 @@ class Auth(unittest.TestCase):
         self.assertEqual(api.token, MOCK_TOKEN)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.post', login_smartcard)
+    @patch('requests.Session.post', staticmethod(login_smartcard))
     def test_login_smartcard(self):
         """Successful login using mTLS"""
         api = StoredSafe(host=MOCK_HOST, apikey=MOCK_APIKEY,
@@ -48,7 +48,7 @@ class Auth(unittest.TestCase):
         self.assertEqual(api.token, MOCK_TOKEN)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.get', logout)
+    @patch('requests.Session.get', staticmethod(logout))
     def test_logout(self):
         """Successful logout"""
         api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN,
@@ -57,7 +57,7 @@ class Auth(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.post', check)
+    @patch('requests.Session.post', staticmethod(check))
     def test_check(self):
         """Successful check"""
         api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN,
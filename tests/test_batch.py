@@ -0,0 +1,86 @@
+"""
+Test concurrent batch requests.
+"""
+import time
+import unittest
+from unittest.mock import patch
+import requests
+from storedsafe import StoredSafe
+from storedsafe.batch import RateLimiter, run_batch
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+MOCK_OBJECT_IDS = list(range(20))
+MOCK_FAILING_ID = 7
+
+
+def batch_object(*args, **kwargs):
+    """Send mocked response for any object, failing for one of them."""
+    object_id = int(args[0].rsplit('/', 1)[1])
+    if object_id == MOCK_FAILING_ID:
+        raise requests.ConnectionError('Connection reset')
+    time.sleep((len(MOCK_OBJECT_IDS) - object_id) / 1000)
+    if has_valid_token(**kwargs):
+        return MockResponse({'id': object_id, 'params': kwargs.get('params')}, 200, **kwargs)
+    return MockError(**kwargs)
+
+
+class Batch(unittest.TestCase):
+    """Test batch object requests"""
+
+    def setUp(self):
+        self.api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN, **MOCK_DEFAULT_OPTIONS)
+
+    @patch('requests.Session.get', staticmethod(batch_object))
+    def test_decrypt_objects(self):
+        """Results are returned in input order with errors collected per item"""
+        results = self.api.decrypt_objects(MOCK_OBJECT_IDS, max_workers=4, requests_options=MOCK_OVERRIDE_OPTIONS)
+        self.assertEqual([result.item for result in results], MOCK_OBJECT_IDS)
+        for result in results:
+            if result.item == MOCK_FAILING_ID:
+                self.assertFalse(result.ok)
+                self.assertIsInstance(result.error, requests.ConnectionError)
+            else:
+                self.assertTrue(result.ok)
+                self.assertEqual(result.response.json()['params'], {'decrypt': 'true'})
+                self.assertTrue(has_merged_options(result.response.options))
+
+    @patch('requests.Session.get', staticmethod(batch_object))
+    def test_get_objects_as_completed(self):
+        """Results are streamed as they complete"""
+        results = self.api.get_objects(MOCK_OBJECT_IDS, children=True, max_workers=4, as_completed=True)
+        self.assertNotIsInstance(results, list)
+        results = list(results)
+        self.assertEqual(sorted(result.item for result in results), MOCK_OBJECT_IDS)
+        self.assertEqual(sum(1 for result in results if result.error is not None), 1)
+        ok = next(result for result in results if result.ok)
+        self.assertEqual(ok.response.json()['params'], {'children': 'true'})
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Limiter(unittest.TestCase):
+    """Test RateLimiter"""
+
+    def test_acquire(self):
+        """Tokens are taken in bursts and refilled at the rate"""
+        clock = FakeClock()
+        limiter = RateLimiter(2, clock=clock)
+        self.assertEqual([limiter.acquire() for _ in range(3)], [0, 0, 0.5])
+        clock.now = 0.5
+        self.assertEqual(limiter.acquire(), 0)
+
+    def test_run_batch(self):
+        """Batches are paced by the limiter"""
+        started = time.monotonic()
+        results = list(run_batch(lambda item: item, range(6), 6, limiter=RateLimiter(50, burst=1)))
+        self.assertEqual([result.response for result in results], list(range(6)))
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
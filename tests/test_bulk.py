@@ -0,0 +1,101 @@
+"""
+Test bulk edit and delete with dry-run plans.
+"""
+import unittest
+from storedsafe import StoredSafe
+from storedsafe.fake import FakeServer, ADMIN
+from storedsafe.bulk import BulkMutator, BulkSelectionException, field_value
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+class Values(unittest.TestCase):
+    """Test field_value"""
+
+    def test_field_value(self):
+        """Attributes, public and encrypted fields are looked up"""
+        entry = {'objectname': 'a', 'public': {'host': 'b'}, 'crypted': {'password': 'c'}}
+        self.assertEqual(
+            [field_value(entry, field) for field in ('objectname', 'host', 'password', 'info')], ['a', 'b', 'c', None])
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class Bulk(unittest.TestCase):
+    """Test BulkMutator against the fake server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServer().start()
+        cls.fake = cls.server.fake
+        cls.user = cls.fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.vault = self.fake.add_vault('Bulk', members={self.user['id']: ADMIN})
+        self.ids = [
+            self.fake.add_object(self.vault['id'], host=f'web{i}.example.com', username='root', password='old')['id']
+            for i in range(6)]
+        self.api = StoredSafe(token=self.fake.login(MOCK_USERNAME), **self.server.client_options())
+        self.addCleanup(self.api.close)
+        self.mutator = BulkMutator(self.api, max_workers=4, rate_limit=100, decrypt=True)
+
+    def test_select(self):
+        """Selectors are intersected"""
+        self.assertEqual(self.mutator.select(vault_id=self.vault['id']), self.ids)
+        self.assertEqual(self.mutator.select(vault_id=self.vault['id'], needle='web1.'), [self.ids[1]])
+        self.assertEqual(self.mutator.select(needle='web', ids=[self.ids[2], 'missing']), [self.ids[2]])
+        with self.assertRaises(BulkSelectionException):
+            self.mutator.select()
+        with self.assertRaises(BulkSelectionException):
+            self.mutator.select(vault_id='missing')
+
+    def test_dry_run(self):
+        """Plans diff against current state without changing anything"""
+        self.fake.secrets[self.ids[0]]['password'] = 'new'
+        plan = self.mutator.plan_edit({'password': 'new', 'username': 'root'}, ids=self.ids + ['missing'])
+        report = plan.report()
+        self.assertEqual((report['selected'], report['changed'], report['unchanged']), (7, 5, 1))
+        self.assertEqual(report['errors'], {'missing': 'HTTP 404'})
+        self.assertEqual(report['diff'][self.ids[1]], {'password': ['***', '***']})
+        self.assertEqual(plan.report(show_secrets=True)['diff'][self.ids[1]], {'password': ['old', 'new']})
+        self.assertEqual(self.fake.secrets[self.ids[1]]['password'], 'old')
+
+    def test_masked_without_decrypt(self):
+        """Encrypted fields are masked from their template when objects are not decrypted"""
+        mutator = BulkMutator(self.api)
+        report = mutator.plan_edit({'password': 'new', 'username': 'admin'}, ids=[self.ids[0]]).report()
+        self.assertEqual(report['diff'][self.ids[0]], {'password': [None, '***'], 'username': ['root', 'admin']})
+
+    def test_compared_as_is(self):
+        """Unset fields differ from 'None' and strings differ from numbers"""
+        self.fake.objects[self.ids[0]]['tags'] = 'None'
+        self.fake.objects[self.ids[0]]['public']['username'] = '1'
+        diff = self.mutator.plan_edit({'tags': None, 'username': 1}, ids=[self.ids[0]]).changes[0].diff
+        self.assertEqual(diff, {'tags': ('None', None), 'username': ('1', 1)})
+        diff = self.mutator.plan_edit({'info': 'None'}, ids=[self.ids[0]]).changes[0].diff
+        self.assertEqual(diff, {'info': (None, 'None')})
+
+    def test_apply_edit(self):
+        """Changed objects are edited and outcomes streamed"""
+        plan = self.mutator.plan_edit(
+            lambda entry: {'tags': entry['public']['host'].split('.')[0]}, vault_id=self.vault['id'])
+        results = list(self.mutator.apply(plan))
+        self.assertEqual(sorted(result.item.object_id for result in results), sorted(self.ids))
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(self.fake.objects[self.ids[3]]['tags'], 'web3')
+        self.assertEqual(list(self.mutator.apply(self.mutator.plan_edit({'tags': 'web3'}, ids=[self.ids[3]]))), [])
+
+    def test_apply_delete(self):
+        """Selected objects are deleted"""
+        plan = self.mutator.plan_delete(vault_id=self.vault['id'], needle='web2')
+        self.assertEqual(plan.report()['changed'], 1)
+        self.assertEqual([result.ok for result in self.mutator.apply(plan)], [True])
+        self.assertNotIn(self.ids[2], self.fake.objects)
+        self.assertIn(self.ids[1], self.fake.objects)
+
+
+if __name__ == '__main__':
+    unittest.main()
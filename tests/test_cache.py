@@ -0,0 +1,145 @@
+"""
+Test the response cache for read-mostly endpoints.
+"""
+import unittest
+from unittest.mock import patch, MagicMock
+from storedsafe import StoredSafe
+from storedsafe.cache import ResponseCache
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Cache(unittest.TestCase):
+    """Test ResponseCache"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(maxsize=2, clock=self.clock)
+
+    def test_ttl(self):
+        """Only endpoints with a TTL are cacheable"""
+        self.assertEqual(self.cache.ttl('/template'), 300)
+        self.assertEqual(self.cache.ttl(f'/template/{MOCK_TEMPLATE_ID}'), 300)
+        self.assertEqual(self.cache.ttl('/utils/version'), 3600)
+        self.assertIsNone(self.cache.ttl(f'/object/{MOCK_OBJECT_ID}'))
+        self.assertIsNone(self.cache.ttl(f'/vault/{MOCK_VAULT_ID}'))
+
+    def test_expiry(self):
+        """Entries expire after their TTL"""
+        key = self.cache.key('/vault', None, MOCK_TOKEN)
+        self.cache.put(key, 'res', 60)
+        self.assertEqual(self.cache.get(key), 'res')
+        self.clock.now = 61
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first"""
+        first, second, third = (self.cache.key(path, None, MOCK_TOKEN) for path in ('a', 'b', 'c'))
+        self.cache.put(first, 1, 60)
+        self.cache.put(second, 2, 60)
+        self.cache.get(first)
+        self.cache.put(third, 3, 60)
+        self.assertEqual(self.cache.get(first), 1)
+        self.assertIsNone(self.cache.get(second))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_invalidate(self):
+        """Changes invalidate the collection and the changed resource"""
+        cache = ResponseCache()
+        keys = [cache.key(path, None, MOCK_TOKEN) for path in ('vault', 'vault/1/members', 'vault/2', 'template')]
+        for key in keys:
+            cache.put(key, key, 60)
+        cache.invalidate('/vault/1/member/3')
+        self.assertEqual([cache.get(key) is not None for key in keys], [False, False, True, True])
+        cache.invalidate()
+        self.assertEqual(len(cache), 0)
+
+    def test_generation(self):
+        """Responses taken before an invalidation of their collection are not cached"""
+        keys = [self.cache.key(path, None, MOCK_TOKEN) for path in ('vault', 'template')]
+        generations = [self.cache.generation(path) for path in ('vault', 'template')]
+        self.cache.invalidate('vault/1')
+        for key, generation in zip(keys, generations):
+            self.cache.put(key, key, 60, generation)
+        self.assertEqual([self.cache.get(key) for key in keys], [None, keys[1]])
+        generation = self.cache.generation('template')
+        self.cache.invalidate()
+        self.cache.put(keys[1], keys[1], 60, generation)
+        self.assertIsNone(self.cache.get(keys[1]))
+
+
+class CachedApi(unittest.TestCase):
+    """Test StoredSafe with a response cache"""
+
+    def setUp(self):
+        self.api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN, cache=True, **MOCK_DEFAULT_OPTIONS)
+
+    def test_cached_list_vaults(self):
+        """Repeated requests are served from the cache until invalidated"""
+        get = MagicMock(side_effect=list_vaults)
+        with patch('requests.Session.get', get), patch('requests.Session.post', staticmethod(create_vault)):
+            self.api.list_vaults(MOCK_OVERRIDE_OPTIONS)
+            res = self.api.list_vaults(MOCK_OVERRIDE_OPTIONS)
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(get.call_count, 1)
+            self.api.create_vault(**MOCK_PARAMS)
+            self.api.list_vaults(MOCK_OVERRIDE_OPTIONS)
+            self.assertEqual(get.call_count, 2)
+        self.assertEqual(self.api.cache.stats()['hits'], 1)
+
+    def test_read_during_write(self):
+        """Responses cached while a change is in flight are dropped when it completes"""
+        get = MagicMock(side_effect=list_vaults)
+
+        def post(*args, **kwargs):
+            self.api.list_vaults(MOCK_OVERRIDE_OPTIONS)
+            return create_vault(*args, **kwargs)
+
+        with patch('requests.Session.get', get), patch('requests.Session.post', staticmethod(post)):
+            self.api.create_vault(**MOCK_PARAMS)
+            self.assertEqual(get.call_count, 1)
+            self.api.list_vaults(MOCK_OVERRIDE_OPTIONS)
+            self.assertEqual(get.call_count, 2)
+
+    def test_write_during_read(self):
+        """Responses read before a change and handled after it are not cached"""
+        def get(*args, **kwargs):
+            with patch('requests.Session.post', staticmethod(create_vault)):
+                self.api.create_vault(**MOCK_PARAMS)
+            return list_vaults(*args, **kwargs)
+
+        with patch('requests.Session.get', MagicMock(side_effect=get)):
+            self.api.list_vaults(MOCK_OVERRIDE_OPTIONS)
+        get = MagicMock(side_effect=list_vaults)
+        with patch('requests.Session.get', get):
+            self.api.list_vaults(MOCK_OVERRIDE_OPTIONS)
+        self.assertEqual(get.call_count, 1)
+
+    def test_uncached_errors(self):
+        """Failed requests are not cached"""
+        api = StoredSafe(host=MOCK_HOST, token='invalid-token', cache=True)
+        get = MagicMock(side_effect=get_template)
+        with patch('requests.Session.get', get):
+            api.get_template(MOCK_TEMPLATE_ID)
+            api.get_template(MOCK_TEMPLATE_ID)
+        self.assertEqual(get.call_count, 2)
+
+    def test_uncached_endpoint(self):
+        """Objects are never cached"""
+        get = MagicMock(side_effect=decrypt_object)
+        with patch('requests.Session.get', get):
+            self.api.decrypt_object(MOCK_OBJECT_ID)
+            self.api.decrypt_object(MOCK_OBJECT_ID)
+        self.assertEqual(get.call_count, 2)
@@ -0,0 +1,165 @@
+"""
+Test single-flight coalescing of identical GET requests.
+"""
+import time
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from storedsafe import StoredSafe
+from storedsafe.aio import AsyncStoredSafe
+from storedsafe.coalesce import RequestCoalescer
+from storedsafe.fake import FakeServer, ADMIN
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+class Coalescer(unittest.TestCase):
+    """Test RequestCoalescer"""
+
+    def test_threads(self):
+        """Callers arriving while a request is in flight share its response"""
+        coalescer = RequestCoalescer()
+        release = threading.Event()
+        sent = []
+
+        def send():
+            sent.append(1)
+            release.wait(5)
+            return object()
+
+        key = coalescer.key('/object/1', {'decrypt': 'true'}, 'token')
+        with ThreadPoolExecutor(4) as executor:
+            leader = executor.submit(coalescer.call, key, send)
+            while coalescer.stats()['in_flight'] == 0:
+                time.sleep(0.001)
+            followers = [executor.submit(coalescer.call, key, send) for _ in range(3)]
+            while coalescer.stats()['deduplicated'] < 3:
+                time.sleep(0.001)
+            release.set()
+            responses = [future.result() for future in [leader] + followers]
+        self.assertEqual(len(sent), 1)
+        self.assertTrue(all(res is responses[0] for res in responses))
+        self.assertEqual(coalescer.stats(), {'calls': 1, 'deduplicated': 3, 'in_flight': 0})
+        self.assertIsNot(coalescer.call(key, object), responses[0])
+
+    def test_keys(self):
+        """Requests differing in path, params or token are not shared"""
+        key = RequestCoalescer.key
+        self.assertEqual(key('/object/1/', {'b': 1, 'a': 2}, 't'), key('object/1', {'a': 2, 'b': 1}, 't'))
+        self.assertNotEqual(key('object/1', None, 't'), key('object/1', None, 'u'))
+        self.assertNotEqual(key('object/1', None, 't'), key('object/1', {'decrypt': 'true'}, 't'))
+
+    def test_error(self):
+        """Errors are raised to every caller sharing the request"""
+        coalescer = RequestCoalescer()
+
+        def send():
+            raise ConnectionError('down')
+
+        with self.assertRaises(ConnectionError):
+            coalescer.call('key', send)
+        self.assertEqual(coalescer.stats()['in_flight'], 0)
+
+    def test_asyncio(self):
+        """Tasks awaiting an identical request share its response"""
+        coalescer = RequestCoalescer()
+        sent = []
+
+        async def send():
+            sent.append(1)
+            await asyncio.sleep(0.05)
+            return object()
+
+        async def run():
+            return await asyncio.gather(*(coalescer.acall('key', send) for _ in range(5)))
+
+        responses = asyncio.run(run())
+        self.assertEqual(len(sent), 1)
+        self.assertTrue(all(res is responses[0] for res in responses))
+        self.assertEqual(coalescer.stats(), {'calls': 1, 'deduplicated': 4, 'in_flight': 0})
+
+    def test_asyncio_error(self):
+        """Errors of a shared async request are raised to every task"""
+        coalescer = RequestCoalescer()
+
+        async def send():
+            await asyncio.sleep(0.01)
+            raise ConnectionError('down')
+
+        async def run():
+            return await asyncio.gather(*(coalescer.acall('key', send) for _ in range(3)), return_exceptions=True)
+
+        self.assertTrue(all(isinstance(error, ConnectionError) for error in asyncio.run(run())))
+
+    def test_asyncio_leader_cancelled(self):
+        """Cancelling the task that started a request leaves the others waiting for its response"""
+        coalescer = RequestCoalescer()
+        response = object()
+
+        async def send():
+            await asyncio.sleep(0.1)
+            return response
+
+        async def run():
+            leader = asyncio.ensure_future(asyncio.wait_for(coalescer.acall('key', send), 0.02))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(coalescer.acall('key', send))
+            return await asyncio.gather(leader, follower, return_exceptions=True)
+
+        leader, follower = asyncio.run(run())
+        self.assertIsInstance(leader, asyncio.TimeoutError)
+        self.assertIs(follower, response)
+        self.assertEqual(coalescer.stats(), {'calls': 1, 'deduplicated': 1, 'in_flight': 0})
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class Client(unittest.TestCase):
+    """Test coalescing in the clients against a slow fake server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServer(latency=0.3).start()
+        fake = cls.server.fake
+        user = fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE)
+        vault = fake.add_vault('Coalesce', members={user['id']: ADMIN})
+        cls.object_id = fake.add_object(vault['id'], host='db', password='secret')['id']
+        cls.token = fake.login(MOCK_USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_threads(self):
+        """Concurrent identical decrypts are sent once"""
+        with StoredSafe(token=self.token, coalesce=True, **self.server.client_options()) as api:
+            barrier = threading.Barrier(8)
+
+            def decrypt(_):
+                barrier.wait()
+                return api.decrypt_object(self.object_id)
+
+            with ThreadPoolExecutor(8) as executor:
+                responses = list(executor.map(decrypt, range(8)))
+            self.assertEqual({res.status_code for res in responses}, {200})
+            self.assertEqual(responses[0].json()['OBJECT'][0]['crypted']['password'], 'secret')
+            stats = api.coalescer.stats()
+            self.assertEqual(stats['calls'] + stats['deduplicated'], 8)
+            self.assertGreater(stats['deduplicated'], 0)
+            api.get_object(self.object_id)
+            self.assertEqual(api.coalescer.stats()['calls'], stats['calls'] + 1)
+
+    def test_asyncio(self):
+        """Concurrent identical async requests are sent once"""
+        async def run():
+            async with AsyncStoredSafe(token=self.token, coalesce=True, **self.server.client_options()) as api:
+                responses = await asyncio.gather(*(api.get_template(1) for _ in range(6)))
+                return [res.status_code for res in responses], api.coalescer.stats()
+
+        statuses, stats = asyncio.run(run())
+        self.assertEqual(statuses, [200] * 6)
+        self.assertEqual(stats, {'calls': 1, 'deduplicated': 5, 'in_flight': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
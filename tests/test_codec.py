@@ -0,0 +1,134 @@
+"""
+Test the pluggable JSON codecs.
+"""
+import json
+import asyncio
+import unittest
+from storedsafe import StoredSafe
+from storedsafe.aio import AsyncStoredSafe
+from storedsafe.fake import FakeServer, ADMIN
+from storedsafe.codec import JsonCodec, OrjsonCodec, get_codec, available_codecs, CODECS
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+class Counting(JsonCodec):
+    """Codec counting its calls"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = {'dumps': 0, 'loads': 0}
+
+    def dumps(self, data):
+        self.calls['dumps'] += 1
+        return super().dumps(data)
+
+    def loads(self, body):
+        self.calls['loads'] += 1
+        return super().loads(body)
+
+
+class Response:
+    """Response with a raw body, decoded by the stdlib in json()"""
+
+    def __init__(self, content):
+        self.content = content
+
+    def json(self, **kwargs):
+        """Decode the body, marking it as decoded by the fallback."""
+        return {'fallback': json.loads(self.content, **kwargs)}
+
+
+class Codecs(unittest.TestCase):
+    """Test codec selection and behaviour"""
+
+    def test_selection(self):
+        """The fastest installed codec is selected by default"""
+        names = list(available_codecs())
+        self.assertEqual(names[-1], 'json')
+        self.assertEqual(get_codec().name, names[0])
+        self.assertIsInstance(get_codec('json'), JsonCodec)
+        codec = Counting()
+        self.assertIs(get_codec(codec), codec)
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+    def test_round_trip(self):
+        """Every installed codec encodes compact UTF-8 and decodes bytes and str"""
+        data = {'objectname': 'åäö', 'id': 1, 'public': {'host': None, 'tags': [True]}}
+        for codec in available_codecs().values():
+            body = codec.dumps(data)
+            self.assertIsInstance(body, bytes)
+            self.assertEqual(json.loads(body), data)
+            self.assertNotIn(b' ', body)
+            self.assertEqual(codec.loads(body), data)
+            self.assertEqual(codec.loads(body.decode()), data)
+            with self.assertRaises(ValueError):
+                codec.loads(b'{')
+
+    @unittest.skipUnless('orjson' in available_codecs(), 'orjson is not installed')
+    def test_orjson_fallback(self):
+        """Values orjson cannot encode fall back to the stdlib"""
+        self.assertEqual(json.loads(OrjsonCodec().dumps({'big': 2 ** 70, 1: 'a'})), {'big': 2 ** 70, '1': 'a'})
+
+    def test_bind(self):
+        """Bound responses decode with the codec and fall back on invalid bodies or options"""
+        codec = Counting()
+        self.assertEqual(codec.bind(Response(b'{"a": 1}')).json(), {'a': 1})
+        self.assertEqual(codec.bind(Response(b'{"a": 1.5}')).json(parse_float=str), {'fallback': {'a': '1.5'}})
+        with self.assertRaises(ValueError):
+            codec.bind(Response(b'<html>')).json()
+        self.assertEqual(codec.calls['loads'], 2)
+
+    def test_names(self):
+        """Codecs are registered by name"""
+        self.assertEqual(set(CODECS), {'json', 'orjson'})
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class Client(unittest.TestCase):
+    """Test the codec of the clients against the fake server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServer().start()
+        fake = cls.server.fake
+        user = fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE)
+        cls.vault = fake.add_vault('Codec', members={user['id']: ADMIN})
+        cls.token = fake.login(MOCK_USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_requests(self):
+        """Bodies are encoded and responses decoded by the codec"""
+        codec = Counting()
+        with StoredSafe(token=self.token, codec=codec, **self.server.client_options()) as api:
+            res = api.create_object(groupid=self.vault['id'], templateid='1', host='codec.example.com')
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.json()['OBJECT'][0]['public']['host'], 'codec.example.com')
+        self.assertEqual(codec.calls, {'dumps': 1, 'loads': 1})
+
+    def test_httpx(self):
+        """The asyncio client uses the codec too"""
+        codec = Counting()
+
+        async def run():
+            async with AsyncStoredSafe(token=self.token, codec=codec, **self.server.client_options()) as api:
+                res = await api.edit_vault(self.vault['id'], description='codec')
+                return res.status_code, res.json()['VAULT'][0]['description']
+
+        self.assertEqual(asyncio.run(run()), (200, 'codec'))
+        self.assertEqual(codec.calls, {'dumps': 1, 'loads': 1})
+
+    def test_named(self):
+        """Codecs can be chosen by name"""
+        api = StoredSafe(token=self.token, codec='json', **self.server.client_options())
+        self.addCleanup(api.close)
+        self.assertEqual(api.codec.name, 'json')
+        self.assertEqual(api.check().json()['CALLINFO']['status'], 'SUCCESS')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+"""
+Test the in-memory fake StoredSafe server.
+"""
+import io
+import json
+import time
+import base64
+import socket
+import tempfile
+import unittest
+from pathlib import Path
+from storedsafe import StoredSafe
+from storedsafe.aio import AsyncStoredSafe
+from storedsafe.fake import (
+    FakeServer, FakeStoredSafe, FakeRequest, create_self_signed_cert, READ, WRITE, ADMIN)
+from storedsafe.resilience import RetryPolicy
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Handling(unittest.TestCase):
+    """Test FakeStoredSafe without a server"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.fake = FakeStoredSafe(clock=self.clock, token_timeout=60, seed=1)
+        self.admin = self.fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE, otp=MOCK_OTP, admin=True)
+        self.token = self.fake.login(MOCK_USERNAME)
+
+    def request(self, method, path, token=None, **kwargs):
+        """Handle a request with the admin token by default."""
+        headers = {'X-Http-Token': token or self.token}
+        return self.fake.handle(FakeRequest(method, f'/api/1.0{path}', headers=headers, **kwargs))
+
+    def test_login(self):
+        """Logins check the API key, passphrase and one-time password"""
+        def login(**data):
+            body = json.dumps({'apikey': self.fake.apikey, 'username': MOCK_USERNAME, **data}).encode()
+            return self.fake.handle(FakeRequest(
+                'POST', '/api/1.0/auth', headers={'Content-Type': 'application/json'}, body=body))
+        status, _, data = login(logintype='totp', passphrase=MOCK_PASSPHRASE, otp=MOCK_OTP)
+        self.assertEqual(status, 200)
+        self.assertIn(data['CALLINFO']['token'], self.fake.tokens)
+        self.assertEqual(login(logintype='totp', passphrase=MOCK_PASSPHRASE, otp='wrong')[0], 403)
+        self.assertEqual(login(keys=MOCK_PASSPHRASE + self.fake.apikey + MOCK_OTP)[0], 200)
+        self.assertEqual(login(logintype='smartcard', passphrase=MOCK_PASSPHRASE)[0], 403)
+
+    def test_token_timeout(self):
+        """Tokens expire after being idle for token_timeout seconds"""
+        self.clock.now = 50
+        self.assertEqual(self.request('POST', '/auth/check')[0], 200)
+        self.clock.now = 100
+        self.assertEqual(self.request('POST', '/auth/check')[0], 200)
+        self.clock.now = 200
+        status, _, data = self.request('POST', '/auth/check')
+        self.assertEqual(status, 403)
+        self.assertEqual(data['ERRORS'], ['Invalid token'])
+
+    def test_permissions(self):
+        """Vault members need write access to create objects"""
+        reader = self.fake.add_user('reader', 'pass')
+        vault = self.fake.add_vault('Shared', members={reader['id']: READ})
+        token = self.fake.login('reader')
+        self.assertEqual(self.request('GET', f'/vault/{vault["id"]}', token)[0], 200)
+        body = json.dumps({'groupid': vault['id'], 'templateid': '1', 'host': 'a'}).encode()
+        headers = {'X-Http-Token': token, 'Content-Type': 'application/json'}
+        status, _, _ = self.fake.handle(FakeRequest('POST', '/api/1.0/object', headers=headers, body=body))
+        self.assertEqual(status, 403)
+        self.fake.members[vault['id']][reader['id']] = WRITE
+        status, _, _ = self.fake.handle(FakeRequest('POST', '/api/1.0/object', headers=headers, body=body))
+        self.assertEqual(status, 200)
+
+    def test_rate_limit(self):
+        """Requests beyond the rate limit are rejected with Retry-After"""
+        fake = FakeStoredSafe(rate_limit=2, clock=self.clock)
+        statuses = [fake.handle(FakeRequest('GET', '/api/1.0/utils/version'))[:2] for _ in range(3)]
+        self.assertEqual([status for status, _ in statuses], [403, 403, 429])
+        self.assertEqual(statuses[2][1], {'Retry-After': '1'})
+        self.clock.now = 1
+        self.assertEqual(fake.handle(FakeRequest('GET', '/api/1.0/utils/version'))[0], 403)
+
+    def test_error_rate(self):
+        """A fraction of requests fail with 503"""
+        self.fake.error_rate = 0.5
+        statuses = [self.request('GET', '/utils/version')[0] for _ in range(200)]
+        self.assertEqual(set(statuses), {200, 503})
+        self.assertEqual(statuses.count(503), self.fake.injected['errors'])
+        self.assertTrue(50 < self.fake.injected['errors'] < 150)
+
+    def test_routing(self):
+        """Unknown paths are not found and known paths reject other methods"""
+        self.assertEqual(self.request('GET', '/nothing')[0], 404)
+        self.assertEqual(self.request('PATCH', '/vault')[0], 405)
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class Server(unittest.TestCase):
+    """Test the sync client against FakeServer"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServer(apikey=MOCK_APIKEY).start()
+        cls.fake = cls.server.fake
+        cls.admin = cls.fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE, admin=True)
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.client_cert = create_self_signed_cert(cls.tmpdir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        self.api = StoredSafe(apikey=MOCK_APIKEY, **self.server.client_options())
+        self.assertEqual(self.api.login_totp(MOCK_USERNAME, MOCK_PASSPHRASE, '123456').status_code, 200)
+        self.addCleanup(self.api.close)
+
+    def test_vault_and_objects(self):
+        """Create a vault and objects, then list, decrypt, find, edit and delete them"""
+        vault = self.api.create_vault(groupname='Servers', policy=7).json()['VAULT'][0]
+        res = self.api.create_object(groupid=vault['id'], templateid='1', host='db.example.com', password='hunter2')
+        self.assertEqual(res.status_code, 200)
+        object_id = res.json()['OBJECT'][0]['id']
+        child = self.api.create_object(groupid=vault['id'], templateid='1', parentid=object_id, host='replica')
+        listing = self.api.vault_objects(vault['id']).json()
+        self.assertEqual(len(listing['OBJECTS']), 2)
+        self.assertNotIn('crypted', listing['OBJECTS'][0])
+        self.assertEqual(listing['TEMPLATES'][0]['id'], '1')
+        decrypted = self.api.decrypt_object(object_id).json()['OBJECT'][0]
+        self.assertEqual(decrypted['crypted'], {'password': 'hunter2'})
+        self.assertEqual(len(self.api.get_object(object_id, children=True).json()['OBJECT']), 2)
+        self.assertEqual(self.api.find('DB.EXAMPLE').json()['OBJECT'][0]['id'], object_id)
+        self.api.edit_object(object_id, password='changed')
+        self.assertEqual(self.api.decrypt_object(object_id).json()['OBJECT'][0]['crypted']['password'], 'changed')
+        self.assertEqual(self.api.delete_vault(vault['id']).status_code, 403)
+        self.api.delete_object(object_id)
+        self.assertEqual(self.api.get_object(child.json()['OBJECT'][0]['id']).status_code, 404)
+        self.assertEqual(self.api.delete_vault(vault['id']).status_code, 200)
+
+    def test_members(self):
+        """Add, edit and remove vault members"""
+        user = self.api.create_user(username='member', passphrase='pass').json()['USER'][0]
+        vault = self.api.create_vault(groupname='Team').json()['VAULT'][0]
+        self.assertEqual(self.api.add_vault_member(vault['id'], user['id'], READ).status_code, 200)
+        self.api.edit_vault_member(vault['id'], user['id'], ADMIN)
+        members = self.api.vault_members(vault['id']).json()['MEMBERS']
+        self.assertIn({'userid': user['id'], 'username': 'member', 'status': str(ADMIN)}, members)
+        self.api.remove_vault_member(vault['id'], user['id'])
+        self.assertEqual(self.api.remove_vault_member(vault['id'], user['id']).status_code, 404)
+        self.assertEqual(self.api.list_users('memb').json()['USERS'][0]['id'], user['id'])
+
+    def test_files(self):
+        """Upload, collect, fetch and download file objects"""
+        vault = self.fake.add_vault('Files', members={self.admin['id']: ADMIN})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / 'notes.txt'
+            path.write_bytes(MOCK_FILE_CONTENT)
+            self.assertEqual(self.api.filecollect(path).json()['TEMPLATE'][0]['id'], '3')
+            self.assertEqual(self.api.get_mime_type(path).json()['DATA']['mimetype'], 'text/plain')
+            res = self.api.upload_file(path, groupid=vault['id'], parentid=0)
+            object_id = res.json()['OBJECT'][0]['id']
+        self.assertEqual(res.json()['OBJECT'][0]['filename'], 'notes.txt')
+        data = self.api.get_file(object_id).json()
+        self.assertEqual(base64.b64decode(data['FILEDATA']), MOCK_FILE_CONTENT)
+        buffer = io.BytesIO()
+        self.api.download_file(object_id, buffer)
+        self.assertEqual(buffer.getvalue(), MOCK_FILE_CONTENT)
+
+    def test_user_certificate(self):
+        """Set, get and remove a user certificate"""
+        with tempfile.NamedTemporaryFile('w', suffix='.pem', delete=False) as cert_file:
+            cert_file.write('-----BEGIN CERTIFICATE-----\n')
+        self.addCleanup(Path(cert_file.name).unlink)
+        self.assertEqual(self.api.set_user_certificate(self.admin['id'], cert_file.name).status_code, 200)
+        self.assertTrue(self.api.get_user_certificate(self.admin['id']).json()['CERT'].startswith('-----BEGIN'))
+        self.api.remove_user_certificate(self.admin['id'])
+        self.assertEqual(self.api.get_user_certificate(self.admin['id']).status_code, 404)
+
+    def test_utils(self):
+        """Generate passwords and read status values, policies and the version"""
+        self.assertEqual(len(self.api.generate_password(length=32).json()['PASSWORD']), 32)
+        self.assertEqual(self.api.version().json()['VERSION'], self.fake.version)
+        self.assertIn('vault', self.api.status_values().json()['STATUSVALUES'])
+        self.assertEqual(self.api.password_policies().status_code, 200)
+
+    def test_smartcard(self):
+        """Smartcard logins go to the mTLS port"""
+        api = StoredSafe(apikey=MOCK_APIKEY, **self.server.client_options())
+        self.addCleanup(api.close)
+        res = api.login_smartcard(MOCK_USERNAME, MOCK_PASSPHRASE, *self.client_cert)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(api.check().status_code, 200)
+
+    def test_logout(self):
+        """Tokens are invalid after logout"""
+        self.api.logout()
+        self.assertEqual(self.api.check().status_code, 403)
+
+    def test_idle_handshake(self):
+        """A client idling before its TLS handshake does not hold up other connections"""
+        host, port = self.server.host.split(':')
+        with socket.create_connection((host, int(port))):
+            started = time.perf_counter()
+            with StoredSafe(token=self.api.token, timeout=5, **self.server.client_options()) as api:
+                self.assertEqual(api.check().status_code, 200)
+            self.assertLess(time.perf_counter() - started, 5)
+
+    def test_retry_rate_limit(self):
+        """Rate limited reads are retried after Retry-After"""
+        fake = FakeStoredSafe(apikey=MOCK_APIKEY, rate_limit=20)
+        fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE, admin=True)
+        with FakeServer(fake) as server:
+            with StoredSafe(
+                    token=fake.login(MOCK_USERNAME), retry=RetryPolicy(retries=5),
+                    **server.client_options()) as api:
+                statuses = [api.list_vaults().status_code for _ in range(30)]
+        self.assertEqual(set(statuses), {200})
+        self.assertGreater(fake.injected['rate_limited'], 0)
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class AsyncServer(unittest.IsolatedAsyncioTestCase):
+    """Test the asyncio client against FakeServer"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServer(apikey=MOCK_APIKEY).start()
+        cls.server.fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE, admin=True)
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.client_cert = create_self_signed_cert(cls.tmpdir.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.tmpdir.cleanup()
+
+    async def test_objects(self):
+        """Log in, create and decrypt an object"""
+        async with AsyncStoredSafe(apikey=MOCK_APIKEY, **self.server.client_options()) as api:
+            self.assertEqual((await api.login_totp(MOCK_USERNAME, MOCK_PASSPHRASE, '1')).status_code, 200)
+            vault = (await api.create_vault(groupname='Async')).json()['VAULT'][0]
+            res = await api.create_object(groupid=vault['id'], templateid='4', url='https://a', password='p')
+            object_id = res.json()['OBJECT'][0]['id']
+            data = (await api.decrypt_object(object_id)).json()
+            self.assertEqual(data['OBJECT'][0]['crypted'], {'password': 'p'})
+
+    async def test_smartcard(self):
+        """Smartcard logins go to the mTLS port"""
+        async with AsyncStoredSafe(apikey=MOCK_APIKEY, **self.server.client_options()) as api:
+            res = await api.login_smartcard(MOCK_USERNAME, MOCK_PASSPHRASE, *self.client_cert)
+            self.assertEqual(res.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
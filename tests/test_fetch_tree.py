@@ -0,0 +1,157 @@
+"""
+Test the parallel recursive object tree fetch.
+"""
+import time
+import asyncio
+import threading
+import unittest
+from storedsafe import StoredSafe, ListingException
+from storedsafe.aio import AsyncStoredSafe
+from storedsafe.iteration import ObjectTree
+from storedsafe.fake import FakeServer, ADMIN
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+BRANCHING = 4
+DEPTH = 3
+LATENCY = 0.1
+
+
+class Response:
+    """Successful response with JSON data"""
+
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        """Get the data."""
+        return self.data
+
+
+class NotFound:
+    """Response to a missing object"""
+
+    status_code = 404
+
+
+def entry(object_id, parent_id, children):
+    """Get an object entry."""
+    return {'id': object_id, 'parentid': parent_id, 'children': str(children)}
+
+
+class LevelServer:
+    """Answers get_object with children one level at a time after a latency"""
+
+    def __init__(self):
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def children(object_id):
+        """Get the ids of the children of an object."""
+        level = object_id.count('.')
+        return [f'{object_id}.{i}' for i in range(BRANCHING)] if level < DEPTH else []
+
+    def response(self, object_id):
+        """Get the response for an object."""
+        if object_id == 'missing' or object_id.endswith('.1.1'):
+            return NotFound()
+        parent = object_id.rsplit('.', 1)[0] if '.' in object_id else '0'
+        entries = [entry(object_id, parent, len(self.children(object_id)))]
+        entries += [entry(child, object_id, len(self.children(child))) for child in self.children(object_id)]
+        return Response({'OBJECT': entries})
+
+    def fetch(self, object_id):
+        """Answer a request for an object."""
+        with self.lock:
+            self.fetched.append(object_id)
+        time.sleep(LATENCY)
+        return self.response(object_id)
+
+    async def afetch(self, object_id):
+        """Answer a request for an object in a task."""
+        self.fetched.append(object_id)
+        await asyncio.sleep(LATENCY)
+        return self.response(object_id)
+
+
+class Tree(unittest.TestCase):
+    """Test ObjectTree on responses holding one level"""
+
+    def test_concurrent_frontier(self):
+        """Levels are fetched concurrently, taking about depth round trips"""
+        server = LevelServer()
+        tree = ObjectTree('r', server.fetch, max_workers=64)
+        started = time.perf_counter()
+        nodes = list(tree)
+        elapsed = time.perf_counter() - started
+        # 1 + 4 + 16 + 64 objects, minus the 4 children of r.1.1 whose fetch failed
+        self.assertEqual(len(nodes), 85 - BRANCHING)
+        self.assertEqual(len(tree), len(nodes))
+        self.assertLess(elapsed, LATENCY * (DEPTH + 1) + 0.5)
+        self.assertEqual(len(server.fetched), len(set(server.fetched)))
+        self.assertEqual(sorted(tree.errors), ['r.1.1'])
+        self.assertEqual(tree.children['r'], ['r.0', 'r.1', 'r.2', 'r.3'])
+        self.assertEqual((tree.parents['r.2.3'], tree.depths['r.2.3.0'], tree.parents['r']), ('r.2', 3, None))
+        self.assertEqual([node.depth for node in nodes][:5], [0, 1, 1, 1, 1])
+
+    def test_depth(self):
+        """Nothing below depth is fetched or yielded"""
+        server = LevelServer()
+        tree = ObjectTree('r', server.fetch, depth=1).complete()
+        self.assertEqual((len(tree), server.fetched), (5, ['r']))
+
+    def test_root_missing(self):
+        """A failure to fetch the root raises"""
+        with self.assertRaises(ListingException):
+            ObjectTree('missing', LevelServer().fetch).complete()
+
+    def test_asyncio(self):
+        """Async iteration fetches with tasks"""
+        server = LevelServer()
+        tree = asyncio.run(ObjectTree('r', server.afetch, depth=2, max_workers=8).acomplete())
+        self.assertEqual(len(tree), 21)
+        self.assertEqual(len(server.fetched), 5)
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class Client(unittest.TestCase):
+    """Test fetch_tree against the fake server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServer().start()
+        fake = cls.server.fake
+        user = fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE)
+        vault = fake.add_vault('Tree', members={user['id']: ADMIN})
+        cls.root = fake.add_object(vault['id'], templateid='20', objectname='root')['id']
+        cls.child = fake.add_object(vault['id'], templateid='20', parentid=cls.root, objectname='child')['id']
+        cls.leaf = fake.add_object(vault['id'], parentid=cls.child, host='leaf', password='secret')['id']
+        cls.token = fake.login(MOCK_USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_fetch_tree(self):
+        """The whole tree arrives in one response and is indexed"""
+        with StoredSafe(token=self.token, **self.server.client_options()) as api:
+            tree = api.fetch_tree(self.root, decrypt=True)
+            self.assertEqual([node.object_id for node in tree], [self.root, self.child, self.leaf])
+            self.assertEqual(tree.children, {self.root: [self.child], self.child: [self.leaf]})
+            self.assertEqual(tree.entries[self.leaf]['crypted']['password'], 'secret')
+            self.assertEqual(len(api.fetch_tree(self.root, depth=1).complete()), 2)
+
+    def test_async(self):
+        """The asyncio client fetches the same tree"""
+        async def run():
+            async with AsyncStoredSafe(token=self.token, **self.server.client_options()) as api:
+                return [node.depth async for node in api.fetch_tree(self.root)]
+
+        self.assertEqual(asyncio.run(run()), [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
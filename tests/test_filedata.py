@@ -0,0 +1,101 @@
+"""
+Test incremental decoding of file data into files and buffers.
+"""
+import io
+import os
+import json
+import random
+import unittest
+import tempfile
+from base64 import b64encode, urlsafe_b64encode
+from pathlib import Path
+from unittest.mock import patch
+from storedsafe import StoredSafe, FileDataMissingException
+from storedsafe.filedata import FileDataDecoder
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+def feed_randomly(decoder, body, seed=0):
+    """Feed the body in chunks of random size, including single bytes."""
+    rng = random.Random(seed)
+    i = 0
+    while i < len(body):
+        size = rng.choice((1, 2, 3, 7, 64, 1000))
+        decoder.feed(body[i:i + size])
+        i += size
+    decoder.close()
+
+
+class FileData(unittest.TestCase):
+    """Test FileDataDecoder"""
+
+    def setUp(self):
+        self.content = os.urandom(10000)
+
+    def test_decode_split_chunks(self):
+        """File data split at any byte is decoded"""
+        body = json.dumps({
+            'OBJECT': [{'id': '1', 'notes': 'FILEDATA "quoted" \\\\', 'FILEDATA': 'decoy'}],
+            'FILEDATA': urlsafe_b64encode(self.content).decode(),
+            'CALLINFO': {'status': 'SUCCESS'},
+        }).encode()
+        for seed in range(5):
+            out = io.BytesIO()
+            feed_randomly(FileDataDecoder(out), body, seed)
+            self.assertEqual(out.getvalue(), self.content)
+
+    def test_escaped_slashes(self):
+        """Standard base64 with JSON-escaped slashes is decoded"""
+        body = b'{"FILEDATA" : "' + b64encode(self.content).replace(b'/', b'\\/') + b'"}'
+        out = io.BytesIO()
+        feed_randomly(FileDataDecoder(out), body)
+        self.assertEqual(out.getvalue(), self.content)
+
+    def test_missing_field(self):
+        """No file is created if the response has no file data"""
+        with tempfile.TemporaryDirectory() as directory:
+            dest = Path(directory) / 'file'
+            decoder = FileDataDecoder(dest)
+            feed_randomly(decoder, b'{"OBJECT": [], "FILEDATA": null}')
+            self.assertFalse(decoder.found)
+            self.assertFalse(dest.exists())
+
+
+class DownloadFile(unittest.TestCase):
+    """Test StoredSafe.download_file"""
+
+    def setUp(self):
+        self.api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN, **MOCK_DEFAULT_OPTIONS)
+
+    @patch('requests.Session.get', staticmethod(download_file))
+    def test_download_file(self):
+        """Successfully download file to a path"""
+        with tempfile.TemporaryDirectory() as directory:
+            dest = Path(directory) / 'file.txt'
+            res = self.api.download_file(MOCK_OBJECT_ID, dest, chunk_size=5, requests_options=MOCK_OVERRIDE_OPTIONS)
+            self.assertEqual(res.status_code, 200)
+            self.assertTrue(res.closed)
+            self.assertTrue(has_merged_options(res.options))
+            self.assertEqual(dest.read_bytes(), MOCK_FILE_CONTENT)
+
+    def test_download_without_filedata(self):
+        """Successful responses without file data raise instead of leaving dest empty"""
+        def get(*args, **kwargs):
+            return MockStreamResponse(json.dumps({'OBJECT': [{'id': str(MOCK_OBJECT_ID)}]}).encode(), 200, **kwargs)
+
+        with tempfile.TemporaryDirectory() as directory:
+            dest = Path(directory) / 'file.txt'
+            with patch('requests.Session.get', staticmethod(get)):
+                with self.assertRaises(FileDataMissingException):
+                    self.api.download_file(MOCK_OBJECT_ID, dest)
+            self.assertFalse(dest.exists())
+
+    @patch('requests.Session.get', staticmethod(download_file))
+    def test_download_file_error(self):
+        """Failed download leaves the buffer untouched"""
+        api = StoredSafe(host=MOCK_HOST, token='invalid-token')
+        out = io.BytesIO()
+        res = api.download_file(MOCK_OBJECT_ID, out)
+        self.assertEqual(res.status_code, 403)
+        self.assertEqual(out.getvalue(), b'')
@@ -0,0 +1,104 @@
+"""
+Test the multi-host high-availability client.
+"""
+import socket
+import tempfile
+import unittest
+from storedsafe.ha import MultiHostStoredSafe, NoHealthyHostException
+from storedsafe.fake import FakeServer, FakeStoredSafe, create_self_signed_cert, ADMIN
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+def closed_host():
+    """Get a local host:port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f'127.0.0.1:{sock.getsockname()[1]}'
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class MultiHost(unittest.TestCase):
+    """Test MultiHostStoredSafe against fake servers"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.cert, key = create_self_signed_cert(cls.tmpdir.name)
+        cls.shared = FakeStoredSafe()
+        user = cls.shared.add_user(MOCK_USERNAME, MOCK_PASSPHRASE)
+        cls.vault = cls.shared.add_vault('HA', members={user['id']: ADMIN})
+        # Two appliances sharing sessions, and one with sessions of its own.
+        cls.servers = [FakeServer(cls.shared, cls.cert, key).start() for _ in range(2)]
+        cls.separate = FakeServer(cert=cls.cert, key=key).start()
+        cls.separate.fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE)
+        cls.token = cls.shared.login(MOCK_USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in cls.servers + [cls.separate]:
+            server.stop()
+        cls.tmpdir.cleanup()
+
+    def client(self, hosts, **options):
+        """Get a client of the hosts, closed after the test."""
+        api = MultiHostStoredSafe(hosts, verify=self.cert, **options)
+        self.addCleanup(api.close)
+        return api
+
+    def test_reads_lowest_latency(self):
+        """Reads go to the fastest healthy host and writes to the first"""
+        hosts = [server.host for server in self.servers]
+        api = self.client(hosts, token=self.token, smoothing=0)
+        api.node(hosts[0]).latency, api.node(hosts[1]).latency = 1.0, 0.5
+        self.assertEqual(api.list_vaults().status_code, 200)
+        self.assertEqual(api.edit_vault(self.vault['id'], description='ha').status_code, 200)
+        stats = api.stats()
+        self.assertEqual((stats[hosts[0]]['requests'], stats[hosts[1]]['requests']), (1, 1))
+        api.node(hosts[1]).healthy = False
+        api.list_vaults()
+        self.assertEqual(api.stats()[hosts[0]]['requests'], 2)
+
+    def test_failover(self):
+        """Requests fail over from a host refusing connections"""
+        dead = closed_host()
+        api = self.client([dead, self.servers[0].host], token=self.token)
+        self.assertEqual(api.list_vaults().status_code, 200)
+        self.assertEqual(api.check().status_code, 200)
+        stats = api.stats()
+        self.assertFalse(stats[dead]['healthy'])
+        self.assertEqual((stats[dead]['failovers'], stats[self.servers[0].host]['requests']), (1, 2))
+
+    def test_no_healthy_host(self):
+        """Every host failing raises NoHealthyHostException"""
+        api = self.client([closed_host(), closed_host()], token=self.token)
+        with self.assertRaises(NoHealthyHostException):
+            api.list_vaults()
+
+    def test_affinity(self):
+        """Requests with a token go to the host that issued it"""
+        hosts = [self.separate.host, self.servers[0].host]
+        api = self.client(hosts, apikey='fake-apikey', affinity=True)
+        self.assertEqual(api.login_totp(MOCK_USERNAME, MOCK_PASSPHRASE, '123456').status_code, 200)
+        self.assertEqual(api.token_host, self.separate.host)
+        api.node(hosts[0]).latency, api.node(hosts[1]).latency = 1.0, 0.001
+        self.assertEqual(api.list_vaults().status_code, 200)
+        api.affinity = False
+        self.assertEqual(api.list_vaults().status_code, 403)
+
+    def test_check_health(self):
+        """Health checks time every host and mark the unreachable ones"""
+        dead = closed_host()
+        api = self.client([self.servers[0].host, dead], token=self.token, health_timeout=2)
+        stats = api.check_health()
+        self.assertTrue(stats[self.servers[0].host]['healthy'])
+        self.assertGreater(stats[self.servers[0].host]['latency'], 0)
+        self.assertEqual((stats[dead]['healthy'], stats[dead]['checks']), (False, 1))
+        self.assertIsNotNone(stats[dead]['last_error'])
+        api.start()
+        api.stop()
+        self.assertEqual(api.stats()[dead]['checks'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""
+Test the HTTP/2 transport of the sync and async clients.
+"""
+import socket
+import asyncio
+import unittest
+import warnings
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from importlib.util import find_spec
+from unittest.mock import patch
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+from storedsafe import StoredSafe
+from storedsafe.aio import AsyncStoredSafe
+from storedsafe.http2 import HTTP2Adapter
+from storedsafe.metrics import MetricsCollector
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+HAS_H2 = find_spec('h2') is not None
+
+
+@unittest.skipUnless(HAS_OPENSSL and HAS_H2, 'openssl and h2 are required to run the HTTP/2 stand-in server')
+class HTTP2(unittest.TestCase):
+    """Test requests multiplexed over HTTP/2 against a local h2-capable stand-in"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer(http2=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.server.connections = 0
+        self.api = StoredSafe(host=self.server.host, token=MOCK_TOKEN, verify=self.server.cert, http2=True)
+
+    def tearDown(self):
+        self.api.close()
+
+    def test_multiplexed(self):
+        """Concurrent requests share one connection"""
+        self.assertEqual(self.api.version().http_version, 'HTTP/2')
+        results = self.api.decrypt_objects(range(1, 33), max_workers=16)
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual({result.response.http_version for result in results}, {'HTTP/2'})
+        self.assertEqual(results[4].response.json()['path'], '/api/1.0/object/5')
+        self.assertEqual(self.server.server.connections, 1)
+
+    def test_body(self):
+        """Request bodies and headers reach the server"""
+        res = self.api.create_vault(groupname='http2')
+        self.assertEqual(res.json()['method'], 'POST')
+        self.assertEqual(res.json()['content_type'], 'application/json')
+        self.assertEqual(res.json()['body'], {'groupname': 'http2'})
+
+    def test_login(self):
+        """Logging in stores the token of the response"""
+        self.api.token = None
+        self.api.apikey = MOCK_APIKEY
+        res = self.api.login_totp(MOCK_USERNAME, MOCK_PASSPHRASE, MOCK_OTP)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.api.token, MOCK_TOKEN)
+
+    def test_download(self):
+        """Streamed responses are read in chunks"""
+        with TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / 'file.bin'
+            self.api.download_file(MOCK_OBJECT_ID, path)
+            self.assertEqual(path.read_bytes(), MOCK_FILE_CONTENT)
+
+    def test_connection_metrics(self):
+        """Only the first request opens a new connection"""
+        metrics = MetricsCollector()
+        with StoredSafe(
+                host=self.server.host, token=MOCK_TOKEN, verify=self.server.cert, http2=True,
+                metrics=metrics) as api:
+            for _ in range(3):
+                api.list_vaults()
+        self.assertEqual(metrics.summary()['GET vault']['reused'], 2)
+
+    def test_async(self):
+        """Concurrent requests of the async client share one connection"""
+        async def run():
+            async with AsyncStoredSafe(
+                    host=self.server.host, token=MOCK_TOKEN, verify=self.server.cert, http2=True) as api:
+                await api.version()
+                return await asyncio.gather(*(api.decrypt_object(object_id) for object_id in range(1, 17)))
+
+        responses = asyncio.run(run())
+        self.assertEqual({res.http_version for res in responses}, {'HTTP/2'})
+        self.assertEqual(self.server.server.connections, 1)
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the stand-in server')
+class Fallback(unittest.TestCase):
+    """Test falling back to HTTP/1.1"""
+
+    def test_http11_server(self):
+        """Servers not negotiating h2 are spoken to over HTTP/1.1"""
+        server = MockServer().start()
+        try:
+            with StoredSafe(host=server.host, token=MOCK_TOKEN, verify=server.cert, http2=True) as api:
+                res = api.list_vaults()
+        finally:
+            server.stop()
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.http_version, 'HTTP/1.1')
+
+    def test_missing_h2(self):
+        """HTTP/1.1 adapters are used with a warning if h2 is not installed"""
+        with patch('importlib.util.find_spec', lambda name: None if name == 'h2' else True):
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN, http2=True)
+        self.assertFalse(api.http2)
+        self.assertEqual([warning.category for warning in caught], [RuntimeWarning])
+        adapter = api.session.get_adapter(f'{MOCK_URL}/')
+        self.assertIsInstance(adapter, HTTPAdapter)
+        self.assertNotIsInstance(adapter, HTTP2Adapter)
+
+
+class Errors(unittest.TestCase):
+    """Test translating transport errors to requests exceptions"""
+
+    def test_refused(self):
+        """Refused connections raise ConnectionError caused by a connect error, like HTTPAdapter"""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        with StoredSafe(host=f'127.0.0.1:{port}', token=MOCK_TOKEN, http2=True) as api:
+            with self.assertRaises(requests.ConnectionError) as context:
+                api.list_vaults()
+        self.assertIsInstance(context.exception.args[0].reason, ConnectTimeoutError)
+
+    def test_timeout(self):
+        """Servers not answering the handshake raise a requests timeout"""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            sock.listen()
+            with StoredSafe(host=f'127.0.0.1:{sock.getsockname()[1]}', token=MOCK_TOKEN, http2=True) as api:
+                with self.assertRaises(requests.Timeout):
+                    api.list_vaults(requests_options={'timeout': 0.2})
+
+
+if __name__ == '__main__':
+    unittest.main()
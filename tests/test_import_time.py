@@ -0,0 +1,49 @@
+"""
+Test that importing storedsafe stays cheap.
+"""
+import os
+import sys
+import json
+import unittest
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Modules that must only be imported on first use.
+DEFERRED = ('requests', 'urllib3', 'asyncio', 'concurrent.futures', 'email.utils', 'httpx', 'sqlite3')
+
+# Cumulative microseconds `import storedsafe` may take, overridable for slow machines.
+BUDGET = int(os.environ.get('STOREDSAFE_IMPORT_BUDGET_US', 75000))
+
+
+def python(*args):
+    """Run a Python subprocess with the package importable and return its stderr and stdout."""
+    env = {**os.environ, 'PYTHONPATH': str(ROOT)}
+    process = subprocess.run(
+        [sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return process.stdout, process.stderr
+
+
+class ImportTime(unittest.TestCase):
+    """Test the import of storedsafe"""
+
+    def test_deferred(self):
+        """The HTTP stack and optional machinery are not imported with the package"""
+        stdout, _ = python('-c', (
+            'import sys, json, storedsafe; '
+            f'print(json.dumps([name for name in {DEFERRED!r} if name in sys.modules]))'))
+        self.assertEqual(json.loads(stdout), [])
+
+    def test_budget(self):
+        """Importing storedsafe stays within the import time budget"""
+        timings = []
+        for _ in range(3):
+            _, stderr = python('-X', 'importtime', '-c', 'import storedsafe')
+            line = next(line for line in stderr.splitlines() if line.endswith('| storedsafe'))
+            timings.append(int(line.split('|')[1]))
+        self.assertLess(min(timings), BUDGET, f'import storedsafe took {min(timings)} us')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Test streaming bulk import of objects.
+"""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from storedsafe import StoredSafe
+from storedsafe.fake import FakeServer, ADMIN
+from storedsafe.importer import BulkImporter, ImportValidationException, read_records, template_of
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+CSV = '''legacy_id,hostname,user,secret
+a1,db1.example.com,root,one
+a2,db2.example.com,admin,two
+a3,,nobody,three
+a4,db4.example.com,root,four
+'''
+
+
+class Records(unittest.TestCase):
+    """Test reading records and templates"""
+
+    def test_read_records(self):
+        """CSV and JSONL records are numbered by data row"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            csv_path = Path(tmpdir) / 'export.csv'
+            csv_path.write_text(CSV)
+            jsonl_path = Path(tmpdir) / 'export.jsonl'
+            jsonl_path.write_text('{"host": "a"}\n\n{"host": "b"}\n')
+            self.assertEqual(list(read_records(csv_path))[1], (2, {
+                'legacy_id': 'a2', 'hostname': 'db2.example.com', 'user': 'admin', 'secret': 'two'}))
+            self.assertEqual(list(read_records(jsonl_path)), [(1, {'host': 'a'}), (2, {'host': 'b'})])
+
+    def test_template_of(self):
+        """Templates are found in lists and dicts keyed by id"""
+        template = {'id': '1', 'structure': {}}
+        self.assertEqual(template_of({'TEMPLATE': [template]}), template)
+        self.assertEqual(template_of({'TEMPLATE': {'1': template}}), template)
+        self.assertEqual(template_of({'TEMPLATE': template}), template)
+        self.assertIsNone(template_of({}))
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class Import(unittest.TestCase):
+    """Test BulkImporter against the fake server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServer().start()
+        cls.fake = cls.server.fake
+        cls.fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        user_id = next(iter(self.fake.users))
+        self.vault = self.fake.add_vault('Import', members={user_id: ADMIN})
+        self.api = StoredSafe(token=self.fake.login(MOCK_USERNAME), **self.server.client_options())
+        self.addCleanup(self.api.close)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.source = Path(tmpdir.name) / 'export.csv'
+        self.source.write_text(CSV)
+        self.journal = Path(tmpdir.name) / 'journal.jsonl'
+
+    def importer(self, **kwargs):
+        """Create an importer of the CSV export into the test vault."""
+        return BulkImporter(
+            self.api, self.vault['id'], 1, mapping={'hostname': 'host', 'user': 'username', 'secret': 'password'},
+            required=('host',), journal_path=self.journal, key='legacy_id', max_workers=4, **kwargs)
+
+    def imported(self):
+        """Get the imported objects by host."""
+        return {
+            entry['public']['host']: self.fake.secrets[entry['id']]
+            for entry in self.fake.objects.values() if entry['groupid'] == self.vault['id']}
+
+    def test_import(self):
+        """Valid records are created and invalid ones reported"""
+        reports = []
+        report = self.importer(progress=reports.append, progress_every=1).run(self.source)
+        self.assertEqual(report.created, 3)
+        self.assertEqual(report.invalid, {'a3': 'Missing host'})
+        self.assertFalse(report.ok)
+        self.assertEqual(len(reports), 3)
+        self.assertEqual(self.imported()['db2.example.com'], {'password': 'two'})
+
+    def test_rerun(self):
+        """Reruns skip the records created according to the journal"""
+        self.importer().run(self.source)
+        self.journal.write_text(self.journal.read_text() + '{"key": "a4", "sta')
+        report = self.importer().run(self.source)
+        self.assertEqual((report.created, report.skipped), (0, 3))
+        self.assertEqual(len(self.imported()), 3)
+        lines = [json.loads(line) for line in self.journal.read_text().splitlines() if line.endswith('}')]
+        self.assertEqual({line['key'] for line in lines if line['status'] == 'created'}, {'a1', 'a2', 'a4'})
+
+    def test_duplicate_key(self):
+        """Records repeating a key are invalid instead of created twice"""
+        self.source.write_text(CSV + 'a2,db2b.example.com,admin,again\n')
+        report = self.importer().run(self.source)
+        self.assertEqual(report.created, 3)
+        self.assertEqual(report.invalid['a2'], "Duplicate key 'a2'")
+        self.assertNotIn('db2b.example.com', self.imported())
+        lines = [json.loads(line) for line in self.journal.read_text().splitlines()]
+        self.assertEqual([line['key'] for line in lines if line['status'] == 'created'].count('a2'), 1)
+
+    def test_failed(self):
+        """Rejected creates are journaled as failed and retried on the next run"""
+        self.fake.members[self.vault['id']].clear()
+        report = self.importer().run(self.source)
+        self.assertEqual(report.created, 0)
+        self.assertEqual(report.failed['a1'], 'HTTP 403')
+        self.fake.members[self.vault['id']][next(iter(self.fake.users))] = ADMIN
+        self.assertEqual(self.importer().run(self.source).created, 3)
+
+    def test_unknown_field(self):
+        """Columns that are not template fields are invalid unless mapped"""
+        importer = BulkImporter(self.api, self.vault['id'], 1)
+        with self.assertRaises(ImportValidationException):
+            importer.params({'hostname': 'a'})
+        self.assertEqual(importer.params({'host': 'a', 'tags': 'x'}), {
+            'host': 'a', 'tags': 'x', 'templateid': '1', 'groupid': self.vault['id']})
+        self.assertEqual(BulkImporter(self.api, self.vault['id'], 1, mapping={'hostname': None}).params(
+            {'hostname': 'a', 'host': 'b'})['host'], 'b')
+
+
+if __name__ == '__main__':
+    unittest.main()
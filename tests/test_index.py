@@ -0,0 +1,76 @@
+"""
+Test the local vault index.
+"""
+import os
+import unittest
+import tempfile
+from unittest.mock import patch
+from storedsafe import StoredSafe
+from storedsafe.index import VaultIndex, IndexRefreshException
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+@patch('requests.Session.get', staticmethod(vault_listing))
+class Index(unittest.TestCase):
+    """Test VaultIndex"""
+
+    def setUp(self):
+        self.api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN)
+
+    def test_find_local(self):
+        """Substring search over names and public fields, ignoring case"""
+        with VaultIndex(self.api) as index:
+            stats = index.refresh()
+            self.assertEqual(stats['objects'], 3)
+            self.assertEqual(stats['vaults'], 2)
+            self.assertGreater(stats['size'], 0)
+            data = index.find_local('EXAMPLE.com')
+            self.assertEqual([entry['id'] for entry in data['OBJECT']], ['10', '20'])
+            self.assertEqual(data['TEMPLATES'], [{'id': '1', 'name': 'Server'}])
+            self.assertEqual([entry['id'] for entry in index.find_local('wa')['OBJECT']], ['11'])
+            self.assertEqual(index.find_local('100%')['OBJECT'], [])
+
+    def test_persistent(self):
+        """The index is kept on disk between instances"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index.db')
+            with VaultIndex(self.api, path) as index:
+                index.refresh()
+            with VaultIndex(self.api, path) as index:
+                self.assertEqual(len(index.find_local(MOCK_NEEDLE)['OBJECT']), 1)
+
+    def test_refresh_vault(self):
+        """Refreshing one vault keeps the other vaults"""
+        with VaultIndex(self.api) as index:
+            index.refresh()
+            MOCK_LISTINGS['2']['OBJECTS'].append({'id': '21', 'templateid': '1', 'objectname': 'db02'})
+            try:
+                index.refresh(['2'])
+            finally:
+                MOCK_LISTINGS['2']['OBJECTS'].pop()
+            self.assertEqual(index.stats()['objects'], 4)
+            self.assertEqual(len(index.find_local('db0')['OBJECT']), 2)
+
+    def test_moved_object(self):
+        """Objects moved to a refreshed vault leave no search entry behind"""
+        with VaultIndex(self.api) as index:
+            index.refresh()
+            moved = MOCK_LISTINGS['1']['OBJECTS'].pop(0)
+            MOCK_LISTINGS['2']['OBJECTS'].append({**moved, 'objectname': 'moved', 'public': {}})
+            try:
+                index.refresh(['2'])
+            finally:
+                MOCK_LISTINGS['1']['OBJECTS'].insert(0, MOCK_LISTINGS['2']['OBJECTS'].pop())
+            orphans, = index.db.execute(
+                'SELECT COUNT(*) FROM search WHERE rowid NOT IN (SELECT rowid FROM objects)').fetchone()
+            self.assertEqual(orphans, 0)
+            self.assertEqual(index.find_local('web01')['OBJECT'], [])
+            self.assertEqual([entry['id'] for entry in index.find_local('moved')['OBJECT']], ['10'])
+
+    def test_refresh_failed(self):
+        """A failed listing leaves the index untouched"""
+        with VaultIndex(self.api) as index:
+            index.refresh()
+            with self.assertRaises(IndexRefreshException):
+                index.refresh(['1', '404'])
+            self.assertEqual(index.stats()['objects'], 3)
@@ -0,0 +1,130 @@
+"""
+Test the generator-based iteration over vaults, objects and users.
+"""
+import time
+import asyncio
+import unittest
+from storedsafe import StoredSafe, ListingException
+from storedsafe.aio import AsyncStoredSafe
+from storedsafe.fake import FakeServer, ADMIN
+from storedsafe.iteration import TreeWalk
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+class Walk(unittest.TestCase):
+    """Test TreeWalk on entries of one level at a time"""
+
+    def test_levels(self):
+        """Objects with children of which none are known are fetched"""
+        walk = TreeWalk(1)
+        fetched, taken = [], []
+        levels = {
+            '1': [{'id': '1', 'parentid': '0', 'children': '2'}, {'id': '2', 'parentid': '1', 'children': '1'},
+                  {'id': '3', 'parentid': '1', 'children': '0'}],
+            '2': [{'id': '2', 'parentid': '1', 'children': '1'}, {'id': '4', 'parentid': '2', 'children': '0'}],
+        }
+        while walk:
+            missing = walk.missing()
+            if missing is not None:
+                fetched.append(missing)
+                walk.add(missing, levels[missing])
+            taken.append(walk.take()['id'])
+        self.assertEqual((fetched, taken), (['1', '2'], ['1', '2', '4', '3']))
+
+    def test_not_found(self):
+        """A missing object raises ListingException"""
+        walk = TreeWalk(1)
+        walk.add('1', [])
+        with self.assertRaises(ListingException):
+            walk.take()
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class Iteration(unittest.TestCase):
+    """Test the iteration methods against the fake server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServer().start()
+        fake = cls.fake = cls.server.fake
+        user = fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE)
+        fake.add_user('other', 'passphrase', fullname='Other Person')
+        cls.vaults = [fake.add_vault(f'Iter{i}', members={user['id']: ADMIN}) for i in range(3)]
+        cls.objects = {
+            vault['id']: [fake.add_object(vault['id'], host=f'{vault["id"]}-{i}')['id'] for i in range(3)]
+            for vault in cls.vaults}
+        first = cls.objects[cls.vaults[0]['id']][0]
+        child = fake.add_object(cls.vaults[0]['id'], parentid=first, host='child')['id']
+        grandchild = fake.add_object(cls.vaults[0]['id'], parentid=child, host='grandchild')['id']
+        sibling = fake.add_object(cls.vaults[0]['id'], parentid=first, host='sibling')['id']
+        cls.tree = [first, child, grandchild, sibling]
+        cls.objects[cls.vaults[0]['id']] += [child, grandchild, sibling]
+        cls.token = fake.login(MOCK_USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.api = StoredSafe(token=self.token, **self.server.client_options())
+        self.addCleanup(self.api.close)
+
+    def test_vaults_and_users(self):
+        """Vaults and users are yielded"""
+        self.assertEqual([vault['id'] for vault in self.api.iter_vaults()], [vault['id'] for vault in self.vaults])
+        self.assertEqual({user['username'] for user in self.api.iter_users()}, {MOCK_USERNAME, 'other'})
+        self.assertEqual([user['username'] for user in self.api.iter_users('Other')], ['other'])
+
+    def test_objects(self):
+        """Objects of one or all vaults are yielded, with or without prefetch"""
+        expected = [object_id for vault in self.vaults for object_id in self.objects[vault['id']]]
+        for prefetch in (True, False):
+            self.assertEqual(sorted(entry['id'] for entry in self.api.iter_objects(prefetch=prefetch)), sorted(expected))
+        vault_id = self.vaults[1]['id']
+        self.assertEqual([entry['id'] for entry in self.api.iter_objects(vault_id)], self.objects[vault_id])
+        with self.assertRaises(ListingException):
+            list(self.api.iter_objects('missing'))
+
+    def test_prefetch(self):
+        """The next vault listing is requested while the current one is consumed"""
+        requested = []
+        vault_objects = self.api.vault_objects
+
+        def record(vault_id, requests_options={}):
+            requested.append(vault_id)
+            return vault_objects(vault_id, requests_options)
+
+        self.api.vault_objects = record
+        objects = self.api.iter_objects()
+        next(objects)
+        deadline = time.monotonic() + 5
+        while len(requested) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(requested, [self.vaults[0]['id'], self.vaults[1]['id']])
+        objects.close()
+
+    def test_walk_tree(self):
+        """An object and its descendants are yielded parents first"""
+        self.assertEqual([entry['id'] for entry in self.api.walk_tree(self.tree[0])], self.tree)
+        with self.assertRaises(ListingException):
+            list(self.api.walk_tree('missing'))
+
+    def test_async(self):
+        """The asyncio client yields the same entries"""
+        async def run():
+            async with AsyncStoredSafe(token=self.token, **self.server.client_options()) as api:
+                return (
+                    [vault['id'] async for vault in api.iter_vaults()],
+                    sorted([entry['id'] async for entry in api.iter_objects()]),
+                    [user['username'] async for user in api.iter_users('Other')],
+                    [entry['id'] async for entry in api.walk_tree(self.tree[0])])
+
+        vaults, objects, users, tree = asyncio.run(run())
+        self.assertEqual(vaults, [vault['id'] for vault in self.vaults])
+        self.assertEqual(objects, sorted(object_id for ids in self.objects.values() for object_id in ids))
+        self.assertEqual((users, tree), (['other'], self.tree))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Test declarative vault membership reconciliation.
+"""
+import unittest
+from storedsafe import StoredSafe
+from storedsafe.fake import FakeServer, READ, WRITE, ADMIN
+from storedsafe.members import MembershipReconciler, ADD, EDIT, REMOVE
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class Reconcile(unittest.TestCase):
+    """Test MembershipReconciler against the fake server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServer().start()
+        cls.fake = cls.server.fake
+        cls.admin = cls.fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE, admin=True)['id']
+        cls.alice = cls.fake.add_user('alice', 'a')['id']
+        cls.bob = cls.fake.add_user('bob', 'b')['id']
+        cls.carol = cls.fake.add_user('carol', 'c')['id']
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.first = self.fake.add_vault('First', members={self.admin: ADMIN, self.alice: READ, self.bob: WRITE})['id']
+        self.second = self.fake.add_vault('Second', members={self.admin: ADMIN, self.carol: READ})['id']
+        self.api = StoredSafe(token=self.fake.login(MOCK_USERNAME), **self.server.client_options())
+        self.addCleanup(self.api.close)
+        self.desired = {
+            self.first: {self.admin: ADMIN, 'alice': WRITE, self.carol: READ},
+            self.second: {self.admin: ADMIN, 'carol': READ},
+        }
+
+    def test_plan(self):
+        """The minimal changes are planned without sending them"""
+        plan = MembershipReconciler(self.api).plan(self.desired)
+        self.assertEqual(
+            sorted((change.vault_id, change.user_id, change.action) for change in plan.changes),
+            sorted([(self.first, self.alice, EDIT), (self.first, self.carol, ADD), (self.first, self.bob, REMOVE)]))
+        report = plan.report()
+        self.assertEqual(report[self.first][EDIT], {self.alice: [READ, WRITE]})
+        self.assertEqual((report[self.first]['unchanged'], report[self.second]['unchanged']), (1, 2))
+        self.assertEqual(report[self.second][ADD], [])
+        self.assertEqual(self.fake.members[self.first][self.alice], READ)
+
+    def test_reconcile(self):
+        """Applying the plan makes the vaults match and a second run changes nothing"""
+        reconciler = MembershipReconciler(self.api, max_workers=4, rate_limit=100)
+        self.assertEqual(reconciler.reconcile(self.desired, plan_only=True)[self.first][REMOVE], [self.bob])
+        report = reconciler.reconcile(self.desired)
+        self.assertEqual((report[self.first]['applied'], report[self.first]['failed']), (3, {}))
+        self.assertEqual(
+            self.fake.members[self.first], {self.admin: ADMIN, self.alice: WRITE, self.carol: READ})
+        self.assertEqual(reconciler.plan(self.desired).changes, [])
+
+    def test_no_prune(self):
+        """Without prune, members missing from the desired state are kept"""
+        plan = MembershipReconciler(self.api, prune=False).plan(self.desired)
+        self.assertNotIn(REMOVE, {change.action for change in plan.changes})
+
+    def test_errors(self):
+        """Unknown users and vaults are reported per vault"""
+        report = MembershipReconciler(self.api).reconcile({self.first: {'nobody': READ}, 'missing': {self.alice: READ}})
+        self.assertEqual(report[self.first]['error'], 'Unknown users: nobody')
+        self.assertEqual(report['missing']['error'], 'vault missing: HTTP 404')
+        self.assertEqual(self.fake.members[self.first][self.bob], WRITE)
+
+
+if __name__ == '__main__':
+    unittest.main()
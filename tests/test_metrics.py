@@ -0,0 +1,115 @@
+"""
+Test per-endpoint request metrics.
+"""
+import asyncio
+import unittest
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from storedsafe import StoredSafe
+from storedsafe.aio import AsyncStoredSafe
+from storedsafe.metrics import MetricsCollector, PrometheusExporter, endpoint
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+def failing(*args, **kwargs):
+    """Fail without a response."""
+    raise requests.ConnectionError('Connection refused')
+
+
+class Metrics(unittest.TestCase):
+    """Test MetricsCollector"""
+
+    def setUp(self):
+        self.metrics = MetricsCollector()
+        self.api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN, metrics=self.metrics, **MOCK_DEFAULT_OPTIONS)
+
+    def test_endpoint(self):
+        """Resource ids are replaced in endpoint names"""
+        self.assertEqual(endpoint(f'{MOCK_URL}/api/1.0/vault/{MOCK_VAULT_ID}/members'), 'vault/{id}/members')
+        self.assertEqual(endpoint(f'{MOCK_URL}/api/1.0/utils/version'), 'utils/version')
+        self.assertEqual(endpoint(f'{MOCK_URL}/api/1.0/user/{MOCK_SEARCH_STRING}'), 'user/{id}')
+
+    @patch('requests.Session.get', staticmethod(get_object))
+    def test_record(self):
+        """Requests are recorded per method and endpoint"""
+        for _ in range(3):
+            self.api.get_object(MOCK_OBJECT_ID, requests_options=MOCK_OVERRIDE_OPTIONS)
+        summary = self.metrics.summary()['GET object/{id}']
+        self.assertEqual(summary['count'], 3)
+        self.assertEqual(summary['statuses'], {200: 3})
+        self.assertLessEqual(summary['p50'], summary['p99'])
+
+    @patch('requests.Session.get', staticmethod(failing))
+    def test_record_error(self):
+        """Failed requests are recorded as errors"""
+        with self.assertRaises(requests.ConnectionError):
+            self.api.list_vaults()
+        self.assertEqual(self.metrics.summary()['GET vault']['errors'], 1)
+
+    def test_prometheus(self):
+        """Metrics are exported in the Prometheus text format"""
+        self.metrics.observe('get', f'{MOCK_URL}/api/1.0/vault', 0.02, 200, 0, 512, True)
+        self.metrics.observe('get', f'{MOCK_URL}/api/1.0/vault', 2.0, 503, 0, 10, False)
+        text = PrometheusExporter().export(self.metrics)
+        self.assertIn('storedsafe_request_duration_seconds_bucket{method="GET",endpoint="vault",le="0.025"} 1', text)
+        self.assertIn('storedsafe_request_duration_seconds_bucket{method="GET",endpoint="vault",le="+Inf"} 2', text)
+        self.assertIn('storedsafe_request_duration_seconds_count{method="GET",endpoint="vault"} 2', text)
+        self.assertIn('storedsafe_responses_total{method="GET",endpoint="vault",status="503"} 1', text)
+        self.assertIn('storedsafe_received_bytes_total{method="GET",endpoint="vault"} 522', text)
+        self.assertIn('storedsafe_reused_connections_total{method="GET",endpoint="vault"} 1', text)
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the stand-in server')
+class ConnectionReuse(unittest.TestCase):
+    """Test connection reuse metrics against a local stand-in server"""
+
+    def test_reused(self):
+        """Only the first request opens a new connection"""
+        server = MockServer().start()
+        metrics = MetricsCollector()
+        try:
+            with StoredSafe(host=server.host, token=MOCK_TOKEN, metrics=metrics, verify=server.cert) as api:
+                for _ in range(3):
+                    api.list_vaults()
+        finally:
+            server.stop()
+        summary = metrics.summary()['GET vault']
+        self.assertEqual(summary['reused'], 2)
+        self.assertGreater(summary['bytes_received'], 0)
+
+    def test_concurrent(self):
+        """Every request on a new connection counts as not reused when requests overlap"""
+        server = MockServer().start()
+        metrics = MetricsCollector()
+        try:
+            with StoredSafe(
+                    host=server.host, token=MOCK_TOKEN, metrics=metrics, verify=server.cert, pool_size=8) as api:
+                with ThreadPoolExecutor(8) as executor:
+                    list(executor.map(lambda _: api.list_vaults(), range(32)))
+        finally:
+            server.stop()
+        self.assertEqual(metrics.summary()['GET vault']['reused'], 32 - server.server.connections)
+
+    def test_disabled(self):
+        """Connections are not tracked without metrics"""
+        self.assertEqual(len(StoredSafe(host=MOCK_HOST).session.hooks['response']), 1)
+        self.assertEqual(len(StoredSafe(host=MOCK_HOST, metrics=MetricsCollector()).session.hooks['response']), 2)
+
+    def test_async(self):
+        """The async client records reused connections"""
+        server = MockServer().start()
+        metrics = MetricsCollector()
+
+        async def run():
+            async with AsyncStoredSafe(
+                    host=server.host, token=MOCK_TOKEN, metrics=metrics, verify=server.cert, pool_size=4) as api:
+                await api.list_vaults()
+                await asyncio.gather(*(api.list_vaults() for _ in range(15)))
+
+        try:
+            asyncio.run(run())
+        finally:
+            server.stop()
+        self.assertEqual(metrics.summary()['GET vault']['reused'], 16 - server.server.connections)
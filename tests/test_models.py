@@ -0,0 +1,114 @@
+"""
+Test the typed response models.
+"""
+import sys
+import unittest
+from unittest.mock import Mock
+from storedsafe import StoredSafe
+from storedsafe.fake import FakeServer, ADMIN
+from storedsafe.models import Result, Listing, Object, Vault, Template, User, CallInfo
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+def response(data, status_code=200):
+    """Get a mocked response returning data from json()."""
+    res = Mock(status_code=status_code)
+    res.json.return_value = data
+    return res
+
+
+class Models(unittest.TestCase):
+    """Test the models on raw data"""
+
+    def test_slots(self):
+        """Models have no instance dict"""
+        for model in (Object, Vault, Template, User, CallInfo, Listing, Result):
+            self.assertEqual(model.__dictoffset__, 0)
+
+    def test_fields(self):
+        """Fields are converted on access and default when missing"""
+        obj = Object({
+            'id': 7, 'parentid': '0', 'objectname': 'web', 'children': '2',
+            'public': {'host': 'web'}, 'crypted': {'password': 'secret'}})
+        self.assertEqual((obj.id, obj.parent_id, obj.name, obj.children), ('7', '0', 'web', 2))
+        self.assertEqual((obj['host'], obj['password'], obj.get('info', '')), ('web', 'secret', ''))
+        self.assertTrue(obj.decrypted)
+        self.assertFalse(Object({'public': {}}).decrypted)
+        self.assertEqual((Object({}).public, Object({}).tags), ({}, ''))
+        with self.assertRaises(KeyError):
+            obj['info'] # pylint: disable=pointless-statement
+
+    def test_parsed_on_access(self):
+        """Nothing is parsed until a field is read"""
+        res = response({'OBJECTS': [{'id': '1'}, {'id': '2'}]})
+        result = Result(res)
+        res.json.assert_not_called()
+        self.assertEqual([obj.id for obj in result.objects], ['1', '2'])
+        self.assertEqual(len(result.objects), 2)
+        res.json.assert_called_once()
+
+    def test_listing(self):
+        """Listings wrap lists and dicts keyed by id lazily"""
+        entries = {'1': {'id': '1', 'groupname': 'a'}, '2': {'id': '2', 'groupname': 'b'}}
+        listing = Listing(entries, Vault)
+        self.assertEqual([vault.name for vault in listing], ['a', 'b'])
+        self.assertEqual((listing[1].name, listing.get(2).name, listing.get('3')), ('b', 'b', None))
+        self.assertEqual([vault.id for vault in listing[:1]], ['1'])
+        self.assertFalse(Listing(None, Vault))
+        self.assertIsNot(listing[0], listing[0])
+        self.assertEqual(listing[0], listing[0])
+        self.assertLess(sys.getsizeof(listing[0]), sys.getsizeof(entries['1']))
+
+    def test_raw_response(self):
+        """The raw response stays available and other attributes fall through to it"""
+        res = response({'ERRORS': ['Nope'], 'CALLINFO': {'status': 'FAIL', 'errorcodes': '1'}}, 403)
+        result = Result(res)
+        self.assertIs(result.response, res)
+        self.assertEqual(result.status_code, 403)
+        self.assertEqual(result.json(), res.json())
+        self.assertFalse(result.ok)
+        self.assertEqual(result.errors, ['Nope'])
+        self.assertEqual((result.callinfo.ok, result.callinfo.errorcodes), (False, 1))
+
+    def test_not_json(self):
+        """A body that is not JSON gives empty data"""
+        res = Mock(status_code=502)
+        res.json.side_effect = ValueError
+        self.assertEqual((Result(res).data, len(Result(res).vaults)), ({}, 0))
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class Server(unittest.TestCase):
+    """Test the models on responses of the fake server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServer().start()
+        fake = cls.server.fake
+        user = fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE, fullname='Mock User')
+        cls.vault = fake.add_vault('Models', members={user['id']: ADMIN})
+        cls.object = fake.add_object(cls.vault['id'], host='db.example.com', password='secret')
+        cls.api = StoredSafe(token=fake.login(MOCK_USERNAME), **cls.server.client_options())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.close()
+        cls.server.stop()
+
+    def test_responses(self):
+        """Listings and single entries of real responses are typed"""
+        result = Result(self.api.vault_objects(self.vault['id']))
+        self.assertTrue(result.ok)
+        self.assertEqual(result.vaults[0].name, 'Models')
+        self.assertEqual([(obj.id, obj['host']) for obj in result.objects], [(self.object['id'], 'db.example.com')])
+        server = result.templates.get(1)
+        self.assertEqual((server.name, server.is_file), ('Server', False))
+        self.assertEqual(server.encrypted_fields, ['password', 'cryptedinfo'])
+        self.assertEqual(Result(self.api.decrypt_object(self.object['id'])).objects[0]['password'], 'secret')
+        self.assertEqual(Result(self.api.list_users()).users[0].fullname, 'Mock User')
+        self.assertEqual(Result(self.api.check()).callinfo.status, 'SUCCESS')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Test the streaming multipart encoder used for file uploads.
+"""
+import os
+import unittest
+import tempfile
+from unittest.mock import patch
+from storedsafe import StoredSafe
+from storedsafe.multipart import MultipartFileEncoder
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+MOCK_LARGE_FILE_SIZE = 1024 * 1024 + 17
+
+
+class Multipart(unittest.TestCase):
+    """Test MultipartFileEncoder"""
+
+    def setUp(self):
+        self.file = tempfile.NamedTemporaryFile(suffix=MOCK_FILE_EXTENSION)  # pylint: disable=consider-using-with
+        self.file.write(os.urandom(MOCK_LARGE_FILE_SIZE))
+        self.file.flush()
+
+    def tearDown(self):
+        self.file.close()
+
+    def test_bounded_chunks(self):
+        """The body is produced in chunks no larger than chunk_size"""
+        encoder = MultipartFileEncoder.from_path(MOCK_PARAMS, 'upload', self.file.name, chunk_size=4096)
+        chunks = list(encoder)
+        self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+        body = b''.join(chunks)
+        self.assertEqual(len(body), len(encoder))
+        data, files = parse_multipart(encoder.content_type, body)
+        self.assertEqual(data, {key: str(value) for key, value in MOCK_PARAMS.items()})
+        with open(self.file.name, 'rb') as f:
+            self.assertEqual(files['upload'][1], f.read())
+
+    def test_head(self):
+        """Bytes already read from the start of the file are reused"""
+        with open(self.file.name, 'rb') as f:
+            head = f.read(64)
+            content = head + f.read()
+        encoder = MultipartFileEncoder.from_path({}, 'upload', self.file.name, head)
+        _, files = parse_multipart(encoder.content_type, b''.join(encoder))
+        self.assertEqual(files['upload'][1], content)
+
+    def test_progress(self):
+        """Progress is reported for every chunk and the file is closed at the end"""
+        progress = []
+        fileobj = open(self.file.name, 'rb')  # pylint: disable=consider-using-with
+        encoder = MultipartFileEncoder(
+            {}, 'upload', 'file.txt', fileobj, MOCK_LARGE_FILE_SIZE, chunk_size=65536, callback=progress.append)
+        for _ in encoder:
+            pass
+        self.assertTrue(fileobj.closed)
+        self.assertEqual(progress[-1].sent, len(encoder))
+        self.assertEqual(progress[-1].total, len(encoder))
+        self.assertGreater(len(progress), MOCK_LARGE_FILE_SIZE // 65536)
+
+    @patch('requests.Session.post', staticmethod(file_upload))
+    def test_upload_file_progress(self):
+        """upload_file reports progress through the callback"""
+        api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN)
+        progress = []
+        with tempfile.NamedTemporaryFile(suffix=MOCK_FILE_EXTENSION) as fp:
+            fp.write(MOCK_FILE_CONTENT)
+            fp.flush()
+            res = api.upload_file(fp.name, progress=progress.append, **MOCK_PARAMS)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(progress[-1].sent, progress[-1].total)
@@ -19,7 +19,7 @@ class Object(unittest.TestCase):
             host=mocks.MOCK_HOST, token=mocks.MOCK_TOKEN, **mocks.MOCK_DEFAULT_OPTIONS
         )
 
-    @patch("requests.get", mocks.get_object)
+    @patch("requests.Session.get", staticmethod(mocks.get_object))
     def test_get_object(self):
         """Successfully get object"""
         res = self.api.get_object(
@@ -28,7 +28,7 @@ class Object(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(mocks.has_merged_options(res.options), True)
 
-    @patch("requests.get", mocks.get_object_children)
+    @patch("requests.Session.get", staticmethod(mocks.get_object_children))
     def test_get_object_children(self):
         """Successfully get object with children"""
         res = self.api.get_object(
@@ -37,7 +37,7 @@ class Object(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(mocks.has_merged_options(res.options), True)
 
-    @patch("requests.get", mocks.decrypt_object)
+    @patch("requests.Session.get", staticmethod(mocks.decrypt_object))
     def test_decrypt_object(self):
         """Successfully decrypt object"""
         res = self.api.decrypt_object(
@@ -46,7 +46,7 @@ class Object(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(mocks.has_merged_options(res.options), True)
 
-    @patch("requests.post", mocks.create_object)
+    @patch("requests.Session.post", staticmethod(mocks.create_object))
     def test_create_object(self):
         """Successful create object"""
         res = self.api.create_object(
@@ -55,7 +55,7 @@ class Object(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(mocks.has_merged_options(res.options), True)
 
-    @patch("requests.put", mocks.edit_object)
+    @patch("requests.Session.put", staticmethod(mocks.edit_object))
     def test_edit_object(self):
         """Successful edit object"""
         res = self.api.edit_object(
@@ -66,7 +66,7 @@ class Object(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(mocks.has_merged_options(res.options), True)
 
-    @patch("requests.delete", mocks.delete_object)
+    @patch("requests.Session.delete", staticmethod(mocks.delete_object))
     def test_delete_object(self):
         """Successful delete object"""
         res = self.api.delete_object(
@@ -75,7 +75,7 @@ class Object(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(mocks.has_merged_options(res.options), True)
 
-    @patch("requests.get", mocks.find)
+    @patch("requests.Session.get", staticmethod(mocks.find))
     def test_find(self):
         """Successfully request find"""
         res = self.api.find(
@@ -84,7 +84,7 @@ class Object(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(mocks.has_merged_options(res.options), True)
 
-    @patch("requests.get", mocks.get_file)
+    @patch("requests.Session.get", staticmethod(mocks.get_file))
     def test_get_file(self):
         """Successfully request file"""
         res = self.api.get_file(
@@ -93,7 +93,7 @@ class Object(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(mocks.has_merged_options(res.options), True)
 
-    @patch("requests.post", mocks.get_mime_type)
+    @patch("requests.Session.post", staticmethod(mocks.get_mime_type))
     def test_get_mime_type(self):
         """Successfully request mime type"""
         with tempfile.NamedTemporaryFile(suffix=".txt") as fp:
@@ -103,7 +103,7 @@ class Object(unittest.TestCase):
             self.assertEqual(res.status_code, 200)
             self.assertTrue(mocks.has_merged_options(res.options), True)
 
-    @patch("requests.post", mocks.filecollect)
+    @patch("requests.Session.post", staticmethod(mocks.filecollect))
     def test_filecollect(self):
         """Successfully request filecollect"""
         with tempfile.NamedTemporaryFile(suffix=".txt") as fp:
@@ -113,7 +113,7 @@ class Object(unittest.TestCase):
             self.assertEqual(res.status_code, 200)
             self.assertTrue(mocks.has_merged_options(res.options), True)
 
-    @patch("requests.post", mocks.file_upload)
+    @patch("requests.Session.post", staticmethod(mocks.file_upload))
     def test_file_upload(self):
         """Successfully request file upload"""
         with tempfile.NamedTemporaryFile(suffix=".txt") as fp:
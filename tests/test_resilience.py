@@ -0,0 +1,142 @@
+"""
+Test retries and circuit breaking on transient failures.
+"""
+import unittest
+from unittest.mock import patch, MagicMock
+import requests
+from storedsafe import StoredSafe, CircuitOpenException
+from storedsafe.resilience import RetryPolicy, CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+class MockUnavailable(MockResponse):
+    """MockResponse prepared with service unavailable (503) data"""
+
+    def __init__(self, retry_after=None, **kwargs):
+        super().__init__({}, 503, **kwargs)
+        self.headers = {} if retry_after is None else {'Retry-After': retry_after}
+
+    def close(self):
+        """Release the connection."""
+
+
+def flaky(responses):
+    """Mock a request failing with the given responses or errors before succeeding."""
+    responses = list(responses)
+
+    def send(*args, **kwargs):
+        if responses:
+            outcome = responses.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        return MockSuccess(**kwargs)
+    return MagicMock(side_effect=send)
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class Retry(unittest.TestCase):
+    """Test RetryPolicy"""
+
+    def setUp(self):
+        self.api = StoredSafe(
+            host=MOCK_HOST, token=MOCK_TOKEN, retry=RetryPolicy(retries=3, backoff_factor=0))
+
+    def test_delay(self):
+        """Backoff is jittered, capped, and Retry-After is honored"""
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, max_retry_after=10)
+        self.assertTrue(all(0 <= policy.delay(attempt) <= min(5, 2 ** attempt) for attempt in range(6)))
+        self.assertEqual(policy.delay(0, '2'), 2)
+        self.assertEqual(policy.delay(0, '120'), 10)
+        self.assertLessEqual(policy.delay(0, 'Wed, 21 Oct 2015 07:28:00 GMT'), 0)
+
+    def test_retry_get(self):
+        """GET requests are retried on transient statuses and connection errors"""
+        get = flaky([MockUnavailable(), requests.ConnectionError('reset'), MockUnavailable()])
+        with patch('requests.Session.get', get):
+            res = self.api.get_object(MOCK_OBJECT_ID)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(get.call_count, 4)
+
+    def test_retries_exhausted(self):
+        """The last response is returned when retries are exhausted"""
+        get = flaky([MockUnavailable()] * 5)
+        with patch('requests.Session.get', get):
+            res = self.api.vault_objects(MOCK_VAULT_ID)
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(get.call_count, 4)
+
+    @patch('time.sleep')
+    def test_retry_after(self, sleep):
+        """Retry-After is waited for before retrying"""
+        with patch('requests.Session.get', flaky([MockUnavailable(retry_after='3')])):
+            self.api.list_vaults()
+        sleep.assert_called_once_with(3)
+
+    def test_no_retry_post(self):
+        """POST requests are never retried"""
+        post = flaky([MockUnavailable(), requests.ConnectionError('reset')])
+        api = StoredSafe(
+            host=MOCK_HOST, token=MOCK_TOKEN, retry=RetryPolicy(backoff_factor=0, methods=('GET', 'POST')))
+        with patch('requests.Session.post', post):
+            self.assertEqual(api.create_object(**MOCK_PARAMS).status_code, 503)
+            with self.assertRaises(requests.ConnectionError):
+                api.create_object(**MOCK_PARAMS)
+        self.assertEqual(post.call_count, 2)
+
+
+class Breaker(unittest.TestCase):
+    """Test CircuitBreaker"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10, clock=self.clock)
+        self.api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN, circuit_breaker=self.breaker)
+
+    def test_states(self):
+        """The circuit opens, lets one probe through after the timeout and closes on success"""
+        get = flaky([MockUnavailable(), requests.ConnectionError('refused'), MockUnavailable()])
+        with patch('requests.Session.get', get):
+            self.api.list_vaults()
+            self.assertEqual(self.breaker.state, CLOSED)
+            with self.assertRaises(requests.ConnectionError):
+                self.api.list_vaults()
+            self.assertEqual(self.breaker.state, OPEN)
+            with self.assertRaises(CircuitOpenException):
+                self.api.list_vaults()
+            self.assertEqual(get.call_count, 2)
+
+            self.clock.now = 10
+            self.assertEqual(self.breaker.state, HALF_OPEN)
+            self.assertEqual(self.api.list_vaults().status_code, 503)
+            self.assertEqual(self.breaker.state, OPEN)
+
+            self.clock.now = 20
+            self.assertEqual(self.api.list_vaults().status_code, 200)
+        self.assertEqual(self.breaker.stats(), {'state': CLOSED, 'failures': 0})
+
+    def test_interrupted_probe(self):
+        """A probe ending with another error lets the next request probe"""
+        get = flaky([
+            requests.ConnectionError('refused'), requests.ConnectionError('refused'),
+            requests.exceptions.ChunkedEncodingError('truncated')])
+        with patch('requests.Session.get', get):
+            for _ in range(2):
+                with self.assertRaises(requests.ConnectionError):
+                    self.api.list_vaults()
+            self.clock.now = 10
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                self.api.list_vaults()
+            self.assertEqual(self.breaker.state, HALF_OPEN)
+            self.assertEqual(self.api.list_vaults().status_code, 200)
+        self.assertEqual(self.breaker.state, CLOSED)
@@ -0,0 +1,148 @@
+"""
+Test the decrypted-secret cache.
+"""
+import asyncio
+import unittest
+from storedsafe import StoredSafe
+from storedsafe.aio import AsyncStoredSafe
+from storedsafe.secretcache import SecretCache
+from storedsafe.fake import FakeServer, ADMIN
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+class FakeClock:
+    """Manually advanced clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Cache(unittest.TestCase):
+    """Test SecretCache"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SecretCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def buffer(self, object_id, token='t'):
+        """Get the buffer holding a cached body."""
+        # pylint: disable=protected-access
+        return self.cache._SecretCache__entries[(str(object_id), token)].buffer
+
+    def test_ttl(self):
+        """Entries expire ttl seconds after they were cached, even when used, and are wiped"""
+        self.cache.put(1, 't', b'secret')
+        buffer = self.buffer(1)
+        self.clock.now = 9
+        self.assertEqual(self.cache.get(1, 't'), b'secret')
+        self.assertIsNone(self.cache.get(1, 'other'))
+        self.clock.now = 10
+        self.assertIsNone(self.cache.get(1, 't'))
+        self.assertEqual(buffer, bytearray())
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['expirations']), (1, 2, 1))
+        self.assertAlmostEqual(stats['hit_ratio'], 1 / 3)
+        self.assertEqual(stats['mean_hit_age'], 9)
+
+    def test_size(self):
+        """The oldest entries are evicted and wiped beyond maxsize"""
+        self.cache.put(1, 't', b'one')
+        buffer = self.buffer(1)
+        self.clock.now = 1
+        self.cache.put(2, 't', b'two')
+        self.cache.put(3, 't', b'three')
+        self.assertEqual((len(self.cache), self.cache.stats()['evictions'], buffer), (2, 1, bytearray()))
+        self.assertIsNone(self.cache.get(1, 't'))
+        self.clock.now = 4
+        self.assertEqual(self.cache.stats()['oldest_age'], 3)
+
+    def test_invalidate(self):
+        """Invalidation and clear wipe the entries of an object for all tokens"""
+        self.cache.put(1, 't', b'one')
+        self.cache.put(1, 'u', b'uno')
+        buffers = [self.buffer(1, 't'), self.buffer(1, 'u')]
+        self.cache.invalidate('1')
+        self.assertEqual((len(self.cache), self.cache.stats()['invalidations']), (0, 2))
+        self.assertEqual(buffers, [bytearray(), bytearray()])
+        self.cache.put(2, 't', b'two')
+        buffer = self.buffer(2)
+        self.cache.clear()
+        self.assertEqual((len(self.cache), buffer), (0, bytearray()))
+
+    def test_generation(self):
+        """Bodies taken before an invalidation of their object are not cached"""
+        generation = self.cache.generation(1)
+        self.cache.invalidate(1)
+        self.cache.put(1, 't', b'stale', generation)
+        self.cache.put(2, 't', b'two', self.cache.generation(2))
+        self.assertEqual((self.cache.get(1, 't'), self.cache.get(2, 't')), (None, b'two'))
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the fake server')
+class Client(unittest.TestCase):
+    """Test decrypt_object with a secret cache against the fake server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServer().start()
+        cls.fake = cls.server.fake
+        user = cls.fake.add_user(MOCK_USERNAME, MOCK_PASSPHRASE)
+        cls.vault = cls.fake.add_vault('Secrets', members={user['id']: ADMIN})
+        cls.token = cls.fake.login(MOCK_USERNAME)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.object_id = self.fake.add_object(self.vault['id'], host='db', password='old')['id']
+
+    def test_cached(self):
+        """Decryptions are served from the cache until the object is edited or deleted"""
+        with StoredSafe(token=self.token, secret_cache=True, **self.server.client_options()) as api:
+            self.assertEqual(api.decrypt_object(self.object_id).json()['OBJECT'][0]['crypted']['password'], 'old')
+            self.fake.secrets[self.object_id]['password'] = 'changed elsewhere'
+            res = api.decrypt_object(self.object_id)
+            self.assertEqual((res.status_code, res.json()['OBJECT'][0]['crypted']['password']), (200, 'old'))
+            self.assertEqual(api.edit_object(self.object_id, password='new').status_code, 200)
+            self.assertEqual(api.decrypt_object(self.object_id).json()['OBJECT'][0]['crypted']['password'], 'new')
+            self.assertEqual(api.delete_object(self.object_id).status_code, 200)
+            self.assertEqual(api.decrypt_object(self.object_id).status_code, 404)
+            stats = api.secret_cache.stats()
+            self.assertEqual((stats['hits'], stats['misses'], stats['invalidations']), (1, 3, 2))
+
+    def test_decrypt_during_edit(self):
+        """Decryptions sent before an edit and handled after it are not cached"""
+        with StoredSafe(token=self.token, secret_cache=True, **self.server.client_options()) as api:
+            get = api.session.get
+
+            def slow_get(*args, **kwargs):
+                res = get(*args, **kwargs)
+                api.session.get = get
+                self.assertEqual(api.edit_object(self.object_id, password='new').status_code, 200)
+                return res
+
+            api.session.get = slow_get
+            self.assertEqual(api.decrypt_object(self.object_id).json()['OBJECT'][0]['crypted']['password'], 'old')
+            self.assertEqual(api.decrypt_object(self.object_id).json()['OBJECT'][0]['crypted']['password'], 'new')
+            self.assertEqual(api.secret_cache.stats()['hits'], 0)
+
+    def test_async(self):
+        """The asyncio client serves cached decryptions as httpx responses"""
+        async def run():
+            async with AsyncStoredSafe(
+                    token=self.token, secret_cache=SecretCache(ttl=60), **self.server.client_options()) as api:
+                first = await api.decrypt_object(self.object_id)
+                second = await api.decrypt_object(self.object_id)
+                return first.json(), second.json(), api.secret_cache.stats()['hits']
+
+        first, second, hits = asyncio.run(run())
+        self.assertEqual((first, hits), (second, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+Test the pooled session shared by all requests.
+"""
+import unittest
+from unittest.mock import patch
+from storedsafe import StoredSafe
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+class Session(unittest.TestCase):
+    """Test connection pooling and session lifecycle"""
+
+    def test_separate_pools(self):
+        """Normal and mTLS ports use separate adapters"""
+        api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN, pool_size=4, mtls_pool_size=2, max_retries=3)
+        adapter = api.session.get_adapter(MOCK_URL + '/api/1.0/vault')
+        mtls_adapter = api.session.get_adapter(MOCK_URL_MTLS + '/api/1.0/auth')
+        self.assertIsNot(adapter, mtls_adapter)
+        self.assertEqual(adapter._pool_maxsize, 4)
+        self.assertEqual(mtls_adapter._pool_maxsize, 2)
+        self.assertEqual(adapter.max_retries.total, 3)
+
+    def test_session_reused(self):
+        """The same session is used for every request"""
+        api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN)
+        self.assertIs(api.session, api.session)
+
+    def test_keep_alive_disabled(self):
+        """Connections are closed after each request when keep-alive is disabled"""
+        api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN, keep_alive=False)
+        self.assertEqual(api.session.headers['Connection'], 'close')
+
+    @patch('requests.Session.get', staticmethod(list_vaults))
+    def test_context_manager(self):
+        """Session is closed when leaving the context"""
+        with StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN, **MOCK_DEFAULT_OPTIONS) as api:
+            session = api.session
+            res = api.list_vaults(MOCK_OVERRIDE_OPTIONS)
+            self.assertEqual(res.status_code, 200)
+            self.assertTrue(has_merged_options(res.options), True)
+        self.assertIsNot(api.session, session)
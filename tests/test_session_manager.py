@@ -0,0 +1,246 @@
+"""
+Test session keep-alive and transparent re-authentication.
+"""
+import time
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+from storedsafe import StoredSafe
+from storedsafe.aio import AsyncStoredSafe
+from storedsafe.session import (
+    SessionManager, AsyncSessionManager, TotpCredentials, SmartcardCredentials, token_expired)
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+class MockExpired(MockResponse):
+    """MockResponse prepared with invalid token (403) data"""
+
+    def __init__(self, **kwargs):
+        super().__init__({'ERRORS': ['Invalid token']}, 403, **kwargs)
+
+    def close(self):
+        """Release the connection."""
+
+
+class MockAuthServer:
+    """Mock a server where the token expires, counting logins."""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.valid = True
+        self.logins = 0
+        self.checks = 0
+        self.lock = threading.Lock()
+
+    def post(self, url, **kwargs):
+        """Check the session, or log in making the token valid again."""
+        if url.endswith('/auth/check'):
+            self.checks += 1
+            return self.get(url, **kwargs)
+        time.sleep(self.delay)
+        res = login_totp(url, **kwargs)
+        if res.status_code == 200:
+            with self.lock:
+                self.logins += 1
+                self.valid = True
+        return res
+
+    def get(self, url, **kwargs):
+        """Respond with success while the token is valid."""
+        if not self.valid or not has_valid_token(**kwargs):
+            return MockExpired(**kwargs)
+        return MockSuccess(**kwargs)
+
+
+class Credentials(unittest.TestCase):
+    """Test credential providers and expiry detection"""
+
+    def test_totp(self):
+        """TOTP credentials ask for a fresh one-time password on each login"""
+        api = StoredSafe(host=MOCK_HOST, apikey=MOCK_APIKEY)
+        otps = iter([MOCK_OTP])
+        with patch('requests.Session.post', staticmethod(login_totp)):
+            res = TotpCredentials(MOCK_USERNAME, MOCK_PASSPHRASE, lambda: next(otps)).login(api)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(api.token, MOCK_TOKEN)
+
+    def test_smartcard(self):
+        """Smartcard credentials log in over mTLS"""
+        api = StoredSafe(host=MOCK_HOST, apikey=MOCK_APIKEY)
+        with patch('requests.Session.post', staticmethod(login_smartcard)):
+            SmartcardCredentials(MOCK_USERNAME, MOCK_PASSPHRASE, MOCK_PUBKEY, MOCK_PRIVKEY).login(api)
+        self.assertEqual(api.token, MOCK_TOKEN)
+
+    def test_token_expired(self):
+        """Only authentication failures count as an expired token"""
+        self.assertTrue(token_expired(MockResponse({}, 401)))
+        self.assertTrue(token_expired(MockExpired()))
+        self.assertFalse(token_expired(MockError()))
+        self.assertFalse(token_expired(MockNotFound()))
+
+
+class Refresh(unittest.TestCase):
+    """Test SessionManager"""
+
+    def setUp(self):
+        self.server = MockAuthServer()
+        self.api = StoredSafe(host=MOCK_HOST, apikey=MOCK_APIKEY, token=MOCK_TOKEN)
+        self.manager = SessionManager(
+            self.api, TotpCredentials(MOCK_USERNAME, MOCK_PASSPHRASE, lambda: MOCK_OTP), interval=60)
+        patchers = [
+            patch('requests.Session.get', staticmethod(self.server.get)),
+            patch('requests.Session.post', staticmethod(self.server.post)),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_transparent_refresh(self):
+        """Requests rejected with an expired token are resent after logging in"""
+        self.server.valid = False
+        res = self.api.vault_objects(MOCK_VAULT_ID)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.server.logins, 1)
+
+    def test_no_refresh(self):
+        """Valid tokens and other errors never trigger a login"""
+        self.assertEqual(self.api.vault_objects(MOCK_VAULT_ID).status_code, 200)
+        with patch('requests.Session.get', staticmethod(lambda url, **kwargs: MockError(**kwargs))):
+            self.assertEqual(self.api.vault_objects(MOCK_VAULT_ID).status_code, 403)
+        self.assertEqual(self.server.logins, 0)
+
+    def test_failed_login(self):
+        """The original response is returned if logging in again fails"""
+        self.manager.credentials = TotpCredentials(MOCK_USERNAME, 'wrong', lambda: MOCK_OTP)
+        self.server.valid = False
+        res = self.api.vault_objects(MOCK_VAULT_ID)
+        self.assertEqual(res.status_code, 403)
+        self.assertEqual(self.manager.logins, 1)
+
+    def test_failed_login_shared(self):
+        """Concurrent callers share a single failed login, and later requests try again"""
+        self.manager.credentials = TotpCredentials(MOCK_USERNAME, 'wrong', lambda: MOCK_OTP)
+        self.server.delay = 0.05
+        self.server.valid = False
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.api.vault_objects(MOCK_VAULT_ID)))
+            for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([res.status_code for res in results], [403] * 4)
+        self.assertEqual(self.manager.logins, 1)
+        self.api.vault_objects(MOCK_VAULT_ID)
+        self.assertEqual(self.manager.logins, 2)
+
+    def test_open_file_not_resent(self):
+        """Requests uploading open files are not resent after logging in"""
+        posted = []
+
+        def post(url, **kwargs):
+            if url.endswith('/auth'):
+                return self.server.post(url, **kwargs)
+            posted.append(kwargs['files'])
+            return MockExpired(**kwargs)
+
+        self.server.valid = False
+        with patch('requests.Session.post', staticmethod(post)):
+            res = self.api.set_user_certificate(MOCK_USER_ID, __file__)
+        self.assertEqual(res.status_code, 403)
+        self.assertEqual(len(posted), 1)
+        self.assertEqual(self.server.logins, 0)
+
+    def test_single_flight(self):
+        """Concurrent callers wait for a single login"""
+        self.server.delay = 0.05
+        self.server.valid = False
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.api.vault_objects(MOCK_VAULT_ID)))
+            for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([res.status_code for res in results], [200] * 8)
+        self.assertEqual(self.server.logins, 1)
+
+    def test_interval_adapts(self):
+        """The keep-alive interval shrinks to half the observed token lifetime"""
+        self.manager.min_interval = 0.001
+        self.manager.last_activity = time.monotonic() - 10
+        self.server.valid = False
+        self.api.check()
+        self.assertLess(self.manager.interval, 6)
+        self.assertGreater(self.manager.interval, 4)
+
+    def test_keepalive(self):
+        """The keep-alive thread checks the session while idle"""
+        self.manager.interval = self.manager.min_interval = 0.01
+        with self.manager:
+            deadline = time.monotonic() + 5
+            while self.server.checks < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertGreaterEqual(self.server.checks, 2)
+        self.assertGreaterEqual(self.manager.stats()['keepalives'], 2)
+
+    def test_stopped(self):
+        """Expired tokens are returned unchanged once the manager is stopped"""
+        with self.manager:
+            pass
+        self.assertIsNone(self.api.session_manager)
+        self.server.valid = False
+        self.assertEqual(self.api.vault_objects(MOCK_VAULT_ID).status_code, 403)
+        self.assertEqual(self.server.logins, 0)
+        self.manager.start()
+        self.assertEqual(self.api.vault_objects(MOCK_VAULT_ID).status_code, 200)
+        self.manager.stop()
+
+
+@unittest.skipUnless(HAS_OPENSSL, 'openssl is required to run the stand-in server')
+class AsyncRefresh(unittest.IsolatedAsyncioTestCase):
+    """Test AsyncSessionManager"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    async def asyncSetUp(self):
+        self.api = AsyncStoredSafe(
+            host=self.server.host, apikey=MOCK_APIKEY, token='expired-token', verify=self.server.cert)
+        self.manager = AsyncSessionManager(
+            self.api, TotpCredentials(MOCK_USERNAME, MOCK_PASSPHRASE, lambda: MOCK_OTP))
+
+    async def asyncTearDown(self):
+        await self.manager.stop()
+        await self.api.aclose()
+
+    async def test_single_flight(self):
+        """Concurrent requests with an expired token share a single login"""
+        results = await asyncio.gather(*(self.api.vault_objects(MOCK_VAULT_ID) for _ in range(8)))
+        self.assertEqual([res.status_code for res in results], [200] * 8)
+        self.assertEqual(self.manager.logins, 1)
+        self.assertEqual(self.api.token, MOCK_TOKEN)
+
+    async def test_keepalive(self):
+        """The keep-alive task checks the session while idle"""
+        self.manager.interval = self.manager.min_interval = 0.01
+        async with self.manager:
+            for _ in range(500):
+                if self.manager.keepalives >= 2:
+                    break
+                await asyncio.sleep(0.01)
+        self.assertGreaterEqual(self.manager.keepalives, 2)
+        self.assertEqual(self.api.token, MOCK_TOKEN)
+
+
+if __name__ == '__main__':
+    unittest.main()
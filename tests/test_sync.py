@@ -0,0 +1,100 @@
+"""
+Test incremental vault sync.
+"""
+import copy
+import unittest
+import tempfile
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from storedsafe import StoredSafe
+from storedsafe.sync import VaultSync
+# pylint: disable=unused-wildcard-import,wildcard-import
+from mocks import *
+
+
+class Interrupted(Exception):
+    """Raised to simulate an interrupted sync."""
+
+
+def listing_or_object(*args, **kwargs):
+    """Send mocked response for vault listings and the objects in them."""
+    if '/object/' in args[0]:
+        return listed_object(*args, **kwargs)
+    return vault_listing(*args, **kwargs)
+
+
+@patch('requests.Session.get', staticmethod(listing_or_object))
+class Sync(unittest.TestCase):
+    """Test VaultSync"""
+
+    def setUp(self):
+        self.api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN)
+        self.tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.state_path = Path(self.tmpdir.name) / 'state.json'
+        self.listings = copy.deepcopy(MOCK_LISTINGS)
+        self.mirror = {}
+
+    def tearDown(self):
+        MOCK_LISTINGS.clear()
+        MOCK_LISTINGS.update(self.listings)
+        self.tmpdir.cleanup()
+
+    def sync(self, **kwargs):
+        """Create a VaultSync mirroring into self.mirror."""
+        return VaultSync(
+            self.api, self.state_path,
+            on_change=lambda object_id, data: self.mirror.__setitem__(object_id, data),
+            on_delete=self.mirror.pop, **kwargs)
+
+    def test_incremental(self):
+        """Only added and changed objects are fetched, removed objects are deleted"""
+        get = MagicMock(side_effect=listing_or_object)
+        with patch('requests.Session.get', get):
+            report = self.sync().run()
+            self.assertEqual(sorted(report.added), ['10', '11', '20'])
+            self.assertEqual(sorted(self.mirror), ['10', '11', '20'])
+
+            MOCK_LISTINGS['1']['OBJECTS'][0]['objectname'] = 'web01'
+            MOCK_LISTINGS['2']['OBJECTS'].pop()
+            get.reset_mock()
+            report = self.sync().run()
+        self.assertEqual(report.changed, ['10'])
+        self.assertEqual(report.deleted, ['20'])
+        self.assertEqual(report.unchanged, 1)
+        self.assertEqual(sorted(self.mirror), ['10', '11'])
+        fetched = [call.args[0] for call in get.call_args_list if '/object/' in call.args[0]]
+        self.assertEqual(fetched, [MOCK_URL + '/api/1.0/object/10'])
+
+    def test_resume(self):
+        """An interrupted sync resumes from its last checkpoint"""
+        def fail_on_third(object_id, data):
+            if len(self.mirror) == 2:
+                raise Interrupted()
+            self.mirror[object_id] = data
+
+        sync = VaultSync(self.api, self.state_path, on_change=fail_on_third, max_workers=1, checkpoint_every=1)
+        with self.assertRaises(Interrupted):
+            sync.run()
+        done = set(self.mirror)
+        report = self.sync().run()
+        self.assertEqual(len(report.added), 1)
+        self.assertNotIn(report.added[0], done)
+        self.assertEqual(report.unchanged, 2)
+
+    def test_unlisted_vault(self):
+        """Objects of vaults no longer listed are deleted"""
+        self.sync().run()
+        del MOCK_LISTINGS['2']
+        report = self.sync().run()
+        self.assertEqual(report.deleted, ['20'])
+        self.assertEqual(sorted(self.mirror), ['10', '11'])
+        self.assertEqual(self.sync().run().deleted, [])
+
+    def test_failed_listing(self):
+        """Objects of vaults whose listing failed are kept"""
+        self.sync().run()
+        del MOCK_LISTINGS['2']
+        report = self.sync().run(['1', '2'])
+        self.assertIn('vault/2', report.errors)
+        self.assertEqual(report.deleted, [])
+        self.assertIn('20', self.mirror)
@@ -15,14 +15,14 @@ class Template(unittest.TestCase):
         self.api = StoredSafe(
             host=MOCK_HOST, token=MOCK_TOKEN, **MOCK_DEFAULT_OPTIONS)
 
-    @patch('requests.get', list_templates)
+    @patch('requests.Session.get', staticmethod(list_templates))
     def test_list_templates(self):
         """Successfully list templates"""
         res = self.api.list_templates(requests_options=MOCK_OVERRIDE_OPTIONS)
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.get', get_template)
+    @patch('requests.Session.get', staticmethod(get_template))
     def test_get_template(self):
         """Successfully get template"""
         res = self.api.get_template(
@@ -15,14 +15,14 @@ class User(unittest.TestCase):
         self.api = StoredSafe(
             host=MOCK_HOST, token=MOCK_TOKEN, **MOCK_DEFAULT_OPTIONS)
 
-    @patch('requests.get', list_users)
+    @patch('requests.Session.get', staticmethod(list_users))
     def test_list_users(self):
         """Successfully list users"""
         res = self.api.list_users(requests_options=MOCK_OVERRIDE_OPTIONS)
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.get', list_users_search_string)
+    @patch('requests.Session.get', staticmethod(list_users_search_string))
     def test_list_users_search_string(self):
         """Successfully list users"""
         res = self.api.list_users(
@@ -30,7 +30,7 @@ class User(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.get', get_user)
+    @patch('requests.Session.get', staticmethod(get_user))
     def test_get_user(self):
         """Successfully get user"""
         res = self.api.get_user(
@@ -38,7 +38,7 @@ class User(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.post', create_user)
+    @patch('requests.Session.post', staticmethod(create_user))
     def test_create_user(self):
         """Successfully create user"""
         res = self.api.create_user(
@@ -46,7 +46,7 @@ class User(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.put', edit_user)
+    @patch('requests.Session.put', staticmethod(edit_user))
     def test_edit_user(self):
         """Successfully edit user"""
         res = self.api.edit_user(
@@ -54,7 +54,7 @@ class User(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.delete', delete_user)
+    @patch('requests.Session.delete', staticmethod(delete_user))
     def test_delete_user(self):
         """Successfully delete user"""
         res = self.api.delete_user(
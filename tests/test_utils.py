@@ -14,35 +14,35 @@ class Utils(unittest.TestCase):
     def setUp(self):
         self.api = StoredSafe(host=MOCK_HOST, token=MOCK_TOKEN, **MOCK_DEFAULT_OPTIONS)
 
-    @patch('requests.get', status_values)
+    @patch('requests.Session.get', staticmethod(status_values))
     def test_status_values(self):
         """Successfully list status values"""
         res = self.api.status_values(requests_options=MOCK_OVERRIDE_OPTIONS)
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.get', password_policies)
+    @patch('requests.Session.get', staticmethod(password_policies))
     def test_password_policies(self):
         """Successfully list password policies"""
         res = self.api.password_policies(requests_options=MOCK_OVERRIDE_OPTIONS)
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.get', version)
+    @patch('requests.Session.get', staticmethod(version))
     def test_version(self):
         """Successfully get StoredSafe version"""
         res = self.api.version(requests_options=MOCK_OVERRIDE_OPTIONS)
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.get', generate_password)
+    @patch('requests.Session.get', staticmethod(generate_password))
     def test_generate_password(self):
         """Successfully generate password"""
         res = self.api.generate_password(requests_options=MOCK_OVERRIDE_OPTIONS)
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.get', generate_password_params)
+    @patch('requests.Session.get', staticmethod(generate_password_params))
     def test_generate_password_params(self):
         """Successfully generate password with parameters"""
         res = self.api.generate_password(**MOCK_PARAMS, requests_options=MOCK_OVERRIDE_OPTIONS)
@@ -15,14 +15,14 @@ class Vault(unittest.TestCase):
         self.api = StoredSafe(
             host=MOCK_HOST, token=MOCK_TOKEN, **MOCK_DEFAULT_OPTIONS)
 
-    @patch('requests.get', list_vaults)
+    @patch('requests.Session.get', staticmethod(list_vaults))
     def test_list_vaults(self):
         """Successfully list vaults"""
         res = self.api.list_vaults(requests_options=MOCK_OVERRIDE_OPTIONS)
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.get', vault_objects)
+    @patch('requests.Session.get', staticmethod(vault_objects))
     def test_vault_objects(self):
         """Successfully list objects in vault"""
         res = self.api.vault_objects(
@@ -30,7 +30,7 @@ class Vault(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.get', vault_members)
+    @patch('requests.Session.get', staticmethod(vault_members))
     def test_vault_members(self):
         """Successfully list members in vault"""
         res = self.api.vault_members(
@@ -38,7 +38,7 @@ class Vault(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.post', add_vault_member)
+    @patch('requests.Session.post', staticmethod(add_vault_member))
     def test_add_vault_member(self):
         """Successful add member to vault"""
         res = self.api.add_vault_member(
@@ -46,7 +46,7 @@ class Vault(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.put', edit_vault_member)
+    @patch('requests.Session.put', staticmethod(edit_vault_member))
     def test_edit_vault_member(self):
         """Successful edit member in vault"""
         res = self.api.edit_vault_member(
@@ -54,7 +54,7 @@ class Vault(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.delete', remove_vault_member)
+    @patch('requests.Session.delete', staticmethod(remove_vault_member))
     def test_remove_vault_member(self):
         """Successful remove member in vault"""
         res = self.api.remove_vault_member(
@@ -62,7 +62,7 @@ class Vault(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.post', create_vault)
+    @patch('requests.Session.post', staticmethod(create_vault))
     def test_create_vault(self):
         """Successful create new vault"""
         res = self.api.create_vault(
@@ -70,7 +70,7 @@ class Vault(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.put', edit_vault)
+    @patch('requests.Session.put', staticmethod(edit_vault))
     def test_edit_vault(self):
         """Successful edit vault"""
         res = self.api.edit_vault(
@@ -78,7 +78,7 @@ class Vault(unittest.TestCase):
         self.assertEqual(res.status_code, 200)
         self.assertTrue(has_merged_options(res.options), True)
 
-    @patch('requests.delete', delete_vault)
+    @patch('requests.Session.delete', staticmethod(delete_vault))
     def test_delete_vault(self):
         """Successful delete vault"""
         res = self.api.delete_vault(